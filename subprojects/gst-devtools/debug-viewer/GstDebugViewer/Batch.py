@@ -0,0 +1,282 @@
+# -*- coding: utf-8; mode: python; -*-
+#
+#  GStreamer Debug Viewer - View and analyze GStreamer debug log files
+#
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You should have received a copy of the GNU General Public License along with
+#  this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""GStreamer Debug Viewer batch mode.
+
+Filters and searches log files like the viewer does, without a display, and
+writes the matching lines or a histogram of the levels per second:
+
+  python3 -m GstDebugViewer.Batch --level WARN -o warnings.log gst.log
+  python3 -m GstDebugViewer.Batch --category v4l2 --histogram gst.log"""
+
+import sys
+import os.path
+import optparse
+import logging
+from itertools import compress
+from gettext import gettext as _
+
+from GstDebugViewer import Common, Data
+from GstDebugViewer.GUI.filters import (CategoryFilter,
+                                        DebugLevelFilter,
+                                        FilenameFilter,
+                                        FunctionFilter,
+                                        ObjectFilter,
+                                        ThreadFilter,)
+from GstDebugViewer.GUI.models import FilteredLogModel, LazyLogModel
+
+
+class BatchRunner (object):
+
+    """Loads log files and writes their lines that pass the filters and
+    contain the search text (if any).
+
+    Loading, filtering and searching use the engines of the viewer, and the
+    output is written line by line."""
+
+    def __init__(self, filenames, cache_dir=None, jobs=None):
+
+        self.logger = logging.getLogger("batch")
+
+        dispatcher = Common.Data.DefaultDispatcher()
+        if len(filenames) == 1:
+            self.log_file = Data.LogFile(filenames[0], dispatcher,
+                                         cache_dir=cache_dir, jobs=jobs)
+        else:
+            self.log_file = Data.MergedLogFile(filenames, dispatcher,
+                                               cache_dir=cache_dir, jobs=jobs)
+        self.log_file.start_loading()
+
+        self.model = LazyLogModel(self.log_file)
+        self.filtered_model = FilteredLogModel(self.model)
+        self.search = None
+
+    def add_filter(self, filter):
+
+        self.logger.debug("adding filter %r", filter)
+        self.filtered_model.add_filter(filter,
+                                       Common.Data.DefaultDispatcher())
+
+    def set_search(self, search_text):
+
+        self.logger.debug("searching for %r", search_text)
+        self.search = Data.LineSearch(self.log_file.path, search_text)
+        self.search.run()
+
+    def iter_rows(self):
+        """Generator for the (offset, level) of the matching lines, in
+        timestamp order."""
+
+        offsets = self.filtered_model.line_offsets
+        levels = self.filtered_model.line_levels
+        if self.search is not None:
+            matches = set(self.search.offsets)
+            rows = compress(zip(offsets, levels),
+                            map(matches.__contains__, offsets))
+        else:
+            rows = zip(offsets, levels)
+        for row in rows:
+            yield row
+
+    def write_lines(self, fileobj):
+        """Write the matching lines to the binary fileobj. Returns the number
+        of lines written."""
+
+        access_offset = self.model.access_offset
+        count = 0
+        for offset, level in self.iter_rows():
+            line = access_offset(offset)
+            if not line.endswith(b"\n"):
+                line += b"\n"
+            fileobj.write(line)
+            count += 1
+        return count
+
+    def write_histogram(self, fileobj):
+        """Write the number of matching lines of each level per second as CSV
+        to the binary fileobj. Seconds without lines are left out. Returns the
+        number of lines counted."""
+
+        levels = Data.debug_levels
+        fileobj.write(("time,%s\n" % (",".join(level.name
+                                               for level in levels),))
+                      .encode("utf-8"))
+
+        def write_counts(second, counts):
+            fileobj.write(("%s,%s\n" % (Data.time_args(second * Data.SECOND),
+                                        ",".join(str(counts[level])
+                                                 for level in levels),))
+                          .encode("utf-8"))
+
+        access_offset = self.model.access_offset
+        parse_time = Data.parse_time
+        second = None
+        counts = None
+        count = 0
+        for offset, level in self.iter_rows():
+            line = access_offset(offset)
+            ts = parse_time(line[:line.find(b" ")].decode("utf-8"))
+            if ts // Data.SECOND != second:
+                if second is not None:
+                    write_counts(second, counts)
+                second = ts // Data.SECOND
+                counts = [0] * len(levels)
+            counts[level] += 1
+            count += 1
+        if second is not None:
+            write_counts(second, counts)
+        return count
+
+
+def _parse_level(value):
+
+    try:
+        return Data.DebugLevel(value)
+    except ValueError:
+        raise optparse.OptionValueError(
+            _("invalid debug level: %r") % (value,))
+
+
+def _parse_thread(value):
+
+    try:
+        return int(value, 16)
+    except ValueError:
+        raise optparse.OptionValueError(_("invalid thread: %r") % (value,))
+
+
+def _make_filters(options):
+
+    filters = []
+
+    if options.level is not None:
+        level = _parse_level(options.level)
+        if level != Data.debug_levels[-1]:
+            # Hides the levels above, keeping this one and the more severe.
+            filters.append(DebugLevelFilter(level.higher_level(),
+                                            DebugLevelFilter.this_and_above))
+
+    for value, filter_class in ((options.category, CategoryFilter,),
+                                (options.object, ObjectFilter,),
+                                (options.function, FunctionFilter,),
+                                (options.source_file, FilenameFilter,),):
+        if value is not None:
+            filters.append(filter_class(value, True))
+    if options.thread is not None:
+        filters.append(ThreadFilter(_parse_thread(options.thread), True))
+
+    for value in options.hide_category:
+        filters.append(CategoryFilter(value))
+    for value in options.hide_object:
+        filters.append(ObjectFilter(value))
+    for value in options.hide_thread:
+        filters.append(ThreadFilter(_parse_thread(value)))
+
+    return filters
+
+
+def main(args=None):
+
+    parser = optparse.OptionParser(
+        _("%prog [OPTION...] FILENAME..."),
+        description=_("Filter, search and export GStreamer debug log files "
+                      "without a display. Several files are merged by "
+                      "timestamp."))
+    parser.add_option("--level", action="store", dest="level",
+                      help=_("Only show lines of this level and the more "
+                             "severe ones (e.g. WARN)"))
+    parser.add_option("--category", action="store", dest="category",
+                      help=_("Only show lines of this category"))
+    parser.add_option("--thread", action="store", dest="thread",
+                      help=_("Only show lines of this thread (e.g. 0x1f9c0)"))
+    parser.add_option("--object", action="store", dest="object",
+                      help=_("Only show lines of this object"))
+    parser.add_option("--function", action="store", dest="function",
+                      help=_("Only show lines of this function"))
+    parser.add_option("--source-file", action="store", dest="source_file",
+                      help=_("Only show lines from this source file"))
+    parser.add_option("--hide-category", action="append",
+                      dest="hide_category", default=[],
+                      help=_("Hide lines of this category"))
+    parser.add_option("--hide-object", action="append", dest="hide_object",
+                      default=[], help=_("Hide lines of this object"))
+    parser.add_option("--hide-thread", action="append", dest="hide_thread",
+                      default=[], help=_("Hide lines of this thread"))
+    parser.add_option("--search", "-s", action="store", dest="search",
+                      help=_("Only show lines whose message contains this "
+                             "text"))
+    parser.add_option("--histogram", action="store_true", dest="histogram",
+                      default=False,
+                      help=_("Write the number of lines of each level per "
+                             "second as CSV instead of the lines"))
+    parser.add_option("--output", "-o", action="store", dest="output",
+                      help=_("Write to this file instead of the standard "
+                             "output"))
+    parser.add_option("--jobs", "-j", action="store", type="int",
+                      dest="jobs",
+                      help=_("Number of processes used to index large files "
+                             "(default: number of CPUs)"))
+    parser.add_option("--no-index-cache", action="store_false",
+                      dest="index_cache", default=True,
+                      help=_("Do not use or store cached line indexes"))
+
+    options, args = parser.parse_args(args)
+    if not args:
+        parser.error(_("no log file given"))
+
+    try:
+        filters = _make_filters(options)
+    except optparse.OptionValueError as exc:
+        parser.error(str(exc))
+
+    if options.index_cache:
+        cache_dir = os.path.join(Common.utils.XDG.CACHE_HOME,
+                                 "gst-debug-viewer")
+    else:
+        cache_dir = None
+
+    try:
+        runner = BatchRunner(args, cache_dir=cache_dir, jobs=options.jobs)
+    except (EnvironmentError, ValueError,) as exc:
+        print(_("Could not open file: %s") % (exc,), file=sys.stderr)
+        return 1
+
+    for filter in filters:
+        runner.add_filter(filter)
+    if options.search:
+        runner.set_search(options.search)
+
+    if options.output:
+        fileobj = open(options.output, "wb")
+    else:
+        fileobj = sys.stdout.buffer
+    try:
+        if options.histogram:
+            runner.write_histogram(fileobj)
+        else:
+            runner.write_lines(fileobj)
+    finally:
+        if options.output:
+            fileobj.close()
+        else:
+            fileobj.flush()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
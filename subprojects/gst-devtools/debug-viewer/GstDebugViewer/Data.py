@@ -23,6 +23,7 @@ import os
 import logging
 import re
 import sys
+from array import array
 
 # Nanosecond resolution (like Gst.SECOND)
 SECOND = 1000000000
@@ -132,6 +133,166 @@ debug_levels = [debug_level_none,
                 debug_level_warning,
                 debug_level_error,
                 debug_level_memdump]
+_debug_levels_by_value = sorted(debug_levels)
+
+
+class LevelArray (object):
+
+    """Sequence of DebugLevel values, stored as one byte per line.
+
+    The storage can be an array("B") or a read-only buffer like a memoryview
+    of a mapped index file."""
+
+    def __init__(self, data=None):
+
+        if data is None:
+            data = array("B")
+        self.data = data
+
+    def __len__(self):
+
+        return len(self.data)
+
+    def __getitem__(self, i):
+
+        if isinstance(i, slice):
+            return LevelArray(self.data[i])
+        return _debug_levels_by_value[self.data[i]]
+
+    def __setitem__(self, i, level):
+
+        self.data[i] = level
+
+    def __delitem__(self, i):
+
+        del self.data[i]
+
+    def __iter__(self):
+
+        levels = _debug_levels_by_value
+        for level in self.data:
+            yield levels[level]
+
+    def append(self, level):
+
+        self.data.append(level)
+
+    def insert(self, i, level):
+
+        self.data.insert(i, level)
+
+
+class TimeHistogram (object):
+
+    """Number of lines per debug level in time buckets.
+
+    The finest buckets span a power of two nanoseconds, so that there are at
+    most max_buckets of them between first_ts and last_ts. Each coarser
+    resolution merges pairs of buckets of the previous one, which lets query
+    answer for any time range and number of partitions by touching at most
+    about two buckets per partition.
+
+    Lines are added as keys (see keys), which combine the finest bucket and
+    the level of a line."""
+
+    def __init__(self, first_ts, last_ts, max_buckets=1 << 14):
+
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+        self.max_buckets = max_buckets
+        self.n_levels = len(debug_levels)
+
+        span = max(last_ts - first_ts, 0)
+        shift = 0
+        while span >> shift >= max_buckets:
+            shift += 1
+        self.shift = shift
+        n_buckets = (span >> shift) + 1
+        self.counts = [array("I", bytes(4 * n_buckets * self.n_levels))]
+
+    def like(self):
+        """Return a new, empty histogram with the same buckets."""
+
+        return TimeHistogram(self.first_ts, self.last_ts, self.max_buckets)
+
+    def keys(self, times, levels):
+        """Return the array of keys for the lines with the given timestamps
+        and levels."""
+
+        first_ts = self.first_ts
+        shift = self.shift
+        n_levels = self.n_levels
+        last_key = len(self.counts[0]) - n_levels
+
+        def key(ts, level):
+            k = ((ts - first_ts) >> shift) * n_levels
+            return min(max(k, 0), last_key) + level
+
+        return array("I", map(key, times, levels))
+
+    def add(self, keys):
+        """Count the lines with the given keys."""
+
+        from collections import Counter
+
+        finest = self.counts[0]
+        for key, count in Counter(keys).items():
+            finest[key] += count
+        self.__build()
+
+    def __build(self):
+
+        from operator import add
+
+        n_levels = self.n_levels
+        counts = self.counts[:1]
+        while len(counts[-1]) > n_levels:
+            fine = counts[-1]
+            if len(fine) % (2 * n_levels):
+                fine = fine + array("I", bytes(4 * n_levels))
+            coarse = array("I", bytes(4 * (len(fine) // 2)))
+            for level in range(n_levels):
+                coarse[level::n_levels] = array(
+                    "I", map(add,
+                             fine[level::2 * n_levels],
+                             fine[level + n_levels::2 * n_levels]))
+            counts.append(coarse)
+        self.counts = counts
+
+    def query(self, start_ts, stop_ts, n):
+        """Return a list of n tuples with the number of lines of each level in
+        the n partitions of [start_ts, stop_ts].
+
+        Lines of buckets that straddle a partition boundary are all counted in
+        the partition that the bucket starts in."""
+
+        n_levels = self.n_levels
+        result = [[0] * n_levels for i in range(n)]
+        step = float(stop_ts - start_ts + 1) / n
+
+        # Use the coarsest resolution with buckets not wider than a partition:
+        shift = self.shift
+        depth = 0
+        while depth + 1 < len(self.counts) and 1 << (shift + 1) <= step:
+            shift += 1
+            depth += 1
+        counts = self.counts[depth]
+
+        first = max(start_ts - self.first_ts, 0) >> shift
+        last = min(max(stop_ts - self.first_ts, -1) >> shift,
+                   len(counts) // n_levels - 1)
+        for bucket in range(first, last + 1):
+            pos = bucket * n_levels
+            bucket_counts = counts[pos:pos + n_levels]
+            if not any(bucket_counts):
+                continue
+            i = int((self.first_ts + (bucket << shift) - start_ts) / step)
+            row = result[min(max(i, 0), n - 1)]
+            for level, count in enumerate(bucket_counts):
+                row[level] += count
+
+        return [tuple(row) for row in result]
+
 
 # For stripping color codes:
 _escape = re.compile(b"\x1b\\[[0-9;]*m")
@@ -202,96 +363,429 @@ class Producer (object):
 
 class SortHelper (object):
 
+    """Sorts the lines that are indexed out of timestamp order.
+
+    Logs are mostly sorted, except that the lines of different threads
+    interleave. Instead of inserting each such line at its position in the
+    arrays, which is O(n) per line, the lines are collected in sorted runs:
+    a line is appended to the run with the latest last timestamp that is not
+    after its own, so the lines of each thread usually end up in one run.
+    finish merges the runs into the main arrays in O(n log k) for k runs.
+    Lines with the same timestamp stay in file order."""
+
+    def __init__(self, fileobj, offsets, levels):
+
+        self.fileobj = fileobj
+        self.offsets = offsets
+        self.levels = levels
+        # Last time strings of the runs, in descending order:
+        self.tails = []
+        self.runs = []
+
+    def add(self, time_string, offset, level):
+        """Add a line that is before the last line of the main arrays."""
+
+        tails = self.tails
+        lo = 0
+        hi = len(tails)
+        # Find the first run whose last line is not after this one:
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tails[mid] > time_string:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(tails):
+            tails.append(time_string)
+            self.runs.append((array("Q"), array("B"),))
+        else:
+            tails[lo] = time_string
+        run_offsets, run_levels = self.runs[lo]
+        run_offsets.append(offset)
+        run_levels.append(level)
+
+    def finish(self):
+        """Merge the runs into the main arrays."""
+
+        if not self.runs:
+            return
+
+        from bisect import bisect_right
+        from heapq import merge
+
+        save_offset = self.fileobj.tell()
+        time = _TimeStrings(self.fileobj, self.offsets).time
+
+        def iter_run(run_offsets, run_levels):
+            for offset, level in zip(run_offsets, run_levels):
+                yield (time(offset), offset, level,)
+
+        lines = merge(*[iter_run(*run) for run in self.runs])
+        self.tails = []
+        self.runs = []
+
+        offsets = self.offsets
+        levels = getattr(self.levels, "data", self.levels)
+        keys = _TimeKeys(self.fileobj, offsets)
+        size = len(offsets)
+        merged_offsets = array("Q")
+        merged_levels = array("B")
+        first = pos = None
+        for line in lines:
+            key = line[:2]
+            if pos is None:
+                first = pos = bisect_right(keys, key)
+            else:
+                # Galloping search, the next position is usually close.
+                lo = hi = pos
+                step = 1
+                while hi < size and keys[hi] <= key:
+                    lo = hi + 1
+                    hi += step
+                    step *= 2
+                stop = bisect_right(keys, key, lo, min(hi, size))
+                merged_offsets.extend(offsets[pos:stop])
+                merged_levels.extend(levels[pos:stop])
+                pos = stop
+            merged_offsets.append(line[1])
+            merged_levels.append(line[2])
+        merged_offsets.extend(offsets[pos:])
+        merged_levels.extend(levels[pos:])
+
+        del offsets[first:]
+        del levels[first:]
+        offsets.extend(merged_offsets)
+        levels.extend(merged_levels)
+
+        self.fileobj.seek(save_offset)
+
+
+# Level character -> DebugLevel, for indexing.
+_index_levels = {"T": debug_level_trace, "F": debug_level_fixme,
+                 "L": debug_level_log, "D": debug_level_debug,
+                 "I": debug_level_info, "W": debug_level_warning,
+                 "E": debug_level_error, " ": debug_level_none,
+                 "M": debug_level_memdump, }
+_index_ansi = "(?:\x1b\\[[0-9;]*m)?"
+_index_pattern_ansi = r"\d:\d\d:\d\d\.\d+ " + _index_ansi + \
+                      r" *\d+" + _index_ansi + \
+                      r" +0x[0-9a-f]+ +" + _index_ansi + \
+                      r"([TFLDIEWM ])"
+_index_pattern_bare = _index_pattern_ansi.replace(_index_ansi, "")
+
+
+def _index_lines(fileobj, offsets, levels, start, stop, limit=50000):
+    """Index the lines starting in [start, stop) of fileobj.
+
+    The offsets and levels of the lines are added to the given arrays in
+    timestamp order. This is a generator that yields True every limit
+    lines."""
+
+    rexp_bare = re.compile(_index_pattern_bare)
+    rexp_ansi = re.compile(_index_pattern_ansi)
+    rexp = rexp_bare
+
+    # Moving attribute lookups out of the loop:
+    readline = fileobj.readline
+    tell = fileobj.tell
+    rexp_match = rexp.match
+    levels_append = levels.append
+    offsets_append = offsets.append
+    dict_levels_get = _index_levels.get
+
+    last_line = ""
+    if len(offsets):
+        # Continue after the last line in timestamp order.
+        fileobj.seek(offsets[-1])
+        last_line = fileobj.readline().decode('utf-8', errors='replace')
+    fileobj.seek(start)
+    i = 0
+    time_len = len(time_args(0))
+    sort_helper = SortHelper(fileobj, offsets, levels)
+    sort_helper_add = sort_helper.add
+    while True:
+        i += 1
+        if i >= limit:
+            i = 0
+            yield True
+
+        offset = tell()
+        if offset >= stop:
+            break
+        line = readline().decode('utf-8', errors='replace')
+        if not line:
+            break
+        match = rexp_match(line)
+        if match is None:
+            if rexp is rexp_ansi or "\x1b" not in line:
+                continue
+
+            match = rexp_ansi.match(line)
+            if match is None:
+                continue
+            # Switch to slower ANSI parsing:
+            rexp = rexp_ansi
+            rexp_match = rexp.match
+
+        # Timestamp is in the very beginning of the row, and can be sorted
+        # by lexical comparison. That's why we don't bother parsing the
+        # time to integer. We also don't have to take a substring here,
+        # which would be a useless memcpy.
+        if line >= last_line:
+            levels_append(
+                dict_levels_get(match.group(1), debug_level_none))
+            offsets_append(offset)
+            last_line = line
+        else:
+            sort_helper_add(line[:time_len], offset,
+                            dict_levels_get(match.group(1), debug_level_none))
+
+    sort_helper.finish()
+
+
+def _index_chunk(path, start, stop):
+    """Index a chunk of the log file at path, in a worker process of
+    LineCache. Returns the arrays of offsets and levels."""
+
+    import mmap
+
+    offsets = array("Q")
+    levels = array("B")
+    with open(path, "rb") as f:
+        fileobj = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for x in _index_lines(fileobj, offsets, levels, start, stop):
+                pass
+        finally:
+            fileobj.close()
+
+    return (offsets, levels,)
+
+
+class _TimeStrings (object):
+
+    """Sequence of the time strings of the lines at the given offsets, for
+    bisection."""
+
+    __slots__ = ("fileobj", "offsets", "time_len",)
+
     def __init__(self, fileobj, offsets):
 
-        self._gen = self.__gen(fileobj, offsets)
-        next(self._gen)
+        self.fileobj = fileobj
+        self.offsets = offsets
+        self.time_len = len(time_args(0))
+
+    def __len__(self):
 
-        # Override in the instance, for performance (this gets called in an
-        # inner loop):
-        self.find_insert_position = self._gen.send
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+
+        return self.time(self.offsets[i])
+
+    def time(self, offset):
+
+        self.fileobj.seek(offset)
+        return self.fileobj.read(self.time_len)
 
-    @staticmethod
-    def find_insert_position(insert_time_string):
 
-        # Stub for documentary purposes.
+class _TimeKeys (_TimeStrings):
 
-        pass
+    """Sequence of the (time string, offset) of the lines at the given
+    offsets, for bisection that keeps lines with the same time in file
+    order."""
+
+    __slots__ = ()
+
+    def __getitem__(self, i):
+
+        offset = self.offsets[i]
+        return (self.time(offset), offset,)
+
+
+class LineIndexCache (object):
+
+    """Sidecar file that stores the line index (offsets and levels) of a log.
+
+    The index file is identified by the path of the log and validated using
+    the size, mtime and a hash of the head and the tail of the log. It is
+    memory mapped when loaded. If the log has only grown since, the index is
+    returned together with the position where indexing has to continue."""
+
+    MAGIC = b"GDVINDEX"
+    VERSION = 1
+    HASH_SIZE = 65536
+    MAX_FILES = 32
+
+    def __init__(self, path, cache_dir):
+
+        import hashlib
+
+        self.logger = logging.getLogger("indexcache")
+
+        self.path = path
+        self.cache_dir = cache_dir
+        name = hashlib.sha1(path.encode("utf-8", "surrogateescape")).hexdigest()
+        self.filename = os.path.join(cache_dir, name + ".idx")
+        self.__map = None
 
     @staticmethod
-    def __gen(fileobj, offsets):
+    def __read(fileobj, start, stop):
 
-        from math import floor
-        tell = fileobj.tell
-        seek = fileobj.seek
-        read = fileobj.read
-        time_len = len(time_args(0))
+        start = max(start, 0)
+        fileobj.seek(start)
+        return fileobj.read(stop - start)
 
-        # We remember the previous insertion point. This gives a nice speed up
-        # for larger bubbles which are already sorted. TODO: In practice, log
-        # lines only get out of order across threads. Need to check if it pays
-        # to parse the thread here and maintain multiple insertion points for
-        # heavily interleaved parts of the log.
-        pos = 0
-        pos_time_string = ""
+    def __hash(self, fileobj, start, stop):
 
-        insert_pos = None
-        while True:
-            insert_time_string = (yield insert_pos)
+        import hashlib
 
-            save_offset = tell()
+        return hashlib.sha1(self.__read(fileobj, start, stop)).hexdigest()
 
-            if pos_time_string <= insert_time_string:
-                lo = pos
-                hi = len(offsets)
-            else:
-                lo = 0
-                hi = pos
-
-            # This is a bisection search, except we don't cut the range in the
-            # middle each time, but at the 90th percentile. This is because
-            # logs are "mostly sorted", so the insertion point is much more
-            # likely to be at the end anyways:
-            while lo < hi:
-                mid = int(floor(lo * 0.1 + hi * 0.9))
-                seek(offsets[mid])
-                mid_time_string = read(time_len)
-                if insert_time_string.encode('utf8') < mid_time_string:
-                    hi = mid
-                else:
-                    lo = mid + 1
-            pos = lo
-            # Caller will replace row at pos with the new one, so this is
-            # correct:
-            pos_time_string = insert_time_string
-
-            insert_pos = pos
-
-            seek(save_offset)
+    def __identify(self, fileobj, size):
+
+        return {"size": size,
+                "mtime": os.stat(self.path).st_mtime,
+                "head": self.__hash(fileobj, 0, self.HASH_SIZE),
+                "tail": self.__hash(fileobj, size - self.HASH_SIZE, size),
+                "complete": self.__read(fileobj, size - 1, size) in (b"", b"\n")}
+
+    def load(self, fileobj, size):
+        """Return (offsets, levels, indexed_size) or None if there is no
+        valid index for the log."""
+
+        import json
+        import mmap
+
+        try:
+            with open(self.filename, "rb") as f:
+                if f.read(len(self.MAGIC)) != self.MAGIC:
+                    return None
+                header_size = int.from_bytes(f.read(4), "little")
+                header = json.loads(f.read(header_size).decode("utf-8"))
+                if (header["version"] != self.VERSION
+                        or header["byteorder"] != sys.byteorder
+                        or header["path"] != self.path):
+                    return None
+                cached = header["file"]
+                indexed_size = cached["size"]
+                if size < indexed_size or \
+                        self.__hash(fileobj, 0, self.HASH_SIZE) != cached["head"] or \
+                        self.__hash(fileobj, indexed_size - self.HASH_SIZE,
+                                    indexed_size) != cached["tail"]:
+                    return None
+                if size > indexed_size and not cached["complete"]:
+                    # The last line has been indexed before it was complete.
+                    return None
+                if size == indexed_size and \
+                        os.stat(self.path).st_mtime != cached["mtime"]:
+                    return None
+                lines = header["lines"]
+                start = header["data-offset"]
+                index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if start % 8 or lines < 0 or start + lines * 9 > len(index_map):
+                    # Truncated index file.
+                    index_map.close()
+                    return None
+                self.__map = index_map
+        except (EnvironmentError, ValueError, KeyError, TypeError) as exc:
+            self.logger.debug("no usable index %r: %s", self.filename, exc)
+            return None
+
+        view = memoryview(self.__map)
+        offsets = view[start:start + lines * 8].cast("Q")
+        start += lines * 8
+        levels = LevelArray(view[start:start + lines])
+        self.logger.debug("loaded index %r with %i lines", self.filename, lines)
+        return (offsets, levels, indexed_size)
+
+    def save(self, fileobj, size, offsets, levels):
+
+        import json
+        import tempfile
+
+        header = {"version": self.VERSION,
+                  "byteorder": sys.byteorder,
+                  "path": self.path,
+                  "file": self.__identify(fileobj, size),
+                  "lines": len(offsets)}
+        # The arrays are aligned to 8 bytes, so that they can be mapped.
+        header["data-offset"] = 0
+        header_size = len(json.dumps(header)) + 32
+        data_offset = (len(self.MAGIC) + 4 + header_size + 7) // 8 * 8
+        header["data-offset"] = data_offset
+        header_data = json.dumps(header).encode("utf-8").ljust(header_size)
+
+        if not isinstance(offsets, array):
+            offsets = array("Q", offsets)
+        level_data = levels.data if isinstance(levels, LevelArray) else levels
+        if not isinstance(level_data, array):
+            level_data = array("B", level_data)
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.MAGIC)
+                f.write(header_size.to_bytes(4, "little"))
+                f.write(header_data)
+                f.write(b"\0" * (data_offset - f.tell()))
+                f.write(offsets)
+                f.write(level_data)
+            os.replace(temp_name, self.filename)
+        except EnvironmentError as exc:
+            self.logger.warning("could not save index %r: %s", self.filename, exc)
+            return
+        self.logger.debug("saved index %r with %i lines", self.filename, len(offsets))
+        self.__prune()
+
+    def __prune(self):
+
+        try:
+            names = [os.path.join(self.cache_dir, name)
+                     for name in os.listdir(self.cache_dir)]
+            names = [name for name in names if name.endswith(".idx")]
+            names.sort(key=os.path.getmtime, reverse=True)
+            for name in names[self.MAX_FILES:]:
+                os.unlink(name)
+        except EnvironmentError:
+            pass
 
 
 class LineCache (Producer):
     """
     offsets: file position for each line
     levels: the debug level for each line
+
+    If the path of the file is given, files of at least _parallel_min_size
+    bytes are indexed in chunks by a pool of jobs processes (default: the
+    number of CPUs).
     """
 
     _lines_per_iteration = 50000
+    _parallel_min_size = 64 * 1024 * 1024
+    _chunks_per_job = 4
 
-    def __init__(self, fileobj, dispatcher):
+    def __init__(self, fileobj, dispatcher, index_cache=None, path=None,
+                 jobs=None):
 
         Producer.__init__(self)
 
         self.logger = logging.getLogger("linecache")
         self.dispatcher = dispatcher
+        self.index_cache = index_cache
+        self.path = path
+        self.jobs = jobs or os.cpu_count() or 1
 
         self.__fileobj = fileobj
         self.__fileobj.seek(0, 2)
         self.__file_size = self.__fileobj.tell()
         self.__fileobj.seek(0)
+        # Indexed size if not indexing sequentially:
+        self.__position = None
 
-        self.offsets = []
-        self.levels = []  # FIXME
+        self.offsets = array("Q")
+        self.levels = LevelArray()
 
     def start_loading(self):
 
@@ -301,82 +795,375 @@ class LineCache (Producer):
 
     def get_progress(self):
 
+        if self.__position is not None:
+            return float(self.__position) / self.__file_size
         return float(self.__fileobj.tell()) / self.__file_size
 
+    def __load_index(self):
+
+        # Returns the position where indexing has to continue.
+        if self.index_cache is None:
+            return 0
+        index = self.index_cache.load(self.__fileobj, self.__file_size)
+        if index is None:
+            return 0
+        offsets, levels, indexed_size = index
+        if indexed_size < self.__file_size and len(offsets):
+            # The log has grown, continue on a writable copy.
+            offsets = array("Q", offsets)
+            levels = LevelArray(array("B", levels.data))
+        self.offsets = offsets
+        self.levels = levels
+        return indexed_size
+
     def __process(self):
 
-        offsets = self.offsets
-        levels = self.levels
-
-        dict_levels = {"T": debug_level_trace, "F": debug_level_fixme,
-                       "L": debug_level_log, "D": debug_level_debug,
-                       "I": debug_level_info, "W": debug_level_warning,
-                       "E": debug_level_error, " ": debug_level_none,
-                       "M": debug_level_memdump, }
-        ANSI = "(?:\x1b\\[[0-9;]*m)?"
-        ANSI_PATTERN = r"\d:\d\d:\d\d\.\d+ " + ANSI + \
-                       r" *\d+" + ANSI + \
-                       r" +0x[0-9a-f]+ +" + ANSI + \
-                       r"([TFLDIEWM ])"
-        BARE_PATTERN = ANSI_PATTERN.replace(ANSI, "")
-        rexp_bare = re.compile(BARE_PATTERN)
-        rexp_ansi = re.compile(ANSI_PATTERN)
-        rexp = rexp_bare
-
-        # Moving attribute lookups out of the loop:
-        readline = self.__fileobj.readline
-        tell = self.__fileobj.tell
-        rexp_match = rexp.match
-        levels_append = levels.append
-        offsets_append = offsets.append
-        dict_levels_get = dict_levels.get
+        start = self.__load_index()
+        if start == self.__file_size and start:
+            self.__fileobj.seek(start)
+            self.have_load_finished()
+            yield False
+            return
 
-        self.__fileobj.seek(0)
-        limit = self._lines_per_iteration
-        last_line = ""
-        i = 0
-        sort_helper = SortHelper(self.__fileobj, offsets)
-        find_insert_position = sort_helper.find_insert_position
-        while True:
-            i += 1
-            if i >= limit:
-                i = 0
+        from concurrent.futures import BrokenExecutor
+
+        if (start == 0 and self.path is not None and self.jobs > 1
+                and self.__file_size >= self._parallel_min_size):
+            try:
+                for x in self.__index_parallel():
+                    yield True
+            except (EnvironmentError, BrokenExecutor,) as exc:
+                self.logger.warning("parallel indexing failed, falling back "
+                                    "to sequential indexing: %s", exc)
+                self.__position = None
+                self.offsets = array("Q")
+                self.levels = LevelArray()
+                for x in self.__index(start):
+                    yield True
+        else:
+            for x in self.__index(start):
+                yield True
+
+        if self.index_cache is not None:
+            self.index_cache.save(self.__fileobj, self.__file_size,
+                                  self.offsets, self.levels)
+
+        self.have_load_finished()
+        yield False
+
+    def __split(self, count):
+
+        # Chunk boundaries are moved to the start of the next line.
+        fileobj = self.__fileobj
+        size = self.__file_size
+        bounds = [0]
+        for i in range(1, count):
+            pos = max(size * i // count, bounds[-1])
+            fileobj.seek(pos)
+            if pos and fileobj.read(1) != b"\n":
+                fileobj.readline()
+            else:
+                fileobj.seek(pos + 1 if pos else 0)
+            bounds.append(min(fileobj.tell(), size))
+        bounds.append(size)
+        return [(start, stop,) for start, stop in zip(bounds, bounds[1:])
+                if start < stop]
+
+    def __index_parallel(self):
+
+        from concurrent.futures import (ProcessPoolExecutor, wait,
+                                        FIRST_COMPLETED,)
+        import multiprocessing
+
+        self.logger.debug("indexing with %i processes", self.jobs)
+        self.__position = 0
+        chunks = self.__split(self.jobs * self._chunks_per_job)
+        results = [None] * len(chunks)
+
+        # Do not fork, this runs in the GUI process which has threads.
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+        else:
+            context = multiprocessing.get_context("spawn")
+        executor = ProcessPoolExecutor(self.jobs, mp_context=context)
+        try:
+            pending = {}
+            for i, (start, stop,) in enumerate(chunks):
+                future = executor.submit(_index_chunk, self.path, start, stop)
+                pending[future] = i
+            while pending:
+                done, not_done = wait(pending, timeout=0.02,
+                                      return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = pending.pop(future)
+                    results[i] = future.result()
+                    start, stop = chunks[i]
+                    self.__position += stop - start
                 yield True
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # The chunks are sorted, merge them one by one. Usually only the
+        # lines around the chunk boundaries are out of order.
+        from bisect import bisect_right
+        from heapq import merge
+
+        offsets = array("Q")
+        levels = array("B")
+        times = _TimeStrings(self.__fileobj, offsets)
+        for chunk_offsets, chunk_levels in results:
+            if not len(chunk_offsets):
+                continue
+            chunk_times = _TimeStrings(self.__fileobj, chunk_offsets)
+            if not len(offsets) or times[-1] <= chunk_times[0]:
+                offsets.extend(chunk_offsets)
+                levels.extend(chunk_levels)
+                continue
+            # Only the lines of both that are not already in order are merged.
+            # Ties are resolved in file order, as merge is stable.
+            pos = bisect_right(times, chunk_times[0])
+            chunk_pos = bisect_right(chunk_times, times[-1])
+            tail = list(zip(offsets[pos:], levels[pos:]))
+            head = zip(chunk_offsets[:chunk_pos], chunk_levels[:chunk_pos])
+            del offsets[pos:]
+            del levels[pos:]
+            time = times.time
+            for offset, level in merge(tail, head,
+                                       key=lambda line: time(line[0])):
+                offsets.append(offset)
+                levels.append(level)
+            offsets.extend(chunk_offsets[chunk_pos:])
+            levels.extend(chunk_levels[chunk_pos:])
+            yield True
+
+        self.offsets = offsets
+        self.levels = LevelArray(levels)
+
+    def __index(self, start):
+
+        return _index_lines(self.__fileobj, self.offsets, self.levels, start,
+                            self.__file_size, self._lines_per_iteration)
+
+
+class MergedFile (object):
+
+    """Read-only concatenation of the log files at paths, mapped to memory.
+
+    A newline is inserted after files that do not end with one, so that no
+    line spans two files. Supports the parts of the mmap interface that the
+    log models and LogLines use. find only matches within one file."""
+
+    def __init__(self, paths):
+
+        import mmap
+
+        self.paths = paths
+        self.files = []
+        self.bases = []
+        self.size = 0
+        for path in paths:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.files.append(data)
+            self.bases.append(self.size)
+            self.size += len(data) + self.__needs_newline(data)
+        self.__position = 0
 
-            offset = tell()
-            line = readline().decode('utf-8', errors='replace')
-            if not line:
+    @staticmethod
+    def __needs_newline(data):
+
+        return int(len(data) > 0 and data[-1:] != b"\n")
+
+    def __len__(self):
+
+        return self.size
+
+    def source(self, offset):
+        """Return the index of the file that contains offset."""
+
+        from bisect import bisect_right
+
+        return max(bisect_right(self.bases, offset) - 1, 0)
+
+    def __getitem__(self, i):
+
+        if not isinstance(i, slice):
+            if i < 0:
+                i += self.size
+            return self[i:i + 1][0]
+
+        start, stop, step = i.indices(self.size)
+        if step != 1:
+            raise ValueError("slices with steps are not supported")
+
+        pieces = []
+        index = self.source(start)
+        while start < stop:
+            data = self.files[index]
+            base = self.bases[index]
+            pieces.append(data[start - base:stop - base])
+            if stop - base > len(data) and self.__needs_newline(data):
+                pieces.append(b"\n")
+            index += 1
+            if index == len(self.files):
                 break
-            match = rexp_match(line)
-            if match is None:
-                if rexp is rexp_ansi or "\x1b" not in line:
-                    continue
-
-                match = rexp_ansi.match(line)
-                if match is None:
-                    continue
-                # Switch to slower ANSI parsing:
-                rexp = rexp_ansi
-                rexp_match = rexp.match
-
-            # Timestamp is in the very beginning of the row, and can be sorted
-            # by lexical comparison. That's why we don't bother parsing the
-            # time to integer. We also don't have to take a substring here,
-            # which would be a useless memcpy.
-            if line >= last_line:
-                levels_append(
-                    dict_levels_get(match.group(1), debug_level_none))
-                offsets_append(offset)
-                last_line = line
+            start = self.bases[index]
+        return b"".join(pieces)
+
+    def find(self, sub, start=0):
+
+        for index in range(self.source(start), len(self.files)):
+            data = self.files[index]
+            base = self.bases[index]
+            pos = data.find(sub, max(start - base, 0))
+            if pos != -1:
+                return base + pos
+            if sub == b"\n" and self.__needs_newline(data):
+                return base + len(data)
+        return -1
+
+    def seek(self, pos, whence=0):
+
+        if whence == 1:
+            pos += self.__position
+        elif whence == 2:
+            pos += self.size
+        self.__position = min(max(pos, 0), self.size)
+
+    def tell(self):
+
+        return self.__position
+
+    def read(self, n=-1):
+
+        start = self.__position
+        stop = self.size if n < 0 else min(start + n, self.size)
+        self.__position = stop
+        return self[start:stop]
+
+    def readline(self):
+
+        start = self.__position
+        stop = self.find(b"\n", start)
+        stop = self.size if stop == -1 else stop + 1
+        self.__position = stop
+        return self[start:stop]
+
+    def close(self):
+
+        for data in self.files:
+            data.close()
+
+
+class MergedLineCache (Producer):
+    """
+    offsets: position in the MergedFile for each line
+    levels: the debug level for each line
+
+    Each file is indexed by its own LineCache (which reuses index caches and
+    process pools as usual), then the indexes are merged by timestamp with a
+    streaming k-way merge. Lines with the same timestamp keep the order of
+    the files.
+    """
+
+    _lines_per_iteration = 50000
+
+    def __init__(self, fileobj, dispatcher, cache_dir=None, jobs=None):
+
+        Producer.__init__(self)
+
+        self.logger = logging.getLogger("mergedlinecache")
+        self.dispatcher = dispatcher
+
+        self.__fileobj = fileobj
+        self.__processes = []
+        self.__merged = None
+        self.line_caches = []
+        for path, data in zip(fileobj.paths, fileobj.files):
+            if cache_dir is not None:
+                index_cache = LineIndexCache(path, cache_dir)
             else:
-                pos = find_insert_position(line)
-                levels.insert(
-                    pos, dict_levels_get(match.group(1), debug_level_none))
-                offsets.insert(pos, offset)
+                index_cache = None
+            # The processes of the files are run by our own one:
+            line_cache = LineCache(data, self.__processes.append,
+                                   index_cache, path=path, jobs=jobs)
+            self.line_caches.append(line_cache)
+
+        self.offsets = array("Q")
+        self.levels = LevelArray()
+
+    def start_loading(self):
+
+        self.logger.debug("dispatching load process")
+        self.have_load_started()
+        self.dispatcher(self.__process())
+
+    def get_progress(self):
+
+        # The first half is indexing, the second one merging.
+        if self.__merged is not None:
+            total = sum(len(line_cache.offsets)
+                        for line_cache in self.line_caches)
+            if not total:
+                return 1.
+            return .5 + .5 * self.__merged / total
+        if not self.__fileobj.size:
+            return 0.
+        indexed = sum(line_cache.get_progress() * len(data)
+                      for line_cache, data in zip(self.line_caches,
+                                                  self.__fileobj.files))
+        return .5 * indexed / self.__fileobj.size
+
+    def __process(self):
+
+        for line_cache in self.line_caches:
+            line_cache.start_loading()
+        for process in self.__processes:
+            for x in process:
+                yield True
+
+        for x in self.__merge():
+            yield True
 
         self.have_load_finished()
         yield False
 
+    def __merge(self):
+
+        from heapq import merge
+
+        time_len = len(time_args(0))
+        self.__merged = 0
+
+        def iter_lines(data, base, line_cache):
+            levels = line_cache.levels
+            levels = getattr(levels, "data", levels)
+            for offset, level in zip(line_cache.offsets, levels):
+                yield (data[offset:offset + time_len], base + offset, level,)
+
+        lines = [iter_lines(data, base, line_cache)
+                 for data, base, line_cache in zip(self.__fileobj.files,
+                                                   self.__fileobj.bases,
+                                                   self.line_caches)]
+
+        offsets = array("Q")
+        levels = array("B")
+        offsets_append = offsets.append
+        levels_append = levels.append
+        i = 0
+        for time_string, offset, level in merge(*lines):
+            offsets_append(offset)
+            levels_append(level)
+            i += 1
+            if i == self._lines_per_iteration:
+                self.__merged += i
+                i = 0
+                yield True
+
+        self.offsets = offsets
+        self.levels = LevelArray(levels)
+        self.__merged += i
+
 
 class LogLine (list):
 
@@ -412,6 +1199,15 @@ class LogLine (list):
 
         return line
 
+    @classmethod
+    def message_offset(cls, line_string):
+        """Return the start offset of the message, like parse_full does."""
+
+        match = cls._line_regex.match(line_string.decode('utf8', errors='replace'))
+        if match is None:
+            return 0
+        return match.start(9 + 1)
+
 
 class LogLines (object):
 
@@ -443,9 +1239,105 @@ class LogLines (object):
             i += 1
 
 
+class LineSearch (object):
+
+    """Finds the lines of a log file that contain a text in their message.
+
+    The file is scanned in large chunks with bytes.find instead of going
+    through the parsed rows, and only lines that contain the text are
+    parsed. The file is opened separately, so that the search can run in
+    another thread.
+
+    path can also be a list of paths, to search the MergedFile of the files.
+
+    offsets: sorted start offsets of the matching lines
+    """
+
+    _chunk_size = 16 * 1024 * 1024
+
+    def __init__(self, path, search_text):
+
+        if isinstance(search_text, str):
+            search_text = search_text.encode('utf8')
+
+        self.path = path
+        if isinstance(path, str):
+            self.paths = [path]
+        else:
+            self.paths = list(path)
+        self.search_text = search_text
+        self.offsets = array("Q")
+        self.position = 0
+        self.size = sum(map(os.path.getsize, self.paths))
+        self.finished = False
+        self.cancelled = False
+
+    def run(self):
+        """Search the whole file, unless cancelled."""
+
+        for x in self.iter_search():
+            if self.cancelled:
+                break
+
+    def cancel(self):
+
+        self.cancelled = True
+
+    def get_progress(self):
+
+        if self.finished or not self.size:
+            return 1.
+        return min(float(self.position) / self.size, 1.)
+
+    def iter_search(self):
+        """Generator that searches the file, yielding True after each chunk."""
+
+        for path in self.paths:
+            with open(path, "rb") as fileobj:
+                rest = b""
+                last_block = b""
+                while True:
+                    block = fileobj.read(self._chunk_size)
+                    data = rest + block
+                    # Only search complete lines.
+                    end = data.rfind(b"\n") + 1 if block else len(data)
+                    if end:
+                        self.__search(data, end, self.position)
+                        rest = data[end:]
+                        self.position += end
+                    else:
+                        rest = data
+                    yield True
+                    if not block:
+                        break
+                    last_block = block
+            # Like in MergedFile, files are separated by a newline.
+            if last_block[-1:] not in (b"", b"\n",):
+                self.position += 1
+
+        self.finished = True
+
+    def __search(self, data, end, base):
+
+        search_text = self.search_text
+        find = data.find
+        rfind = data.rfind
+        message_offset = LogLine.message_offset
+        offsets_append = self.offsets.append
+
+        pos = find(search_text, 0, end)
+        while pos != -1:
+            line_start = rfind(b"\n", 0, pos) + 1
+            line_end = find(b"\n", pos, end) + 1 or end
+            line = data[line_start:line_end]
+            if search_text in line[message_offset(line):]:
+                offsets_append(base + line_start)
+            pos = find(search_text, line_end, end)
+
+
 class LogFile (Producer):
 
-    def __init__(self, filename, dispatcher):
+    def __init__(self, filename, dispatcher, cache_dir=None, jobs=None):
 
         import mmap
 
@@ -457,7 +1349,60 @@ class LogFile (Producer):
         self.__real_fileobj = open(filename, "rb")
         self.fileobj = mmap.mmap(
             self.__real_fileobj.fileno(), 0, access=mmap.ACCESS_READ)
-        self.line_cache = LineCache(self.fileobj, dispatcher)
+        if cache_dir is not None:
+            index_cache = LineIndexCache(self.path, cache_dir)
+        else:
+            index_cache = None
+        self.line_cache = LineCache(self.fileobj, dispatcher, index_cache,
+                                    path=self.path, jobs=jobs)
+        self.line_cache.consumers.append(self)
+
+    def start_loading(self):
+
+        self.logger.debug("starting load")
+        self.line_cache.start_loading()
+
+    def get_load_progress(self):
+
+        return self.line_cache.get_progress()
+
+    def handle_load_started(self):
+
+        # Chain up to our consumers:
+        self.have_load_started()
+
+    def handle_load_finished(self):
+        self.logger.debug("finish loading")
+        self.lines = LogLines(self.fileobj, self.line_cache)
+
+        # Chain up to our consumers:
+        self.have_load_finished()
+
+    def source_path(self, offset):
+        """Return the path of the file that contains the line at offset."""
+
+        return self.path
+
+
+class MergedLogFile (Producer):
+
+    """Several log files that are viewed as one log, with the lines in
+    timestamp order (for example the logs of the processes of a pipeline).
+
+    Works like LogFile, with path being the list of the paths of the files
+    and fileobj a MergedFile."""
+
+    def __init__(self, filenames, dispatcher, cache_dir=None, jobs=None):
+
+        Producer.__init__(self)
+
+        self.logger = logging.getLogger("mergedlogfile")
+
+        self.path = [os.path.normpath(os.path.abspath(filename))
+                     for filename in filenames]
+        self.fileobj = MergedFile(self.path)
+        self.line_cache = MergedLineCache(self.fileobj, dispatcher,
+                                          cache_dir=cache_dir, jobs=jobs)
         self.line_cache.consumers.append(self)
 
     def start_loading(self):
@@ -475,8 +1420,14 @@ class LogFile (Producer):
         self.have_load_started()
 
     def handle_load_finished(self):
+
         self.logger.debug("finish loading")
         self.lines = LogLines(self.fileobj, self.line_cache)
 
         # Chain up to our consumers:
         self.have_load_finished()
+
+    def source_path(self, offset):
+        """Return the path of the file that contains the line at offset."""
+
+        return self.path[self.fileobj.source(offset)]
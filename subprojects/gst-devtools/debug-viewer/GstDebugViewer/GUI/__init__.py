@@ -31,11 +31,12 @@ def main(args):
 
     app = App()
 
-    # TODO: Once we support more than one window, open one window for each
-    # supplied filename.
+    # Several filenames are opened as one merged log.
     window = app.windows[0]
-    if len(args) > 0:
+    if len(args) == 1:
         window.set_log_file(args[0])
+    elif len(args) > 1:
+        window.set_log_file(args)
 
     app.run()
 
@@ -32,7 +32,14 @@ def get_comparison_function(all_but_this):
 
 class Filter (object):
 
-    pass
+    """A filter keeps the rows for which filter_func(row) returns True.
+
+    Filters that only look at a single column also set col_id and
+    value_func(value), so that models can evaluate them on column arrays
+    instead of parsing every row."""
+
+    col_id = None
+    value_func = None
 
 
 class DebugLevelFilter (Filter):
@@ -49,9 +56,14 @@ class DebugLevelFilter (Filter):
             comparison_function = get_comparison_function(
                 mode == self.all_but_this)
 
+        def value_func(value):
+            return comparison_function(value, debug_level)
+
         def filter_func(row):
-            return comparison_function(row[col_id], debug_level)
+            return value_func(row[col_id])
         self.filter_func = filter_func
+        self.col_id = col_id
+        self.value_func = value_func
 
 
 class CategoryFilter (Filter):
@@ -61,9 +73,14 @@ class CategoryFilter (Filter):
         col_id = LogModelBase.COL_CATEGORY
         comparison_function = get_comparison_function(all_but_this)
 
+        def value_func(value):
+            return comparison_function(value, category)
+
         def category_filter_func(row):
-            return comparison_function(row[col_id], category)
+            return value_func(row[col_id])
         self.filter_func = category_filter_func
+        self.col_id = col_id
+        self.value_func = value_func
 
 
 class ObjectFilter (Filter):
@@ -73,9 +90,14 @@ class ObjectFilter (Filter):
         col_id = LogModelBase.COL_OBJECT
         comparison_function = get_comparison_function(all_but_this)
 
+        def value_func(value):
+            return comparison_function(value, object_)
+
         def object_filter_func(row):
-            return comparison_function(row[col_id], object_)
+            return value_func(row[col_id])
         self.filter_func = object_filter_func
+        self.col_id = col_id
+        self.value_func = value_func
 
 
 class FunctionFilter (Filter):
@@ -85,9 +107,14 @@ class FunctionFilter (Filter):
         col_id = LogModelBase.COL_FUNCTION
         comparison_function = get_comparison_function(all_but_this)
 
+        def value_func(value):
+            return comparison_function(value, function_)
+
         def function_filter_func(row):
-            return comparison_function(row[col_id], function_)
+            return value_func(row[col_id])
         self.filter_func = function_filter_func
+        self.col_id = col_id
+        self.value_func = value_func
 
 
 class ThreadFilter (Filter):
@@ -97,9 +124,14 @@ class ThreadFilter (Filter):
         col_id = LogModelBase.COL_THREAD
         comparison_function = get_comparison_function(all_but_this)
 
+        def value_func(value):
+            return comparison_function(value, thread_)
+
         def thread_filter_func(row):
-            return comparison_function(row[col_id], thread_)
+            return value_func(row[col_id])
         self.filter_func = thread_filter_func
+        self.col_id = col_id
+        self.value_func = value_func
 
 
 class FilenameFilter (Filter):
@@ -109,6 +141,11 @@ class FilenameFilter (Filter):
         col_id = LogModelBase.COL_FILENAME
         comparison_function = get_comparison_function(all_but_this)
 
+        def value_func(value):
+            return comparison_function(value, filename)
+
         def filename_filter_func(row):
-            return comparison_function(row[col_id], filename)
+            return value_func(row[col_id])
         self.filter_func = filename_filter_func
+        self.col_id = col_id
+        self.value_func = value_func
@@ -21,6 +21,8 @@
 
 from array import array
 from bisect import bisect_left
+from collections import OrderedDict
+from itertools import compress
 import logging
 
 from gi.repository import GObject
@@ -29,6 +31,46 @@ from gi.repository import Gtk
 from GstDebugViewer import Common, Data
 
 
+class RowCache (object):
+
+    """Parsed rows by line offset, evicting the least recently used rows
+    beyond max_size rows."""
+
+    def __init__(self, max_size=20000):
+
+        self.max_size = max_size
+        self.rows = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+
+        return len(self.rows)
+
+    def __contains__(self, offset):
+
+        return offset in self.rows
+
+    def __getitem__(self, offset):
+
+        rows = self.rows
+        row = rows[offset]
+        rows.move_to_end(offset)
+        return row
+
+    def __setitem__(self, offset, row):
+
+        rows = self.rows
+        rows[offset] = row
+        rows.move_to_end(offset)
+        if len(rows) > self.max_size:
+            rows.popitem(last=False)
+
+    def clear(self):
+
+        self.rows.clear()
+
+
 class LogModelBase (Common.GUI.GenericTreeModel, metaclass=Common.GUI.MetaModel):
 
     columns = ("COL_TIME", GObject.TYPE_UINT64,
@@ -48,14 +90,106 @@ class LogModelBase (Common.GUI.GenericTreeModel, metaclass=Common.GUI.MetaModel)
 
         # self.props.leak_references = False
 
-        self.line_offsets = array("I")
-        self.line_levels = []  # FIXME: Not so nice!
-        self.line_cache = {}
+        self.line_offsets = array("Q")
+        self.line_levels = Data.LevelArray()
+        self.line_cache = RowCache()
+        self.column_cache = {}
+        self.time_histogram = None
+        self.time_keys = None
+
+    def get_column(self, col_id):
+        """Return (ids, values) for a column, where values is the list of the
+        distinct values in the column and ids is an array of the index of the
+        value of each row, or None if the column has not been built yet (see
+        iter_build_column)."""
+
+        if col_id == self.COL_LEVEL and isinstance(self.line_levels,
+                                                   Data.LevelArray):
+            return (self.line_levels.data, sorted(Data.debug_levels),)
+
+        return self.column_cache.get(col_id)
+
+    def iter_build_column(self, col_id):
+        """Parse all rows to build the column returned by get_column. This is
+        a generator that yields the number of rows processed so far."""
+
+        YIELD_LIMIT = 10000
+
+        ensure_cached = self.ensure_cached
+        line_cache = self.line_cache
+        ids = array("I")
+        ids_append = ids.append
+        values = []
+        value_ids = {}
+        value_ids_get = value_ids.get
+
+        y = YIELD_LIMIT
+        for i, offset in enumerate(self.line_offsets):
+            ensure_cached(offset)
+            value = line_cache[offset][col_id]
+            value_id = value_ids_get(value)
+            if value_id is None:
+                value_id = value_ids[value] = len(values)
+                values.append(value)
+            ids_append(value_id)
+            y -= 1
+            if y == 0:
+                y = YIELD_LIMIT
+                yield i
+
+        self.column_cache[col_id] = (ids, values,)
+
+    def iter_build_time_histogram(self):
+        """Build the Data.TimeHistogram of the rows, which is available as
+        time_histogram afterwards (None for an empty model). This is a
+        generator that yields the number of rows processed so far."""
+
+        YIELD_LIMIT = 10000
+
+        access_offset = self.access_offset
+        parse_time = Data.parse_time
+        times = array("Q")
+        times_append = times.append
+
+        y = YIELD_LIMIT
+        for i, offset in enumerate(self.line_offsets):
+            line = access_offset(offset)
+            times_append(parse_time(line[:line.find(b" ")].decode("utf-8")))
+            y -= 1
+            if y == 0:
+                y = YIELD_LIMIT
+                yield i
+
+        if not times:
+            self.time_keys = None
+            self.time_histogram = None
+            return
+
+        levels = getattr(self.line_levels, "data", self.line_levels)
+        histogram = Data.TimeHistogram(min(times), max(times))
+        self.time_keys = histogram.keys(times, levels)
+        histogram.add(self.time_keys)
+        self.time_histogram = histogram
 
     def ensure_cached(self, line_offset):
 
         raise NotImplementedError("derived classes must override this method")
 
+    def prefetch(self, start, stop):
+        """Make sure that the rows in [start, stop) are cached."""
+
+        start = max(start, 0)
+        stop = min(stop, len(self.line_offsets),
+                   start + self.line_cache.max_size // 2)
+        if start < stop:
+            self.prefetch_offsets(self.line_offsets[start:stop])
+
+    def prefetch_offsets(self, offsets):
+
+        ensure_cached = self.ensure_cached
+        for offset in offsets:
+            ensure_cached(offset)
+
     def access_offset(self, offset):
 
         raise NotImplementedError("derived classes must override this method")
@@ -192,11 +326,18 @@ class LogModelBase (Common.GUI.GenericTreeModel, metaclass=Common.GUI.MetaModel)
 
 class LazyLogModel (LogModelBase):
 
+    # Lines parsed ahead when rows are requested in file order:
+    read_ahead_lines = 100
+    # Maximum size of a single read when prefetching:
+    max_prefetch_span = 1024 * 1024
+
     def __init__(self, log_obj=None):
 
         LogModelBase.__init__(self)
 
         self.__log_obj = log_obj
+        self.__fileobj = None
+        self.__next_offset = None
 
         if log_obj:
             self.set_log(log_obj)
@@ -206,27 +347,78 @@ class LazyLogModel (LogModelBase):
         self.__fileobj = log_obj.fileobj
 
         self.line_cache.clear()
+        self.column_cache.clear()
+        self.time_histogram = None
+        self.time_keys = None
         self.line_offsets = log_obj.line_cache.offsets
         self.line_levels = log_obj.line_cache.levels
 
+    def __line_end(self, offset):
+
+        end = self.__fileobj.find(b"\n", offset)
+        if end == -1:
+            return len(self.__fileobj)
+        return end + 1
+
     def access_offset(self, offset):
 
-        # TODO: Implement using one slice access instead of seek+readline.
-        self.__fileobj.seek(offset)
-        return self.__fileobj.readline()
+        return self.__fileobj[offset:self.__line_end(offset)]
 
     def ensure_cached(self, line_offset):
 
-        if line_offset in self.line_cache:
+        line_cache = self.line_cache
+        if line_offset in line_cache:
+            line_cache.hits += 1
+            return
+        line_cache.misses += 1
+
+        if line_offset == self.__next_offset:
+            # Sequential access, read ahead.
+            count = self.read_ahead_lines
+        else:
+            count = 1
+
+        line_end = self.__line_end
+        end = line_offset
+        for i in range(count):
+            end = line_end(end)
+            if end == len(self.__fileobj):
+                break
+        self.__cache_lines(line_offset, self.__fileobj[line_offset:end])
+        self.__next_offset = end
+
+    def prefetch_offsets(self, offsets):
+
+        line_cache = self.line_cache
+        missing = [offset for offset in offsets if offset not in line_cache]
+        if not missing:
             return
 
-        if len(self.line_cache) > 10000:
-            self.line_cache.clear()
+        start = min(missing)
+        stop = self.__line_end(max(missing))
+        if stop - start > self.max_prefetch_span:
+            LogModelBase.prefetch_offsets(self, missing)
+            return
+
+        line_cache.misses += len(missing)
+        data = self.__fileobj[start:stop]
+        parse_full = Data.LogLine.parse_full
+        for offset in missing:
+            line_start = offset - start
+            line_stop = data.find(b"\n", line_start) + 1 or len(data)
+            line_cache[offset] = parse_full(data[line_start:line_stop])
 
-        self.__fileobj.seek(line_offset)
-        line = self.__fileobj.readline()
+    def __cache_lines(self, offset, data):
 
-        self.line_cache[line_offset] = Data.LogLine.parse_full(line)
+        line_cache = self.line_cache
+        parse_full = Data.LogLine.parse_full
+        find = data.find
+        line_start = 0
+        while line_start < len(data):
+            line_stop = find(b"\n", line_start) + 1 or len(data)
+            line_cache[offset + line_start] = parse_full(
+                data[line_start:line_stop])
+            line_start = line_stop
 
 
 class FilteredLogModelBase (LogModelBase):
@@ -240,6 +432,7 @@ class FilteredLogModelBase (LogModelBase):
         self.super_model = super_model
         self.access_offset = super_model.access_offset
         self.ensure_cached = super_model.ensure_cached
+        self.prefetch_offsets = super_model.prefetch_offsets
         self.line_cache = super_model.line_cache
 
     def line_index_to_super(self, line_index):
@@ -271,16 +464,81 @@ class FilteredLogModel (FilteredLogModelBase):
         self.line_offsets = self.super_model.line_offsets
         self.line_levels = self.super_model.line_levels
         self.super_index = range(len(self.line_offsets))
+        self.time_histogram = None
 
         del self.filters[:]
 
     def __filter_process(self, filter):
 
+        if filter.col_id is None:
+            process = self.__filter_rows(filter)
+        else:
+            process = self.__filter_column(filter)
+        for x in process:
+            yield True
+
+        self.logger.debug("filtering finished")
+
+        self.__filter_progress = 1.
+        self.__handle_filter_process_finished()
+        yield False
+
+    def __filter_column(self, filter):
+
+        # Evaluates the filter once per distinct value of the column, and
+        # selects the rows in batches through the column array of the super
+        # model, without parsing any lines once the column is built.
+
+        YIELD_LIMIT = 100000
+
+        super_model = self.super_model
+        super_index = self.super_index
+        progress = 0.
+        progress_full = float(len(super_index))
+
+        column = super_model.get_column(filter.col_id)
+        if column is None:
+            self.logger.debug("building column %i", filter.col_id)
+            super_rows = len(super_model.line_offsets)
+            progress_full += super_rows
+            for i in super_model.iter_build_column(filter.col_id):
+                self.__filter_progress = i / progress_full
+                yield True
+            column = super_model.get_column(filter.col_id)
+            progress = float(super_rows)
+
+        self.logger.debug("running filter on column %i", filter.col_id)
+        ids, values = column
+        value_func = filter.value_func
+        keep = bytes(bool(value_func(value)) for value in values)
+        keep_get = keep.__getitem__
+        ids_get = ids.__getitem__
+        new_super_index = array("I")
+        for start in range(0, len(super_index), YIELD_LIMIT):
+            indices = super_index[start:start + YIELD_LIMIT]
+            mask = bytes(map(keep_get, map(ids_get, indices)))
+            new_super_index.extend(compress(indices, mask))
+            progress += len(indices)
+            self.__filter_progress = progress / progress_full
+            yield True
+
+        super_offsets = super_model.line_offsets
+        super_levels = super_model.line_levels
+        super_levels = getattr(super_levels, "data", super_levels)
+        self.line_offsets = array("Q", map(super_offsets.__getitem__,
+                                           new_super_index))
+        self.line_levels = Data.LevelArray(
+            array("B", map(super_levels.__getitem__, new_super_index)))
+        self.super_index = new_super_index
+        self.time_histogram = None
+
+    def __filter_rows(self, filter):
+
         YIELD_LIMIT = 10000
 
         self.logger.debug("preparing new filter")
-        new_line_offsets = array("I")
-        new_line_levels = []
+        new_line_offsets = array("Q")
+        new_line_levels = Data.LevelArray()
         new_super_index = array("I")
         level_id = self.COL_LEVEL
         func = filter.filter_func
@@ -309,11 +567,7 @@ class FilteredLogModel (FilteredLogModelBase):
         self.line_offsets = new_line_offsets
         self.line_levels = new_line_levels
         self.super_index = new_super_index
-        self.logger.debug("filtering finished")
-
-        self.__filter_progress = 1.
-        self.__handle_filter_process_finished()
-        yield False
+        self.time_histogram = None
 
     def add_filter(self, filter, dispatcher):
 
@@ -355,6 +609,32 @@ class FilteredLogModel (FilteredLogModelBase):
 
         pass
 
+    def iter_build_time_histogram(self):
+
+        # The time histogram of the super model is built once. Afterwards,
+        # the one of the filtered rows only needs a pass over their keys.
+
+        super_model = self.super_model
+        if super_model.time_histogram is None:
+            for i in super_model.iter_build_time_histogram():
+                yield i
+
+        super_histogram = super_model.time_histogram
+        super_index = self.super_index
+        if super_histogram is None or \
+                super_index == range(len(super_model.line_offsets)):
+            self.time_histogram = super_histogram
+            return
+
+        keys = super_model.time_keys
+        if isinstance(super_index, range):
+            keys = keys[super_index.start:super_index.stop]
+        else:
+            keys = map(keys.__getitem__, super_index)
+        histogram = super_histogram.like()
+        histogram.add(keys)
+        self.time_histogram = histogram
+
     def line_index_from_super(self, super_line_index):
 
         return bisect_left(self.super_index, super_line_index)
@@ -379,6 +659,7 @@ class FilteredLogModel (FilteredLogModelBase):
                                          super_start, super_stop)
             self.line_levels = SubRange(self.super_model.line_levels,
                                         super_start, super_stop)
+            self.time_histogram = None
             return
 
         if super_start < old_super_start:
@@ -397,6 +678,7 @@ class FilteredLogModel (FilteredLogModelBase):
         self.super_index = SubRange(self.super_index, start, stop)
         self.line_offsets = SubRange(self.line_offsets, start, stop)
         self.line_levels = SubRange(self.line_levels, start, stop)
+        self.time_histogram = None
 
 
 class SubRange (object):
@@ -422,13 +704,8 @@ class SubRange (object):
     def __getitem__(self, i):
 
         if isinstance(i, slice):
-            stop = i.stop
-            if stop >= 0:
-                stop += self.start
-            else:
-                stop += self.stop
-
-            return self.size[i.start + self.start:stop]
+            start, stop, step = i.indices(len(self))
+            return self.size[start + self.start:stop + self.start:step]
         else:
             return self.size[i + self.start]
 
@@ -449,8 +726,8 @@ class LineViewLogModel (FilteredLogModelBase):
 
         FilteredLogModelBase.__init__(self, super_model)
 
-        self.line_offsets = []
-        self.line_levels = []
+        self.line_offsets = array("Q")
+        self.line_levels = Data.LevelArray()
 
         self.parent_indices = []
 
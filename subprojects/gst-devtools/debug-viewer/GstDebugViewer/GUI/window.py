@@ -333,6 +333,9 @@ class Window (object):
         self.log_view.set_search_column(-1)
         sel = self.log_view.get_selection()
         sel.connect("changed", self.handle_log_view_selection_changed)
+        adjustment = self.widgets.log_view_scrolled_window.props.vadjustment
+        adjustment.connect("value-changed",
+                           self.handle_log_view_adjustment_value_changed)
 
         self.view_popup = ui.get_widget(
             "/ui/context/LogViewContextMenu").get_submenu()
@@ -543,6 +546,22 @@ class Window (object):
             tree_iter = model.get_iter(path)
             model.row_changed(path, tree_iter)
 
+    def handle_log_view_adjustment_value_changed(self, adjustment):
+
+        # Parse the visible rows and a page around them in one go, instead of
+        # row by row when the view asks for them.
+        model = self.log_view.get_model()
+        if model is None:
+            return
+
+        visible_range = self.log_view.get_visible_range()
+        if visible_range is None:
+            return
+        start_path, end_path = visible_range
+        start_index, end_index = start_path[0], end_path[0]
+        margin = end_index - start_index + 1
+        model.prefetch(start_index - margin, end_index + 1 + margin)
+
     def handle_log_view_selection_changed(self, selection):
 
         try:
@@ -574,10 +593,16 @@ class Window (object):
 
         dialog = Gtk.FileChooserNative.new(None, self.gtk_window,
                                        Gtk.FileChooserAction.OPEN, None, None)
+        # Selecting several files opens them as one merged log.
+        dialog.set_select_multiple(True)
         response = dialog.run()
         dialog.hide()
         if response == Gtk.ResponseType.ACCEPT:
-            self.set_log_file(dialog.get_filename())
+            filenames = dialog.get_filenames()
+            if len(filenames) == 1:
+                self.set_log_file(filenames[0])
+            else:
+                self.set_log_file(filenames)
         dialog.destroy()
 
     @action
@@ -938,6 +963,7 @@ class Window (object):
         renderer.props.text = strip_escape(self.log_file.readline().strip())
 
     def set_log_file(self, filename):
+        """Open the log file, or a list of log files as one merged log."""
 
         if self.log_file is not None:
             for feature in self.features:
@@ -951,7 +977,8 @@ class Window (object):
             self.tmpfile = None
             self.actions.groups["RowActions"].props.sensitive = False
         else:
-            if self.tmpfile and filename != self.tmpfile.name:
+            merged = not isinstance(filename, str)
+            if self.tmpfile and not merged and filename != self.tmpfile.name:
                 self.tmpfile = tempfile.NamedTemporaryFile()
                 shutil.copyfile(filename, self.tmpfile.name)
                 filename = self.tmpfile.name
@@ -961,10 +988,25 @@ class Window (object):
                 self.setup_model(LazyLogModel())
 
                 self.dispatcher = Common.Data.GSourceDispatcher()
-                self.log_file = Data.LogFile(filename, self.dispatcher)
+                if self.tmpfile:
+                    # Indexes of temporary copies can never be reused.
+                    cache_dir = None
+                else:
+                    cache_dir = os.path.join(Common.utils.XDG.CACHE_HOME,
+                                             "gst-debug-viewer")
+                if merged:
+                    self.log_file = Data.MergedLogFile(filename,
+                                                       self.dispatcher,
+                                                       cache_dir=cache_dir)
+                else:
+                    self.log_file = Data.LogFile(filename, self.dispatcher,
+                                                 cache_dir=cache_dir)
             except EnvironmentError as exc:
                 try:
-                    file_size = os.path.getsize(filename)
+                    if merged:
+                        file_size = min(map(os.path.getsize, filename))
+                    else:
+                        file_size = os.path.getsize(filename)
                 except EnvironmentError:
                     pass
                 else:
@@ -977,7 +1019,10 @@ class Window (object):
                 self.handle_environment_error(exc, filename)
                 return
 
-            basename = os.path.basename(filename)
+            if merged:
+                basename = ", ".join(map(os.path.basename, filename))
+            else:
+                basename = os.path.basename(filename)
             self.gtk_window.props.title = _(
                 "%s - GStreamer Debug Viewer") % (basename,)
 
@@ -20,6 +20,11 @@
 """GStreamer Debug Viewer timeline widget plugin."""
 
 import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import compress
 
 from GstDebugViewer import Common, Data, GUI
 from GstDebugViewer.Plugins import FeatureBase, PluginBase, _N
@@ -65,10 +70,36 @@ class SearchOperation (object):
 
 class SearchSentinel (object):
 
+    """Runs search operations.
+
+    The lines matching a search text are found by a Data.LineSearch in a
+    worker thread and kept for the last few search texts, together with
+    the matching rows of the model, so that going to the next or previous
+    match is a bisection. Only the search for the current text runs, a
+    search that did not finish is cancelled when the text changes."""
+
+    max_searches = 8
+
     def __init__(self):
 
+        self.logger = logging.getLogger("ui.findbar.sentinel")
+
         self.dispatcher = Common.Data.GSourceDispatcher()
         self.cancelled = False
+        self.log_file = None
+        # Search text -> (LineSearch, thread):
+        self.searches = OrderedDict()
+        # Search text -> (line offsets, line count, matching rows):
+        self.rows = {}
+
+    def set_log_file(self, log_file):
+
+        self.abort()
+        for search, thread in self.searches.values():
+            search.cancel()
+        self.searches.clear()
+        self.rows.clear()
+        self.log_file = log_file
 
     def run_for(self, operation):
 
@@ -81,10 +112,62 @@ class SearchSentinel (object):
         self.dispatcher.cancel()
         self.cancelled = True
 
+    def get_search(self, search_text):
+
+        for text, (search, thread,) in list(self.searches.items()):
+            if text != search_text and not search.finished:
+                self.logger.debug("cancelling search thread for %r", text)
+                search.cancel()
+                del self.searches[text]
+                self.rows.pop(text, None)
+
+        if search_text in self.searches:
+            self.searches.move_to_end(search_text)
+            return self.searches[search_text]
+
+        while len(self.searches) >= self.max_searches:
+            old_text, (old_search, old_thread,) = self.searches.popitem(
+                last=False)
+            old_search.cancel()
+            self.rows.pop(old_text, None)
+
+        self.logger.debug("starting search thread for %r", search_text)
+        search = Data.LineSearch(self.log_file.path, search_text)
+        thread = threading.Thread(target=search.run,
+                                  name="search %r" % (search_text,))
+        thread.daemon = True
+        thread.start()
+        self.searches[search_text] = (search, thread,)
+        return (search, thread,)
+
+    def get_rows(self, model, search):
+
+        offsets = model.line_offsets
+        cached = self.rows.get(search.search_text)
+        if cached is not None and cached[0] is offsets and cached[1] == len(offsets):
+            return cached[2]
+
+        matches = set(search.offsets)
+        rows = array("I", compress(range(len(offsets)),
+                                   map(matches.__contains__, offsets)))
+        self.rows[search.search_text] = (offsets, len(offsets), rows,)
+        return rows
+
     def __process(self, operation):
 
         model = operation.model
 
+        if self.log_file is None:
+            self.handle_search_complete()
+            yield False
+            return
+
+        search, thread = self.get_search(operation.search_text)
+        while not search.finished:
+            # Blocks the main loop for a moment instead of spinning.
+            thread.join(0.01)
+            yield True
+
         if operation.start_position is not None:
             start_pos = operation.start_position
         elif operation.search_forward:
@@ -92,40 +175,19 @@ class SearchSentinel (object):
         else:
             start_pos = len(model) - 1
 
-        start_iter = model.iter_nth_child(None, start_pos)
-
-        match_func = operation.match_func
+        rows = self.get_rows(model, search)
         if operation.search_forward:
-            iter_next = model.iter_next
+            i = bisect_left(rows, start_pos)
+        else:
+            i = bisect_right(rows, start_pos) - 1
+
+        # The handlers can start the next operation, which replaces this one.
+        self.dispatcher.cancel()
+        if 0 <= i < len(rows):
+            self.handle_match_found(model, model.iter_nth_child(None, rows[i]))
         else:
-            # FIXME: This is really ugly.
-            nth_child = model.iter_nth_child
-
-            def iter_next_():
-                for i in range(start_pos, -1, -1):
-                    yield nth_child(None, i)
-                yield None
-            it_ = iter_next_()
-
-            def iter_next(it):
-                return it_.__next__()
-
-        YIELD_LIMIT = 1000
-        i = YIELD_LIMIT
-        tree_iter = start_iter
-        while tree_iter and not self.cancelled:
-            i -= 1
-            if i == 0:
-                yield True
-                i = YIELD_LIMIT
-            row = model[tree_iter]
-            if match_func(row):
-                self.handle_match_found(model, tree_iter)
-            tree_iter = iter_next(tree_iter)
-
-        if not self.cancelled:
             self.handle_search_complete()
-        yield False
+        yield True
 
     def handle_match_found(self, model, tree_iter):
 
@@ -297,6 +359,14 @@ class FindBarFeature (FeatureBase):
 
         self.bar.entry.connect("changed", self.handle_entry_changed)
 
+    def handle_attach_log_file(self, window, log_file):
+
+        self.sentinel.set_log_file(log_file)
+
+    def handle_detach_log_file(self, window, log_file):
+
+        self.sentinel.set_log_file(None)
+
     def handle_detach_window(self, window):
 
         self.window = None
@@ -32,14 +32,12 @@ from gi.repository import Gdk
 import cairo
 
 
-def iter_model_reversed(model):
-
-    count = model.iter_n_children(None)
-    for i in range(count - 1, 0, -1):
-        yield model[i]
+class LineFrequencySentinel (object):
 
+    """Counts the lines of the model in n_partitions time partitions.
 
-class LineFrequencySentinel (object):
+    The counts come from the time histogram of the model, which is built once
+    and then answers for any width of the widget."""
 
     def __init__(self, model):
 
@@ -49,31 +47,12 @@ class LineFrequencySentinel (object):
     def clear(self):
 
         self.data = None
+        self.level_data = None
         self.n_partitions = None
         self.partitions = None
         self.step = None
         self.ts_range = None
 
-    def _search_ts(self, target_ts, first_index, last_index):
-
-        model_get = self.model.get_value
-        model_iter_nth_child = self.model.iter_nth_child
-        col_id = self.model.COL_TIME
-
-        # TODO: Rewrite using a lightweight view object + bisect.
-
-        while True:
-            middle = (last_index - first_index) // 2 + first_index
-            if middle == first_index:
-                return first_index
-            ts = model_get(model_iter_nth_child(None, middle), col_id)
-            if ts < target_ts:
-                first_index = middle
-            elif ts > target_ts:
-                last_index = middle
-            else:
-                return middle
-
     def run_for(self, n):
 
         if n == 0:
@@ -84,61 +63,32 @@ class LineFrequencySentinel (object):
     def process(self):
 
         model = self.model
-        result = []
-        partitions = []
 
-        first_ts = None
-        for row in self.model:
-            first_ts = row[model.COL_TIME]
-            if first_ts is not None:
-                break
+        if model.time_histogram is None:
+            for x in model.iter_build_time_histogram():
+                yield True
 
-        if first_ts is None:
+        histogram = model.time_histogram
+        if histogram is None or len(model) == 0:
             return
 
-        last_ts = None
-        i = 0
-        UNPARSABLE_LIMIT = 500
-        for row in iter_model_reversed(self.model):
-            last_ts = row[model.COL_TIME]
-            # FIXME: We ignore 0 here (unparsable lines!), this should be
-            # handled differently!
-            i += 1
-            if i == UNPARSABLE_LIMIT:
-                break
-            if last_ts:
-                last_index = row.path[0]
-                break
-
-        if last_ts is None or last_ts < first_ts:
+        first_ts = model[0][model.COL_TIME]
+        last_ts = model[len(model) - 1][model.COL_TIME]
+        if last_ts <= first_ts:
             return
 
-        step = int(float(last_ts - first_ts) / float(self.n_partitions))
-
-        YIELD_LIMIT = 100
-        limit = YIELD_LIMIT
+        level_data = histogram.query(first_ts, last_ts, self.n_partitions)
+        data = [sum(counts) for counts in level_data]
 
-        first_index = 0
-        target_ts = first_ts + step
-        old_found = 0
-        while target_ts < last_ts:
-            limit -= 1
-            if limit == 0:
-                limit = YIELD_LIMIT
-                yield True
-            found = self._search_ts(target_ts, first_index, last_index)
-            result.append(found - old_found)
+        partitions = []
+        found = 0
+        for count in data:
+            found += count
             partitions.append(found)
-            old_found = found
-            first_index = found
-            target_ts += step
 
-        if step == 0:
-            result = []
-            partitions = []
-
-        self.step = step
-        self.data = result
+        self.step = float(last_ts - first_ts + 1) / self.n_partitions
+        self.data = data
+        self.level_data = level_data
         self.partitions = partitions
         self.ts_range = (first_ts, last_ts,)
 
@@ -157,59 +107,11 @@ class LevelDistributionSentinel (object):
 
     def process(self):
 
-        MAX_LEVELS = 9
-        YIELD_LIMIT = 10000
-        y = YIELD_LIMIT
-
-        model_get = self.model.get_value
-        model_next = self.model.iter_next
-        id_time = self.model.COL_TIME
-        id_level = self.model.COL_LEVEL
+        # The level counts per partition are a by-product of the frequency
+        # sentinel.
         del self.data[:]
-        data = self.data
-        i = 0
-        partitions_i = 0
-        partitions = self.freq_sentinel.partitions
-        counts = [0] * MAX_LEVELS
-        tree_iter = self.model.get_iter_first()
-
-        if not partitions:
-            return
-
-        level_index = 0
-        level_iter = None
-
-        finished = False
-        while tree_iter:
-            y -= 1
-            if y == 0:
-                y = YIELD_LIMIT
-                yield True
-            if level_iter is None:
-                stop_index = level_index + 512
-                levels = self.model.get_value_range(id_level,
-                                                    level_index, stop_index)
-                level_index = stop_index
-                level_iter = iter(levels)
-            try:
-                level = level_iter.__next__()
-            except StopIteration:
-                level_iter = None
-                continue
-            while i > partitions[partitions_i]:
-                data.append(tuple(counts))
-                counts = [0] * MAX_LEVELS
-                partitions_i += 1
-                if partitions_i == len(partitions):
-                    finished = True
-                    break
-            if finished:
-                break
-            counts[level] += 1
-            i += 1
-
-        # Now handle the last one:
-        data.append(tuple(counts))
+        if self.freq_sentinel.level_data:
+            self.data.extend(self.freq_sentinel.level_data)
 
         yield False
 
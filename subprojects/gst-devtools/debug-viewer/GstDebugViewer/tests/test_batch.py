@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8; mode: python; -*-
+#
+#  GStreamer Debug Viewer - View and analyze GStreamer debug log files
+#
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You should have received a copy of the GNU General Public License along with
+#  this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""GStreamer Debug Viewer test suite for the batch mode."""
+
+import io
+import os
+import os.path
+import shutil
+import tempfile
+
+from unittest import TestCase, main as test_main
+
+from .. import Batch, Data
+
+
+def make_line(ts, level, category, message, thread=0x1234):
+
+    return ("0:00:%02i.%09i  1234 %#10x %-5s %20s gstfoo.c:1:foo: %s\n" %
+            (ts // Data.SECOND, ts % Data.SECOND, thread, level, category,
+             message,))
+
+
+class TestBatch (TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "test.log")
+
+        self.lines = []
+        for i in range(300):
+            self.lines.append(make_line(
+                i * Data.SECOND // 100, ("ERROR", "WARN", "INFO", "DEBUG")[i % 4],
+                ("alpha", "beta", "gamma")[i % 3], "message %i" % (i,),
+                thread=0x1000 + i % 2))
+        with open(self.filename, "w") as f:
+            f.write("".join(self.lines))
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def run_batch(self, *args):
+
+        output = os.path.join(self.tmp_dir, "output")
+        self.assertEqual(Batch.main(["--no-index-cache", "-o", output]
+                                    + list(args) + [self.filename]), 0)
+        with open(output) as f:
+            return f.read()
+
+    def test_filters(self):
+
+        self.assertEqual(self.run_batch(), "".join(self.lines))
+        self.assertEqual(self.run_batch("--level", "warn"),
+                         "".join(self.lines[i] for i in range(300)
+                                 if i % 4 < 2))
+        self.assertEqual(self.run_batch("--category", "beta",
+                                        "--thread", "0x1001"),
+                         "".join(self.lines[i] for i in range(300)
+                                 if i % 3 == 1 and i % 2 == 1))
+        self.assertEqual(self.run_batch("--hide-category", "alpha",
+                                        "--hide-category", "gamma",
+                                        "--search", "message 1"),
+                         "".join(self.lines[i] for i in range(300)
+                                 if i % 3 == 1
+                                 and str(i).startswith("1")))
+
+    def test_histogram(self):
+
+        output = self.run_batch("--histogram", "--level", "INFO")
+        rows = [row.split(",") for row in output.splitlines()]
+        self.assertEqual(rows[0], ["time"] + [level.name for level in
+                                              Data.debug_levels])
+        self.assertEqual(len(rows), 1 + 3)
+        self.assertEqual(rows[1][0], Data.time_args(0))
+        self.assertEqual(rows[3][0], Data.time_args(2 * Data.SECOND))
+        for row in rows[1:]:
+            counts = dict(zip(rows[0][1:], map(int, row[1:])))
+            self.assertEqual(counts["ERROR"], 25)
+            self.assertEqual(counts["INFO"], 25)
+            self.assertEqual(counts["DEBUG"], 0)
+
+    def test_runner(self):
+
+        runner = Batch.BatchRunner([self.filename, self.filename])
+        fileobj = io.BytesIO()
+        self.assertEqual(runner.write_lines(fileobj), 600)
+        # Lines with the same timestamp stay in the order of the files:
+        self.assertEqual(fileobj.getvalue().decode("utf-8"),
+                         "".join(line * 2 for line in self.lines))
+
+
+if __name__ == "__main__":
+    test_main()
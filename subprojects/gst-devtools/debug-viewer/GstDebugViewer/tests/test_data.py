@@ -0,0 +1,453 @@
+#!/usr/bin/env python
+# -*- coding: utf-8; mode: python; -*-
+#
+#  GStreamer Debug Viewer - View and analyze GStreamer debug log files
+#
+#  This program is free software; you can redistribute it and/or modify it
+#  under the terms of the GNU General Public License as published by the Free
+#  Software Foundation; either version 3 of the License, or (at your option)
+#  any later version.
+#
+#  This program is distributed in the hope that it will be useful, but WITHOUT
+#  ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+#  FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for
+#  more details.
+#
+#  You should have received a copy of the GNU General Public License along with
+#  this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""GStreamer Debug Viewer test suite for the log file indexing."""
+
+import os
+import os.path
+import shutil
+import tempfile
+
+from unittest import TestCase, main as test_main, mock
+
+from .. import Common, Data
+
+
+def make_line(ts, level="D", message="message"):
+
+    return ("0:00:%02i.%09i  1234      0x1234 %s            default "
+            "gstfoo.c:1:foo: %s\n" % (ts // 1000000000, ts % 1000000000,
+                                      level, message,))
+
+
+class TestLevelArray (TestCase):
+
+    def test_levels(self):
+
+        levels = Data.LevelArray()
+        for level in Data.debug_levels:
+            levels.append(level)
+        self.assertEqual(len(levels), len(Data.debug_levels))
+        self.assertEqual(len(levels.data.tobytes()), len(levels))
+        self.assertEqual(list(levels), Data.debug_levels)
+        self.assertEqual(levels[1].name, Data.debug_levels[1].name)
+        self.assertEqual(list(levels[2:4]), Data.debug_levels[2:4])
+
+        levels.insert(0, Data.debug_level_error)
+        levels[1] = Data.debug_level_warning
+        del levels[2]
+        self.assertEqual(list(levels[:2]), [Data.debug_level_error,
+                                            Data.debug_level_warning])
+
+
+class TestTimeHistogram (TestCase):
+
+    def setUp(self):
+
+        import random
+        rand = random.Random(0)
+
+        self.times = sorted(rand.randrange(1000, 2024) for i in range(5000))
+        self.levels = [rand.randrange(len(Data.debug_levels))
+                       for ts in self.times]
+
+    def histogram(self, max_buckets=1 << 14):
+
+        histogram = Data.TimeHistogram(self.times[0], self.times[-1],
+                                       max_buckets)
+        histogram.add(histogram.keys(self.times, self.levels))
+        return histogram
+
+    def expected(self, start_ts, stop_ts, n):
+
+        step = (stop_ts - start_ts + 1) // n
+        result = [[0] * len(Data.debug_levels) for i in range(n)]
+        for ts, level in zip(self.times, self.levels):
+            if start_ts <= ts <= stop_ts:
+                result[(ts - start_ts) // step][level] += 1
+        return [tuple(row) for row in result]
+
+    def test_query(self):
+
+        first_ts = self.times[0]
+        for max_buckets in (1 << 14, 256, 16, 1):
+            histogram = self.histogram(max_buckets)
+            total = histogram.query(first_ts, first_ts + 1023, 1)
+            self.assertEqual(sum(total[0]), len(self.times))
+
+            # Partitions that are aligned to the buckets are exact:
+            for n in (1, 2, 8, 64, 1024):
+                if n > max_buckets:
+                    continue
+                self.assertEqual(
+                    histogram.query(first_ts, first_ts + 1023, n),
+                    self.expected(first_ts, first_ts + 1023, n))
+        self.assertEqual(
+            self.histogram().query(first_ts + 256, first_ts + 511, 16),
+            self.expected(first_ts + 256, first_ts + 511, 16))
+
+    def test_unaligned(self):
+
+        histogram = self.histogram()
+        for n in (3, 7, 100, 2000):
+            result = histogram.query(self.times[0], self.times[-1], n)
+            self.assertEqual(len(result), n)
+            self.assertEqual(sum(map(sum, result)), len(self.times))
+
+        self.assertEqual(histogram.query(0, 999, 10), [(0,) * 9] * 10)
+
+    def test_add(self):
+
+        histogram = self.histogram()
+        half = histogram.like()
+        half.add(histogram.keys(self.times[::2], self.levels[::2]))
+        half.add(histogram.keys(self.times[1::2], self.levels[1::2]))
+        self.assertEqual(half.counts, histogram.counts)
+
+
+class TestLineIndexCache (TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.filename = os.path.join(self.tmp_dir, "test.log")
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, lines, mode="w"):
+
+        with open(self.filename, mode) as f:
+            f.write("".join(lines))
+
+    def index(self, use_cache=True):
+
+        with open(self.filename, "rb") as f:
+            if use_cache:
+                index_cache = Data.LineIndexCache(
+                    os.path.abspath(self.filename), self.cache_dir)
+            else:
+                index_cache = None
+            line_cache = Data.LineCache(f, Common.Data.DefaultDispatcher(),
+                                        index_cache)
+            line_cache.start_loading()
+            return (list(line_cache.offsets), list(line_cache.levels),)
+
+    def test_reuse(self):
+
+        # The second line is out of order and gets sorted in.
+        self.write([make_line(1, "I"), make_line(0, "W"), make_line(2, "E")])
+        offsets, levels = self.index()
+        self.assertEqual(levels, [Data.debug_level_warning,
+                                  Data.debug_level_info,
+                                  Data.debug_level_error])
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        self.assertEqual(self.index(), (offsets, levels,))
+        self.assertEqual(self.index(use_cache=False), (offsets, levels,))
+
+    def test_append(self):
+
+        self.write([make_line(i) for i in range(100)])
+        self.index()
+        self.write([make_line(150, "E"), make_line(120, "W")], "a")
+        self.assertEqual(self.index(), self.index(use_cache=False))
+
+        offsets, levels = self.index()
+        self.assertEqual(len(offsets), 102)
+        self.assertEqual(levels[-2:], [Data.debug_level_warning,
+                                       Data.debug_level_error])
+
+    def test_invalidate(self):
+
+        self.write([make_line(i) for i in range(100)])
+        self.index()
+        self.write([make_line(i, "E") for i in range(10)])
+        offsets, levels = self.index()
+        self.assertEqual(len(offsets), 10)
+        self.assertEqual(levels, [Data.debug_level_error] * 10)
+
+    def test_corrupt(self):
+
+        self.write([make_line(i) for i in range(10)])
+        result = self.index()
+        for name in os.listdir(self.cache_dir):
+            with open(os.path.join(self.cache_dir, name), "wb") as f:
+                f.write(b"garbage")
+        self.assertEqual(self.index(), result)
+
+    def test_truncated(self):
+
+        self.write([make_line(i) for i in range(100)])
+        result = self.index()
+        name = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        size = os.path.getsize(name)
+        for cut in (3, 105):
+            os.truncate(name, size - cut)
+            self.assertEqual(self.index(), result)
+            # Reindexing wrote a complete index file again.
+            self.assertEqual(os.path.getsize(name), size)
+
+
+class TestSortHelper (TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "test.log")
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_interleaved(self):
+
+        import random
+        rand = random.Random(0)
+
+        # Lines of many threads, written with a different delay for each
+        # thread, plus some lines with the same timestamp.
+        delays = [rand.randrange(100000) for i in range(40)]
+        lines = []
+        for i in range(2000):
+            thread = rand.randrange(len(delays))
+            ts = i * 1000 if i % 10 else 5000
+            lines.append((ts + delays[thread], i, make_line(ts, "DIWE"[i % 4]),))
+        lines.sort()
+        with open(self.filename, "w") as f:
+            f.write("".join(line for ts, i, line in lines))
+
+        with open(self.filename, "rb") as f:
+            line_cache = Data.LineCache(f, Common.Data.DefaultDispatcher())
+            line_cache.start_loading()
+            offsets = list(line_cache.offsets)
+            levels = list(line_cache.levels)
+            f.seek(0)
+            data = f.read()
+
+        # Sorted by timestamp, lines with the same one in file order:
+        expected = sorted(offsets, key=lambda offset: (
+            Data.parse_time(data[offset:offset + 17].decode("utf8")),
+            offset,))
+        self.assertEqual(offsets, expected)
+        self.assertEqual(len(offsets), 2000)
+        self.assertEqual([level.name[0] for level in levels],
+                         [data[offset:offset + 60].split()[3].decode("utf8")
+                          for offset in offsets])
+
+
+class TestParallelIndex (TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "test.log")
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def index(self, jobs):
+
+        with open(self.filename, "rb") as f:
+            line_cache = Data.LineCache(f, Common.Data.DefaultDispatcher(),
+                                        path=self.filename, jobs=jobs)
+            line_cache._parallel_min_size = 0
+            line_cache.start_loading()
+            self.assertEqual(line_cache.get_progress(), 1.)
+            return (list(line_cache.offsets), list(line_cache.levels),)
+
+    def test_sorted(self):
+
+        with open(self.filename, "w") as f:
+            for i in range(1000):
+                f.write(make_line(i * 1000, "DIWE"[i % 4]))
+                if i % 100 == 0:
+                    f.write("not a log line\n")
+
+        offsets, levels = self.index(jobs=3)
+        self.assertEqual(len(offsets), 1000)
+        self.assertEqual((offsets, levels,), self.index(jobs=1))
+
+    def test_unsorted(self):
+
+        # Lines out of order across the chunks, and lines with the same
+        # timestamp.
+        with open(self.filename, "w") as f:
+            for i in range(1000):
+                f.write(make_line((i * 7919) % 1000 * 1000, "DIWE"[i % 4]))
+                f.write(make_line(i % 10, "EWID"[i % 4]))
+
+        offsets, levels = self.index(jobs=3)
+        self.assertEqual(len(offsets), 2000)
+        self.assertEqual((offsets, levels,), self.index(jobs=1))
+
+    def test_no_fork(self):
+
+        # The workers must not be forked from the threaded GUI process.
+        import concurrent.futures
+
+        with open(self.filename, "w") as f:
+            f.write("".join(make_line(i) for i in range(100)))
+        with mock.patch("concurrent.futures.ProcessPoolExecutor",
+                        wraps=concurrent.futures.ProcessPoolExecutor) as executor:
+            self.assertEqual(len(self.index(jobs=2)[0]), 100)
+        context = executor.call_args[1]["mp_context"]
+        self.assertNotEqual(context.get_start_method(), "fork")
+
+
+class TestMergedLogFile (TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filenames = [os.path.join(self.tmp_dir, "%i.log" % (i,))
+                          for i in range(3)]
+
+        with open(self.filenames[0], "w") as f:
+            for i in range(0, 300, 3):
+                f.write(make_line(i, "D", "first %i" % (i,)))
+        with open(self.filenames[1], "w") as f:
+            for i in range(1, 300, 2):
+                f.write(make_line(i, "W", "second %i" % (i,)))
+            f.write("no log line\n")
+            # Same timestamp as a line of the first file:
+            f.write(make_line(150, "E", "second tie"))
+        # No newline at the end of the file:
+        with open(self.filenames[2], "w") as f:
+            f.write(make_line(299, "I", "third").rstrip("\n"))
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def test_merge(self):
+
+        log_file = Data.MergedLogFile(self.filenames,
+                                      Common.Data.DefaultDispatcher())
+        log_file.start_loading()
+        self.assertEqual(log_file.get_load_progress(), 1.)
+
+        messages = [line[-1].strip().decode("utf8")
+                    for line in log_file.lines]
+        self.assertEqual(len(messages), 100 + 151 + 1)
+        self.assertEqual(messages[:4],
+                         ["first 0", "second 1", "first 3", "second 3"])
+        self.assertEqual(messages[-2:], ["second 299", "third"])
+        # Ties keep the order of the files:
+        pos = messages.index("first 150")
+        self.assertEqual(messages[pos + 1], "second tie")
+
+        fileobj = log_file.fileobj
+        offsets = log_file.line_cache.offsets
+        self.assertEqual(fileobj[offsets[-1]:], make_line(299, "I", "third")
+                         .encode("utf8"))
+        self.assertEqual(log_file.source_path(offsets[0]),
+                         os.path.abspath(self.filenames[0]))
+        self.assertEqual(log_file.source_path(offsets[1]),
+                         os.path.abspath(self.filenames[1]))
+        self.assertEqual(
+            [level.name for level in log_file.line_cache.levels[:2]],
+            ["DEBUG", "WARN"])
+
+        # Lines never span two files:
+        first_end = fileobj.bases[1] - 1
+        self.assertEqual(fileobj.find(b"\n", first_end - 10), first_end)
+        self.assertEqual(fileobj[first_end - 7:first_end + 9],
+                         b"rst 297\n0:00:00.")
+        fileobj.close()
+
+    def test_search(self):
+
+        log_file = Data.MergedLogFile(self.filenames,
+                                      Common.Data.DefaultDispatcher())
+        log_file.start_loading()
+
+        for search_text in ("second", "third", "1"):
+            search = Data.LineSearch(log_file.path, search_text)
+            search._chunk_size = 100
+            search.run()
+            expected = []
+            for offset in sorted(log_file.line_cache.offsets):
+                log_file.fileobj.seek(offset)
+                line = log_file.fileobj.readline()
+                message = line[Data.LogLine.message_offset(line):]
+                if search_text.encode("utf8") in message:
+                    expected.append(offset)
+            self.assertEqual(list(search.offsets), expected)
+        log_file.fileobj.close()
+
+
+class TestLineSearch (TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, "test.log")
+
+        with open(self.filename, "w") as f:
+            for i in range(200):
+                f.write(make_line(i, message="message %i" % (i,)))
+                if i % 7 == 0:
+                    f.write("no log line %i\n" % (i,))
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmp_dir)
+
+    def search(self, search_text, chunk_size=None):
+
+        search = Data.LineSearch(self.filename, search_text)
+        if chunk_size is not None:
+            search._chunk_size = chunk_size
+        search.run()
+        self.assertTrue(search.finished)
+        self.assertEqual(search.get_progress(), 1.)
+        return list(search.offsets)
+
+    def expected(self, search_text):
+
+        offsets = []
+        with open(self.filename, "rb") as f:
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                message = line[Data.LogLine.message_offset(line):]
+                if search_text.encode("utf8") in message:
+                    offsets.append(offset)
+        return offsets
+
+    def test_search(self):
+
+        for search_text in ("message 1", "7", "age", "gstfoo", "xyz"):
+            offsets = self.expected(search_text)
+            self.assertEqual(self.search(search_text), offsets)
+            for chunk_size in (1, 50, 333):
+                self.assertEqual(self.search(search_text, chunk_size), offsets)
+
+        # Matches outside of the message are ignored:
+        self.assertEqual(self.search("gstfoo"), [])
+        self.assertEqual(len(self.search("message 1")), 111)
+
+
+if __name__ == "__main__":
+    test_main()
@@ -23,14 +23,20 @@
 import sys
 import os
 import os.path
+from array import array
 from glob import glob
 
 from unittest import TestCase, main as test_main
 
 from .. import Common, Data
-from .. GUI.filters import CategoryFilter, Filter
+from .. GUI.filters import (CategoryFilter,
+                            DebugLevelFilter,
+                            Filter,
+                            ThreadFilter,)
 from .. GUI.models import (FilteredLogModel,
+                           LazyLogModel,
                            LogModelBase,
+                           RowCache,
                            SubRange,)
 
 
@@ -68,6 +74,16 @@ class TestSubRange (TestCase):
         sr = SubRange(values, 5, 15)
         self.assertEqual(list(sr), list(range(5, 15)))
 
+    def test_slice(self):
+
+        values = array("Q", range(20))
+
+        sr = SubRange(values, 5, 15)
+        self.assertEqual(list(sr[2:4]), [7, 8])
+        self.assertEqual(list(sr[:2]), [5, 6])
+        self.assertEqual(list(sr[-2:]), [13, 14])
+        self.assertEqual(list(sr[8:20]), [13, 14])
+
 
 class Model (LogModelBase):
 
@@ -277,5 +293,184 @@ class TestDynamicFilter (TestCase):
             print(comment)
 
 
+class RowFilter (Filter):
+
+    """Evaluates a column filter row by row."""
+
+    def __init__(self, filter):
+
+        self.filter_func = filter.filter_func
+
+
+class CountingModel (Model):
+
+    def __init__(self):
+
+        Model.__init__(self)
+
+        self.parsed = 0
+
+    def ensure_cached(self, line_offset):
+
+        self.parsed += 1
+        Model.ensure_cached(self, line_offset)
+
+
+class TestColumnFilter (TestCase):
+
+    def filtered_rows(self, model, filters):
+
+        filtered_model = FilteredLogModel(model)
+        for filter in filters:
+            filtered_model.add_filter(filter, Common.Data.DefaultDispatcher())
+        rows = [(filtered_model.line_index_to_super(i),
+                 filtered_model.line_offsets[i],
+                 filtered_model.line_levels[i],)
+                for i in range(len(filtered_model))]
+        self.assertEqual([row[1:] for row in rows],
+                         [(model.line_offsets[i], model.line_levels[i],)
+                          for i, offset, level in rows])
+        return [row[0] for row in rows]
+
+    def test_same_as_rows(self):
+
+        model = Model()
+        model.line_levels[3] = Data.debug_level_error
+        model.line_levels[4] = Data.debug_level_warning
+
+        for filters in ([CategoryFilter("EVEN")],
+                        [CategoryFilter("EVEN", True)],
+                        [ThreadFilter(0)],
+                        [DebugLevelFilter(Data.debug_level_error)],
+                        [DebugLevelFilter(Data.debug_level_warning,
+                                          DebugLevelFilter.this_and_above)],
+                        [DebugLevelFilter(Data.debug_level_debug,
+                                          DebugLevelFilter.this_and_above),
+                         CategoryFilter("ODD")],):
+            rows = self.filtered_rows(model, [RowFilter(f) for f in filters])
+            self.assertEqual(self.filtered_rows(model, filters), rows)
+
+        self.assertEqual(self.filtered_rows(model, [
+            DebugLevelFilter(Data.debug_level_debug,
+                             DebugLevelFilter.this_and_above),
+            CategoryFilter("ODD")]), [4])
+
+    def test_column_reuse(self):
+
+        model = CountingModel()
+
+        self.filtered_rows(model, [DebugLevelFilter(Data.debug_level_error)])
+        self.assertEqual(model.parsed, 0)
+
+        self.filtered_rows(model, [CategoryFilter("EVEN")])
+        self.assertEqual(model.parsed, len(model.line_offsets))
+
+        self.filtered_rows(model, [CategoryFilter("ODD"),
+                                   CategoryFilter("EVEN", True)])
+        self.assertEqual(model.parsed, len(model.line_offsets))
+
+
+class TestRowCache (TestCase):
+
+    def test_eviction(self):
+
+        cache = RowCache(max_size=3)
+        for i in range(3):
+            cache[i] = i
+        cache[0]
+        cache[3] = 3
+        self.assertEqual(len(cache), 3)
+        self.assertTrue(0 in cache)
+        self.assertFalse(1 in cache)
+
+        cache[4] = 4
+        self.assertFalse(2 in cache)
+        self.assertEqual(sorted(cache.rows), [0, 3, 4])
+
+
+class TestLazyLogModel (TestCase):
+
+    def setUp(self):
+
+        import tempfile
+
+        self.log = tempfile.NamedTemporaryFile(suffix=".log")
+        for i in range(500):
+            self.log.write(b"0:00:00.%09i  1234      0x1234 DEBUG  default "
+                           b"gstfoo.c:%i:foo: message %i\n" % (i, i, i,))
+        # No newline at the end of the file:
+        self.log.write(b"0:00:01.000000000  1234      0x1234 DEBUG  default "
+                       b"gstfoo.c:1:foo: last")
+        self.log.flush()
+
+        self.log_file = Data.LogFile(self.log.name,
+                                     Common.Data.DefaultDispatcher())
+        self.log_file.start_loading()
+        self.model = LazyLogModel(self.log_file)
+
+    def tearDown(self):
+
+        self.log.close()
+
+    def lines(self):
+
+        with open(self.log.name, "rb") as f:
+            return [(f.tell(), f.readline(),)
+                    for offset in self.model.line_offsets]
+
+    def test_rows(self):
+
+        model = self.model
+        for offset, line in self.lines():
+            model.ensure_cached(offset)
+            self.assertEqual(model.line_cache[offset],
+                             Data.LogLine.parse_full(line))
+            self.assertEqual(model.access_offset(offset), line)
+
+        # Reading in file order parses lines ahead:
+        self.assertEqual(model.line_cache.misses,
+                         1 + 500 // model.read_ahead_lines)
+
+    def test_prefetch(self):
+
+        model = self.model
+        model.prefetch(100, 200)
+        self.assertEqual(model.line_cache.misses, 100)
+        for offset in model.line_offsets[100:200]:
+            model.ensure_cached(offset)
+        self.assertEqual(model.line_cache.misses, 100)
+        self.assertEqual(model.line_cache.hits, 100)
+
+        model.max_prefetch_span = 0
+        model.prefetch(-10, 1000)
+        self.assertEqual(len(model.line_cache), 501)
+
+    def test_time_histogram(self):
+
+        model = self.model
+        for x in model.iter_build_time_histogram():
+            pass
+        histogram = model.time_histogram
+        self.assertEqual((histogram.first_ts, histogram.last_ts,),
+                         (0, Data.SECOND,))
+        counts = histogram.query(0, Data.SECOND, 2)
+        self.assertEqual(counts[0][Data.debug_level_debug], 500)
+        self.assertEqual(counts[1][Data.debug_level_debug], 1)
+
+        filtered_model = FilteredLogModel(model)
+        for x in filtered_model.iter_build_time_histogram():
+            pass
+        self.assertTrue(filtered_model.time_histogram is histogram)
+
+        filtered_model.add_filter(RandomFilter(0),
+                                  Common.Data.DefaultDispatcher())
+        self.assertEqual(filtered_model.time_histogram, None)
+        for x in filtered_model.iter_build_time_histogram():
+            pass
+        counts = filtered_model.time_histogram.query(0, Data.SECOND, 1)
+        self.assertEqual(sum(counts[0]), len(filtered_model))
+        self.assertTrue(0 < len(filtered_model) < 501)
+
+
 if __name__ == "__main__":
     test_main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+'''
+Break down the latency between sources and sinks to the elements on the way and
+show the critical path, the path with the highest latency.
+
+How to run:
+1) generate a log with the latency and the stats tracer, the stats tracer is
+   needed to find out how the elements are linked
+GST_DEBUG="GST_TRACER:7" GST_TRACERS="stats;latency(flags=pipeline+element)" GST_DEBUG_FILE=trace.log <application>
+
+2) print the breakdown
+python3 gsttr-latency.py trace.log
+
+3) rank the paths by their 99th percentile instead of their mean latency
+python3 gsttr-latency.py -m p99 trace.log
+'''
+
+import logging
+from tracer.analysis_runner import AnalysisRunner, ParallelAnalysisRunner
+from tracer.latency_graph import LatencyGraph
+from tracer.parser import MmapParser
+from tracer.store import StoreRunner, TraceStore, is_trace_store
+
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger('gsttr-latency')
+
+_COLUMNS = ('num', 'mean', 'p50', 'p99', 'max')
+
+
+def format_ms(ns):
+    if ns is None:
+        return '-'
+    return '%.3f' % (ns / 1e6)
+
+
+def format_stats(stats):
+    if not stats:
+        return ['-'] * len(_COLUMNS)
+    return [stats.num] + [format_ms(stats.value(m)) for m in _COLUMNS[1:]]
+
+
+def report(graph, metric):
+    line = "%-60s %10s %12s %12s %12s %12s %8s"
+    print("end-to-end latency (ms):")
+    print(line % (('path',) + _COLUMNS + ('share',)))
+    for (src, sink), stats in sorted(graph.paths.items()):
+        print(line % tuple(['%s -> %s' % (src, sink)] + format_stats(stats) + ['']))
+        path = graph.critical_path(src, sink, metric)
+        if path is None:
+            print("  no critical path, are the stats tracer records missing?")
+            continue
+        total = stats.value(metric) or 0
+        attributed = 0
+        for element, pad, hop in path:
+            if not hop:
+                continue
+            v = hop.value(metric) or 0
+            attributed += v
+            share = '%.1f%%' % (100.0 * v / total) if total else '-'
+            print(line % tuple(['  %s.%s' % (element, pad)] + format_stats(hop) + [share]))
+        # links, queuing in the sink, ...
+        share = '%.1f%%' % (100.0 * (total - attributed) / total) if total else '-'
+        print(line % ('  (not attributed)', '', format_ms(total - attributed), '', '', '', share))
+    print()
+
+    print("element latency (ms):")
+    print(line % (('element.src-pad',) + _COLUMNS + ('',)))
+    for (element, pad), stats in sorted(graph.hops.items(),
+                                        key=lambda i: -(i[1].value(metric) or 0)):
+        print(line % tuple(['%s.%s' % (element, pad)] + format_stats(stats) + ['']))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file', nargs='?', default='debug.log')
+    parser.add_argument('-m', '--metric', action='store', default='mean',
+                        choices=('mean', 'p50', 'p90', 'p99', 'p999', 'max'),
+                        help='latency metric used to find the critical path (default: mean)')
+    parser.add_argument('-j', '--jobs', action='store', default=1, type=int,
+                        help='number of processes used to parse the log (default: 1)')
+    args = parser.parse_args()
+
+    if is_trace_store(args.file):
+        graph = LatencyGraph()
+        runner = StoreRunner(TraceStore(args.file))
+        runner.add_analyzer(graph)
+        runner.run()
+    elif args.jobs > 1 and args.file != '-':
+        graph = ParallelAnalysisRunner(args.file, LatencyGraph, args.jobs).run()
+    else:
+        graph = LatencyGraph()
+        with MmapParser(args.file) as log:
+            runner = AnalysisRunner(log)
+            runner.add_analyzer(graph)
+            runner.run()
+
+    report(graph, args.metric)
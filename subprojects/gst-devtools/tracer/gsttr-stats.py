@@ -11,18 +11,40 @@ python3 gsttr-stats.py trace.log
 
 3) print selected entries only
 python3 gsttr-stats.py -c latency trace.log
+
+4) parse a large log using 8 processes
+python3 gsttr-stats.py -j 8 trace.log
+
+5) watch a running application, print changed entries every 5 seconds
+GST_DEBUG="GST_TRACER:7" GST_TRACERS="rusage;latency" <application> 2>&1 | \
+  python3 gsttr-stats.py -i 5 -
+python3 gsttr-stats.py -f -i 5 trace.log
+
+6) also print percentiles, as csv
+python3 gsttr-stats.py -p --format=csv trace.log
+
+7) convert a large log once, then query it several times
+python3 gsttr-store.py trace.log trace.store
+python3 gsttr-stats.py -c latency trace.store
+
+8) read an archived log, gzip, xz, bzip2 and zstd compressed logs are
+   decompressed while they are parsed
+python3 gsttr-stats.py trace.log.xz
 '''
 # TODO:
-# more options
-# - live-update interval (for file=='-')
-#
 # - for values like timestamps, we only want min/max but no average
 
+import csv
+import json
 import logging
+import sys
 from fnmatch import fnmatch
-from tracer.analysis_runner import AnalysisRunner
+from functools import partial
+from tracer.analysis_runner import AnalysisRunner, ParallelAnalysisRunner
 from tracer.analyzer import Analyzer
-from tracer.parser import Parser
+from tracer.histogram import LogHistogram
+from tracer.parser import MmapParser, Parser
+from tracer.store import StoreRunner, TraceStore, aggregate_groups, group_values, is_trace_store, np
 from tracer.structure import Structure
 
 
@@ -48,14 +70,21 @@ _SCOPE_RELATED_TO = {
 
 _NUMERIC_TYPES = ('int', 'uint', 'gint', 'guint', 'gint64', 'guint64')
 
+_PERCENTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('p999', 0.999))
+
 
 class Stats(Analyzer):
 
-    def __init__(self, classes):
+    def __init__(self, classes, percentiles=False):
         super(Stats, self).__init__()
         self.classes = classes
+        self.tracer_classes = classes or ['*']
+        # also collect a histogram of the non aggregated values
+        self.percentiles = percentiles
         self.records = {}
         self.data = {}
+        # scopes updated since the last report_changes()
+        self.changed = set()
 
     def handle_tracer_class(self, event):
         s = Structure(event[Parser.F_MESSAGE])
@@ -83,44 +112,28 @@ class Stats(Analyzer):
                     # TODO only for debugging
                     # print("skipping value: [%s]=%s" % (k, v))
 
-    def handle_tracer_entry(self, event):
-        # use first field in message (structure-id) if none
-        if event[Parser.F_FUNCTION]:
-            return
+    def subscribes(self, name):
+        return name in self.records and super(Stats, self).subscribes(name)
 
-        msg = event[Parser.F_MESSAGE]
-        p = msg.find(',')
-        if p == -1:
-            return
-
-        entry_name = msg[:p]
-        if self.classes:
-            if not any([fnmatch(entry_name, c) for c in self.classes]):
-                return
-
-        record = self.records.get(entry_name)
-        if not record:
-            return
-
-        try:
-            s = Structure(msg)
-        except ValueError:
-            logger.warning("failed to parse: '%s'", msg)
-            return
+    def handle_tracer_structure(self, event, s):
+        entry_name = s.name
+        record = self.records[entry_name]
+        values = s.values
 
         # aggregate event based on class
         for sk, sv in record['scope'].items():
             # look up bin by scope (or create new)
-            key = (_SCOPE_RELATED_TO[sv.values['related-to']] + ":" + str(s.values[sk]))
+            key = (_SCOPE_RELATED_TO[sv.values['related-to']] + ":" + str(values[sk]))
             scope = self.data.get(key)
             if not scope:
                 scope = {}
                 self.data[key] = scope
+            self.changed.add(key)
             for vk, vv in record['value'].items():
                 # skip optional fields
-                if vk not in s.values:
+                if vk not in values:
                     continue
-                if not s.values.get('have-' + vk, True):
+                if not values.get('have-' + vk, True):
                     continue
 
                 key = entry_name + "/" + vk
@@ -132,12 +145,14 @@ class Stats(Analyzer):
                         if 'max' in vv.values and 'min' in vv.values:
                             data['min'] = int(vv.values['max'])
                             data['max'] = int(vv.values['min'])
+                        if self.percentiles:
+                            data['hist'] = LogHistogram()
                     else:
                         # aggregated: don't average, collect first value
-                        data['min'] = int(s.values[vk])
+                        data['min'] = int(values[vk])
                     scope[key] = data
                 # update min/max/sum and count via value
-                dv = int(s.values[vk])
+                dv = int(values[vk])
                 data['num'] += 1
                 if 'sum' in data:
                     data['sum'] += dv
@@ -145,34 +160,200 @@ class Stats(Analyzer):
                         data['min'] = min(dv, data['min'])
                     if 'max' in data:
                         data['max'] = max(dv, data['max'])
+                    if 'hist' in data:
+                        data['hist'].add(dv)
                 else:
                     # aggregated: collect last value
                     data['max'] = dv
 
-    def report(self):
-        # headline
-        print("%-45s: %30s: %16s/%16s/%16s" % (
-            'scope', 'value', 'min', 'avg', 'max'))
+    def handle_trace_store(self, store):
+        for c in store.class_events:
+            self.handle_tracer_class(c['event'])
+
+        order = store.order()
+        # first appearance of each scope and value, to create them in the same
+        # order as handle_tracer_entry() does
+        scopes = {}
+        values = {}
+        for entry_name, record in self.records.items():
+            if self.classes:
+                if not any([fnmatch(entry_name, c) for c in self.classes]):
+                    continue
+            c = store.classes.get(entry_name)
+            if not c or not c['rows']:
+                continue
+            seq = np.flatnonzero(order == c['ix'])
+
+            for si, (sk, sv) in enumerate(record['scope'].items()):
+                ids, first, groups = np.unique(store.column(entry_name, sk),
+                                               return_index=True, return_inverse=True)
+                ids = ids.tolist()
+                if store.is_string(entry_name, sk):
+                    ids = [store.strings[i] for i in ids]
+                elif c['types'][sk] == 'boolean':
+                    ids = [bool(i) for i in ids]
+                prefix = _SCOPE_RELATED_TO[sv.values['related-to']] + ":"
+                keys = [prefix + str(i) for i in ids]
+                for key, pos in zip(keys, seq[first].tolist()):
+                    scopes[key] = min(scopes.get(key, (pos, si)), (pos, si))
+
+                for vi, (vk, vv) in enumerate(record['value'].items()):
+                    # skip optional fields
+                    if vk not in c['types']:
+                        continue
+                    column = store.column(entry_name, vk)
+                    rows = None
+                    if ('have-' + vk) in c['types']:
+                        rows = np.flatnonzero(store.column(entry_name, 'have-' + vk))
+                        if not len(rows):
+                            continue
+                        column = column[rows]
+                    vgroups = groups if rows is None else groups[rows]
+                    vseq = seq if rows is None else seq[rows]
+                    aggregated = '_FLAGS_AGGREGATED' in vv.values.get('flags', '')
+                    vkey = entry_name + "/" + vk
+
+                    hists = {}
+                    if self.percentiles and not aggregated:
+                        hists = group_values(vgroups, column)
+                    for g, num, sum_, mi, ma, fi, la in zip(*aggregate_groups(vgroups, column)):
+                        key = (keys[g], vkey)
+                        first_pos = (int(vseq[fi]), si, vi)
+                        last_pos = (int(vseq[la]), si, vi)
+                        part = {'first': first_pos, 'last': last_pos, 'num': num}
+                        if not aggregated:
+                            part['sum'] = sum_
+                            part['min'] = min(mi, int(vv.values['max']))
+                            part['max'] = max(ma, int(vv.values['min']))
+                            if self.percentiles:
+                                part['hist'] = LogHistogram()
+                                part['hist'].add_array(hists[g])
+                        else:
+                            part['min'] = int(column[fi])
+                            part['max'] = int(column[la])
+                        data = values.get(key)
+                        if not data:
+                            values[key] = part
+                            continue
+                        data['num'] += num
+                        if 'sum' in data:
+                            data['sum'] += part['sum']
+                            data['min'] = min(data['min'], part['min'])
+                            data['max'] = max(data['max'], part['max'])
+                            if 'hist' in data:
+                                data['hist'].merge(part['hist'])
+                        else:
+                            # aggregated: keep the first and the last value
+                            if part['first'] < data['first']:
+                                data['min'] = part['min']
+                            if part['last'] > data['last']:
+                                data['max'] = part['max']
+                        data['first'] = min(data['first'], part['first'])
+                        data['last'] = max(data['last'], part['last'])
+
+        for key in sorted(scopes, key=scopes.get):
+            self.data.setdefault(key, {})
+        for key in sorted(values, key=lambda k: values[k]['first']):
+            data = values[key]
+            del data['first']
+            del data['last']
+            self.data[key[0]][key[1]] = data
+        return True
+
+    def merge(self, other):
+        self.records.update(other.records)
+        for sk, sv in other.data.items():
+            scope = self.data.setdefault(sk, {})
+            for tk, tv in sv.items():
+                data = scope.get(tk)
+                if not data:
+                    scope[tk] = tv
+                    continue
+                data['num'] += tv['num']
+                if 'sum' in data:
+                    data['sum'] += tv['sum']
+                    if 'min' in data:
+                        data['min'] = min(tv['min'], data['min'])
+                    if 'max' in data:
+                        data['max'] = max(tv['max'], data['max'])
+                    if 'hist' in data:
+                        data['hist'].merge(tv['hist'])
+                else:
+                    # aggregated: keep our first value, take their last value
+                    data['max'] = tv['max']
+
+    def rows(self, scopes=None):
         # iterate scopes
         for sk, sv in self.data.items():
+            if scopes is not None and sk not in scopes:
+                continue
             # iterate tracers
             for tk, tv in sv.items():
-                mi = tv.get('min', '-')
-                ma = tv.get('max', '-')
-                if 'sum' in tv:
-                    avg = tv['sum'] / tv['num']
-                else:
-                    avg = '-'
-                if mi == ma:
-                    mi = ma = '-'
-                if is_time_field(tk):
-                    if mi != '-':
-                        mi = format_ts(mi)
-                    if ma != '-':
-                        ma = format_ts(ma)
-                    if avg != '-':
-                        avg = format_ts(avg)
-                print("%-45s: %30s: %16s/%16s/%16s" % (sk, tk, mi, avg, ma))
+                row = {
+                    'scope': sk,
+                    'value': tk,
+                    'num': tv['num'],
+                    'min': tv.get('min'),
+                    'avg': tv['sum'] / tv['num'] if 'sum' in tv else None,
+                    'max': tv.get('max'),
+                }
+                if self.percentiles:
+                    hist = tv.get('hist')
+                    for name, q in _PERCENTILES:
+                        row[name] = hist.quantile(q) if hist else None
+                    row['histogram'] = hist.log2_buckets() if hist else None
+                yield row
+
+    def report(self, scopes=None, output_format='text'):
+        if output_format == 'csv':
+            self._report_csv(scopes)
+        elif output_format == 'json':
+            self._report_json(scopes)
+        else:
+            self._report_text(scopes)
+
+    def _report_text(self, scopes):
+        line = "%-45s: %30s: %16s/%16s/%16s"
+        names = ['min', 'avg', 'max']
+        if self.percentiles:
+            line += " %16s/%16s/%16s/%16s"
+            names += [name for name, q in _PERCENTILES]
+        # headline
+        print(line % tuple(['scope', 'value'] + names))
+        for row in self.rows(scopes):
+            mi = row['min']
+            ma = row['max']
+            if mi == ma:
+                mi = ma = None
+            values = [mi, row['avg'], ma] + [row.get(name) for name, q in _PERCENTILES]
+            if is_time_field(row['value']):
+                values = [format_ts(v) if v is not None else None for v in values]
+            values = ['-' if v is None else v for v in values]
+            print(line % tuple([row['scope'], row['value']] + values[:len(names)]))
+
+    def _report_csv(self, scopes):
+        names = ['scope', 'value', 'num', 'min', 'avg', 'max']
+        if self.percentiles:
+            names += [name for name, q in _PERCENTILES]
+        writer = csv.DictWriter(sys.stdout, names, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(self.rows(scopes))
+
+    def _report_json(self, scopes):
+        data = {}
+        for row in self.rows(scopes):
+            data.setdefault(row.pop('scope'), {})[row.pop('value')] = row
+        print(json.dumps(data))
+
+    def report_changes(self, output_format='text'):
+        # only report scopes that got new values since the last call
+        if not self.changed:
+            return
+        self.report(self.changed, output_format)
+        if output_format == 'text':
+            print()
+        sys.stdout.flush()
+        self.changed = set()
 
 
 class ListClasses(Analyzer):
@@ -210,18 +391,51 @@ if __name__ == '__main__':
                         help='tracer class selector (default: all)')
     parser.add_argument('-l', '--list-classes', action='store_true',
                         help='show tracer classes')
+    parser.add_argument('-j', '--jobs', action='store', default=1, type=int,
+                        help='number of processes used to parse the log (default: 1)')
+    parser.add_argument('-p', '--percentiles', action='store_true',
+                        help='also report percentiles of the non aggregated values')
+    parser.add_argument('--format', action='store', default='text', choices=('text', 'csv', 'json'),
+                        help='output format (default: text)')
+    parser.add_argument('-f', '--follow', action='store_true',
+                        help='keep reading the log while it grows, implies -i')
+    parser.add_argument('-i', '--interval', action='store', default=None, type=float,
+                        help='print changed entries every INTERVAL seconds while reading (default: 2 with -f)')
     args = parser.parse_args()
 
+    live = args.follow or (args.interval is not None)
+    if live and args.interval is None:
+        args.interval = 2.0
+
     analyzer = None
     if args.list_classes:
         analyzer = ListClasses()
     else:
-        analyzer = stats = Stats(args.classes)
+        analyzer = stats = Stats(args.classes, args.percentiles)
 
-    with Parser(args.file) as log:
-        runner = AnalysisRunner(log)
+    if is_trace_store(args.file):
+        runner = StoreRunner(TraceStore(args.file))
         runner.add_analyzer(analyzer)
         runner.run()
+    elif live and not args.list_classes:
+        # a pipe is read until it gets closed, a file until we get interrupted
+        follow = args.follow or args.file == '-'
+        with MmapParser(args.file, follow=follow) as log:
+            runner = AnalysisRunner(log)
+            runner.add_analyzer(analyzer)
+            try:
+                runner.run(args.interval, partial(stats.report_changes, args.format))
+            except KeyboardInterrupt:
+                pass
+    elif args.jobs > 1 and not args.list_classes and args.file != '-':
+        runner = ParallelAnalysisRunner(args.file, partial(Stats, args.classes, args.percentiles),
+                                        args.jobs)
+        stats = runner.run()
+    else:
+        with MmapParser(args.file) as log:
+            runner = AnalysisRunner(log)
+            runner.add_analyzer(analyzer)
+            runner.run()
 
     if not args.list_classes:
-        stats.report()
+        stats.report(output_format=args.format)
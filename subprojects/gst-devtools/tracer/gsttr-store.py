@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+'''
+Convert a tracer log into a columnar trace store. The other tracer tools accept
+the store instead of the log and don't need to parse the log again.
+
+How to run:
+1) generate some log
+GST_DEBUG="GST_TRACER:7" GST_TRACERS="stats;rusage;latency" GST_DEBUG_FILE=trace.log <application>
+
+2) convert it
+python3 gsttr-store.py trace.log trace.store
+
+3) run the tools on the store (requires numpy)
+python3 gsttr-stats.py -c latency trace.store
+python3 gsttr-tsplot.py trace.store <outdir>
+'''
+
+import logging
+from tracer.analysis_runner import AnalysisRunner
+from tracer.parser import MmapParser
+from tracer.store import TraceStoreWriter
+
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger('gsttr-store')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file', nargs='?', default='debug.log')
+    parser.add_argument('store', nargs='?', default='debug.store')
+    args = parser.parse_args()
+
+    writer = TraceStoreWriter(args.store)
+    with MmapParser(args.file) as log:
+        runner = AnalysisRunner(log)
+        runner.add_analyzer(writer)
+        runner.run()
+    writer.close(args.file)
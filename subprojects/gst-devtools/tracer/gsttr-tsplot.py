@@ -10,6 +10,10 @@ GST_DEBUG="GST_TRACER:7" GST_TRACERS=stats GST_DEBUG_FILE=trace.log <application
 2) generate the images
 python3 gsttr-tsplot.py trace.log <outdir>
 eog <outdir>/*.png
+
+3) for long recordings, reduce dense series to the min/max per pixel column
+   (requires numpy)
+python3 gsttr-tsplot.py -d trace.log <outdir>
 '''
 
 # TODO:
@@ -24,12 +28,14 @@ eog <outdir>/*.png
 
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import Popen, PIPE, DEVNULL
 from string import Template
 from tracer.analysis_runner import AnalysisRunner
 from tracer.analyzer import Analyzer
-from tracer.parser import Parser
-from tracer.structure import Structure
+from tracer.parser import MmapParser
+from tracer.series import Series, np
+from tracer.store import StoreRunner, TraceStore, is_trace_store
 
 
 logging.basicConfig(level=logging.WARNING)
@@ -63,11 +69,11 @@ _PLOT_SCRIPT_BODY = Template(
     set ylabel "Buffer Time (sec.msec)" offset 1,0
     set yrange [*:*]
     set ytics
-    plot '$buf_file_name' using 1:2 with linespoints ls 1 notitle
+    plot $$buf$ix using 1:2 with linespoints ls 1 notitle
 
     set xrange restore
     set ylabel "Duration (sec.msec)" offset 1,0
-    plot '$buf_file_name' using 1:3 with linespoints ls 1title "cycle", \
+    plot $$buf$ix using 1:3 with linespoints ls 1title "cycle", \
          '' using 1:4 with linespoints ls 2 title "duration"
 
     set xrange restore
@@ -76,11 +82,17 @@ _PLOT_SCRIPT_BODY = Template(
     set ylabel "Events" offset 1,0
     set yrange [$ypos_max:10]
     set ytics format ""
-    plot '$ev_file_name' using 1:4:3:(0) with vectors heads size screen 0.008,90 ls 1 notitle, \
+    plot $$ev$ix using 1:4:3:(0) with vectors heads size screen 0.008,90 ls 1 notitle, \
          '' using 2:4 with points ls 1 notitle, \
          '' using 2:4:5 with labels font ',7' offset char 0,-0.5 notitle
     unset multiplot
+    undefine $$buf$ix $$ev$ix
     ''')
+_PLOT_DATA = Template(
+    '''
+$$$name << EOD
+${data}EOD
+''')
 
 
 class TsPlot(Analyzer):
@@ -91,7 +103,9 @@ class TsPlot(Analyzer):
     stalled elements.
     '''
 
-    def __init__(self, outdir, show_ghost_pads, size):
+    tracer_classes = _HANDLED_CLASSES
+
+    def __init__(self, outdir, show_ghost_pads, size, decimate=False):
         super(TsPlot, self).__init__()
         self.outdir = outdir
         self.show_ghost_pads = show_ghost_pads
@@ -99,9 +113,10 @@ class TsPlot(Analyzer):
             'width': size[0],
             'height': size[1],
         }
-        self.buf_files = {}
+        self.decimate = decimate
+        self.buf_series = {}
         self.buf_cts = {}
-        self.ev_files = {}
+        self.ev_rows = {}
         self.element_names = {}
         self.element_info = {}
         self.pad_names = {}
@@ -110,17 +125,7 @@ class TsPlot(Analyzer):
         self.ev_data = {}
         self.ev_ypos = {}
 
-    def _get_data_file(self, files, key, name_template):
-        data_file = files.get(key)
-        if not data_file:
-            pad_name = self.pad_names.get(key)
-            if pad_name:
-                file_name = name_template % (self.outdir, key, pad_name)
-                data_file = open(file_name, 'w')
-                files[key] = data_file
-        return data_file
-
-    def _log_event_data(self, pad_file, ix):
+    def _log_event_data(self, ix):
         data = self.ev_data.get(ix)
         if not data:
             return
@@ -130,18 +135,18 @@ class TsPlot(Analyzer):
         # TODO: scale 'y' according to max-y of buf or do a multiplot
         y = (1 + data['ypos']) * -10
         if ct == 1:
-            pad_file.write('%f %f %f %f "%s"\n' % (x1, x1, 0.0, y, line))
+            row = '%f %f %f %f "%s"\n' % (x1, x1, 0.0, y, line)
         else:
             x2 = data['last-ts']
             xd = (x2 - x1)
             xm = x1 + xd / 2
-            pad_file.write('%f %f %f %f "%s (%d)"\n' % (x1, xm, xd, y, line, ct))
+            row = '%f %f %f %f "%s (%d)"\n' % (x1, xm, xd, y, line, ct)
+        self.ev_rows.setdefault(ix, []).append(row)
 
     def _log_event(self, s):
         # build a [ts, event-name] data file
         ix = int(s.values['pad-ix'])
-        pad_file = self._get_data_file(self.ev_files, ix, '%s/ev_%d_%s.dat')
-        if not pad_file:
+        if ix not in self.pad_names:
             return
         # convert timestamps to seconds
         x = int(s.values['ts']) / 1e9
@@ -154,7 +159,7 @@ class TsPlot(Analyzer):
             data['ct'] += 1
             data['last-ts'] = x
         else:
-            self._log_event_data(pad_file, ix)
+            self._log_event_data(ix)
             # start new data, assign a -y coord by event type
             if ix not in self.ev_ypos:
                 ypos = {}
@@ -176,14 +181,16 @@ class TsPlot(Analyzer):
     def _log_buffer(self, s):
         if not int(s.values['have-buffer-pts']):
             return
-        # build a [ts, buffer-pts] data file
+        # build a [ts, buffer-pts] series
         ix = int(s.values['pad-ix'])
-        pad_file = self._get_data_file(self.buf_files, ix, '%s/buf_%d_%s.dat')
-        if not pad_file:
+        if ix not in self.pad_names:
             return
+        series = self.buf_series.get(ix)
+        if series is None:
+            series = self.buf_series[ix] = Series(('cts', 'pts', 'dcts', 'dur'))
         flags = int(s.values['buffer-flags'])
         if flags & _GST_BUFFER_FLAG_DISCONT:
-            pad_file.write('\n')
+            series.add_break()
         # convert timestamps to e.g. seconds
         cts = int(s.values['ts']) / 1e9
         pts = int(s.values['buffer-pts']) / 1e9
@@ -193,26 +200,10 @@ class TsPlot(Analyzer):
         else:
             dcts = cts - self.buf_cts[ix]
         self.buf_cts[ix] = cts
-        pad_file.write('%f %f %f %f\n' % (cts, pts, dcts, dur))
-
-    def handle_tracer_entry(self, event):
-        if event[Parser.F_FUNCTION]:
-            return
-
-        msg = event[Parser.F_MESSAGE]
-        p = msg.find(',')
-        if p == -1:
-            return
-        entry_name = msg[:p]
-        if entry_name not in _HANDLED_CLASSES:
-            return
-
-        try:
-            s = Structure(msg)
-        except ValueError:
-            logger.warning("failed to parse: '%s'", msg)
-            return
+        series.append(cts, pts, dcts, dur)
 
+    def handle_tracer_structure(self, event, s):
+        entry_name = s.name
         if entry_name == 'new-element':
             ix = int(s.values['ix'])
             self.element_names[ix] = s.values['name']
@@ -231,37 +222,45 @@ class TsPlot(Analyzer):
         else:  # 'buffer'
             self._log_buffer(s)
 
-    def report(self):
-        for ix, pad_file in self.ev_files.items():
-            self._log_event_data(pad_file, ix)
-            pad_file.close()
-
-        script = _PLOT_SCRIPT_HEAD.substitute(self.params)
-        for ix, pad_file in self.buf_files.items():
-            pad_file.close()
-            name = self.pad_names[ix]
-            buf_file_name = '%s/buf_%d_%s.dat' % (self.outdir, ix, name)
-            ev_file_name = '%s/ev_%d_%s.dat' % (self.outdir, ix, name)
-            png_file_name = '%s/%d_%s.png' % (self.outdir, ix, name)
-            sub_title = self.pad_info[ix]
-            ypos_max = (2 + len(self.ev_ypos[ix])) * -10
-            script += _PLOT_SCRIPT_BODY.substitute(self.params, title=name,
-                subtitle=sub_title, buf_file_name=buf_file_name,
-                ev_file_name=ev_file_name, png_file_name=png_file_name,
-                ypos_max=ypos_max)
-        # plot PNGs
+    def _plot_script(self, ix):
+        name = self.pad_names[ix]
+        width = self.params['width'] if self.decimate else 0
+        ev_rows = self.ev_rows.get(ix)
+        if not ev_rows:
+            # keep the event plot valid, the row is outside of the y range
+            ev_rows = ['0 0 0 10 ""\n']
+        script = _PLOT_DATA.substitute(name='buf%d' % ix,
+            data=self.buf_series[ix].format('%f %f %f %f', width))
+        script += _PLOT_DATA.substitute(name='ev%d' % ix, data=''.join(ev_rows))
+        ypos_max = (2 + len(self.ev_ypos.get(ix, {}))) * -10
+        script += _PLOT_SCRIPT_BODY.substitute(self.params, ix=ix, title=name,
+            subtitle=self.pad_info[ix],
+            png_file_name='%s/%d_%s.png' % (self.outdir, ix, name),
+            ypos_max=ypos_max)
+        return script
+
+    def _render(self, pads):
+        # the plot data is passed inline, so each renderer just needs a pipe
         p = Popen(['gnuplot'], stdout=DEVNULL, stdin=PIPE)
-        p.communicate(input=script.encode('utf-8'))
+        try:
+            p.stdin.write(_PLOT_SCRIPT_HEAD.substitute(self.params).encode('utf-8'))
+            for ix in pads:
+                p.stdin.write(self._plot_script(ix).encode('utf-8'))
+            p.stdin.close()
+        except BrokenPipeError:
+            logger.warning('gnuplot exited early')
+        return p.wait()
+
+    def report(self, jobs=1):
+        for ix in list(self.ev_data):
+            self._log_event_data(ix)
+        self.ev_data = {}
 
-        # cleanup
-        for ix, pad_file in self.buf_files.items():
-            name = self.pad_names[ix]
-            buf_file_name = '%s/buf_%d_%s.dat' % (self.outdir, ix, name)
-            os.unlink(buf_file_name)
-        for ix, pad_file in self.ev_files.items():
-            name = self.pad_names[ix]
-            ev_file_name = '%s/ev_%d_%s.dat' % (self.outdir, ix, name)
-            os.unlink(ev_file_name)
+        # plot PNGs, spread the pads over a few renderer processes
+        pads = sorted(self.buf_series)
+        jobs = max(1, min(jobs, len(pads)))
+        with ThreadPoolExecutor(jobs) as pool:
+            list(pool.map(self._render, [pads[i::jobs] for i in range(jobs)]))
 
 
 if __name__ == '__main__':
@@ -273,15 +272,26 @@ if __name__ == '__main__':
                         help='also plot data for ghost-pads')
     parser.add_argument('-s', '--size', action='store', default='1600x600',
                         help='graph size as WxH')
+    parser.add_argument('-d', '--decimate', action='store_true',
+                        help='reduce dense series to the min/max per pixel column')
+    parser.add_argument('-j', '--jobs', action='store', type=int, default=os.cpu_count(),
+                        help='number of renderer processes (default: number of cpus)')
     args = parser.parse_args()
+    if args.decimate and np is None:
+        parser.error('--decimate requires numpy')
 
     os.makedirs(args.outdir, exist_ok=True)
     size = [int(s) for s in args.size.split('x')]
 
-    with Parser(args.file) as log:
-        tsplot = TsPlot(args.outdir, args.ghost_pads, size)
-        runner = AnalysisRunner(log)
+    tsplot = TsPlot(args.outdir, args.ghost_pads, size, args.decimate)
+    if is_trace_store(args.file):
+        runner = StoreRunner(TraceStore(args.file))
         runner.add_analyzer(tsplot)
         runner.run()
+    else:
+        with MmapParser(args.file) as log:
+            runner = AnalysisRunner(log)
+            runner.add_analyzer(tsplot)
+            runner.run()
 
-        tsplot.report()
+    tsplot.report(args.jobs)
@@ -1,7 +1,18 @@
+import logging
+import multiprocessing
+import os
+import time
+
 try:
-    from tracer.parser import Parser
+    from tracer.analyzer import Analyzer
+    from tracer.parser import MmapParser, Parser, is_compressed, split_log
+    from tracer.structure import Structure, StructureDecoder
 except BaseException:
-    from parser import Parser
+    from analyzer import Analyzer
+    from parser import MmapParser, Parser, is_compressed, split_log
+    from structure import Structure, StructureDecoder
+
+logger = logging.getLogger('analysis_runner')
 
 
 class AnalysisRunner(object):
@@ -9,22 +20,73 @@ class AnalysisRunner(object):
     Runs several Analyzers over a log.
 
     Iterates log using a Parser and dispatches to a set of analyzers.
+    Analyzers that subscribe to tracer classes only get the entries of these
+    classes, each entry is parsed once no matter how many analyzers get it.
     """
 
     def __init__(self, log):
         self.log = log
         self.analyzers = []
+        # analyzers that get all entries unparsed
+        self.entry_analyzers = []
+        # analyzers that subscribe to tracer classes
+        self.structure_analyzers = []
+        # entry name -> decoder from the tracer class
+        self.decoders = {}
+        # entry name -> subscribed analyzers
+        self.routes = {}
 
     def add_analyzer(self, analyzer):
         self.analyzers.append(analyzer)
+        if analyzer.tracer_classes is None:
+            self.entry_analyzers.append(analyzer)
+        else:
+            self.structure_analyzers.append(analyzer)
+        self.routes = {}
 
     def handle_tracer_class(self, event):
+        if self.structure_analyzers:
+            try:
+                s = Structure(event[Parser.F_MESSAGE])
+                decoder = StructureDecoder(s)
+                self.decoders.setdefault(decoder.name, decoder)
+            except (ValueError, KeyError, AttributeError):
+                logger.warning("failed to parse: '%s'", event[Parser.F_MESSAGE])
         for analyzer in self.analyzers:
             analyzer.handle_tracer_class(event)
+        # subscriptions can depend on the classes an analyzer has seen
+        self.routes = {}
 
     def handle_tracer_entry(self, event):
-        for analyzer in self.analyzers:
+        for analyzer in self.entry_analyzers:
             analyzer.handle_tracer_entry(event)
+        if not self.structure_analyzers or event[Parser.F_FUNCTION]:
+            return
+
+        msg = event[Parser.F_MESSAGE]
+        p = msg.find(',')
+        if p == -1:
+            return
+        name = msg[:p]
+        analyzers = self.routes.get(name)
+        if analyzers is None:
+            analyzers = [a for a in self.structure_analyzers if a.subscribes(name)]
+            self.routes[name] = analyzers
+        if not analyzers:
+            return
+
+        s = None
+        decoder = self.decoders.get(name)
+        if decoder:
+            s = decoder.decode_structure(msg)
+        if s is None:
+            try:
+                s = Structure(msg)
+            except ValueError:
+                logger.warning("failed to parse: '%s'", msg)
+                return
+        for analyzer in analyzers:
+            analyzer.handle_tracer_structure(event, s)
 
     def is_tracer_class(self, event):
         return (event[Parser.F_FILENAME] == 'gsttracerrecord.c'
@@ -34,7 +96,18 @@ class AnalysisRunner(object):
     def is_tracer_entry(self, event):
         return (not event[Parser.F_LINE] and not event[Parser.F_FILENAME])
 
-    def run(self):
+    def run(self, interval=None, callback=None):
+        """
+        Dispatch all events of the log to the analyzers.
+
+        If an interval is given, callback() is called every 'interval' seconds
+        while the log is read. This is meant to be used with a parser in follow
+        mode, as it also hands back control while waiting for new lines.
+        """
+        if interval:
+            self._run_live(interval, callback)
+            return
+
         try:
             for event in self.log:
                 # check if it is a tracer.class or tracer event
@@ -46,3 +119,86 @@ class AnalysisRunner(object):
                 #    print("unhandled:", repr(event))
         except StopIteration:
             pass
+
+    def _run_live(self, interval, callback):
+        next_update = time.monotonic() + interval
+        try:
+            for event in self.log:
+                if event is not None:
+                    if self.is_tracer_entry(event):
+                        self.handle_tracer_entry(event)
+                    elif self.is_tracer_class(event):
+                        self.handle_tracer_class(event)
+                now = time.monotonic()
+                if now >= next_update:
+                    callback()
+                    next_update = now + interval
+        except StopIteration:
+            pass
+
+
+def _find_tracer_classes(filename, start, end):
+    runner = AnalysisRunner(None)
+    with MmapParser(filename, start, end) as log:
+        # only parse lines that can be a class record
+        log.file = (line for line in log.file if b'.class' in line)
+        return [event for event in log if runner.is_tracer_class(event)]
+
+
+def _run_range(factory, filename, start, end, classes):
+    analyzer = factory()
+    with MmapParser(filename, start, end) as log:
+        runner = AnalysisRunner(log)
+        runner.add_analyzer(analyzer)
+        for event in classes:
+            runner.handle_tracer_class(event)
+        runner.run()
+    return analyzer
+
+
+class ParallelAnalysisRunner(object):
+    """
+    Runs an Analyzer over a log file using a pool of processes.
+
+    The log is split into byte ranges at line boundaries. Each worker creates
+    its own analyzer by calling factory(), replays the tracer classes logged
+    before its range and then parses its range. The partial analyzers are
+    combined in log order using Analyzer.merge(), hence the analyzer ends up
+    with the same data as when running it serially. Compressed logs are
+    parsed in a single pass.
+
+    The analyzer must implement merge(), run() raises a TypeError otherwise.
+    """
+
+    def __init__(self, filename, factory, jobs=None):
+        self.filename = filename
+        self.factory = factory
+        self.jobs = jobs or os.cpu_count()
+
+    def run(self):
+        analyzer = self.factory()
+        if type(analyzer).merge is Analyzer.merge:
+            raise TypeError('%s does not implement merge() and can not be run '
+                            'in parallel' % type(analyzer).__name__)
+
+        if is_compressed(self.filename):
+            # a compressed log can only be read from the start
+            return _run_range(self.factory, self.filename, 0, None, [])
+        ranges = split_log(self.filename, self.jobs)
+        if not ranges:
+            return analyzer
+
+        with multiprocessing.Pool(min(self.jobs, len(ranges))) as pool:
+            found = pool.starmap(_find_tracer_classes,
+                                 [(self.filename, s, e) for s, e in ranges])
+            args = []
+            classes = []
+            for (start, end), range_classes in zip(ranges, found):
+                args.append((self.factory, self.filename, start, end, list(classes)))
+                classes.extend(range_classes)
+            parts = pool.starmap(_run_range, args)
+
+        analyzer = parts[0]
+        for part in parts[1:]:
+            analyzer.merge(part)
+        return analyzer
@@ -1,6 +1,10 @@
+import os
+import tempfile
 import unittest
 
-from tracer.analysis_runner import AnalysisRunner
+from tracer.analysis_runner import AnalysisRunner, ParallelAnalysisRunner
+from tracer.analyzer import Analyzer
+from tracer.parser import Parser
 
 TRACER_CLASS = (
     '0:00:00.036373170', 1788, '0x23bca70', 'TRACE', 'GST_TRACER',
@@ -15,6 +19,40 @@ TRACER_ENTRY = (
 )
 
 
+class CountingAnalyzer(Analyzer):
+
+    def __init__(self):
+        super(CountingAnalyzer, self).__init__()
+        self.classes = 0
+        self.entries = []
+
+    def handle_tracer_class(self, event):
+        self.classes += 1
+
+    def handle_tracer_entry(self, event):
+        self.entries.append(event[Parser.F_TIME])
+
+    def merge(self, other):
+        self.entries.extend(other.entries)
+
+
+class SubscribingAnalyzer(Analyzer):
+
+    def __init__(self, tracer_classes):
+        super(SubscribingAnalyzer, self).__init__()
+        self.tracer_classes = tracer_classes
+        self.structures = []
+
+    def handle_tracer_structure(self, event, s):
+        self.structures.append(s)
+
+
+def _entry(msg):
+    event = list(TRACER_ENTRY)
+    event[Parser.F_MESSAGE] = msg
+    return event
+
+
 class TestAnalysisRunner(unittest.TestCase):
 
     def test_detect_tracer_class(self):
@@ -24,3 +62,68 @@ class TestAnalysisRunner(unittest.TestCase):
     def test_detect_tracer_entry(self):
         a = AnalysisRunner(None)
         self.assertTrue(a.is_tracer_entry(TRACER_ENTRY))
+
+    def test_dispatch_to_subscribers(self):
+        a = AnalysisRunner(None)
+        latency = SubscribingAnalyzer(['latency'])
+        pattern = SubscribingAnalyzer(['lat*', 'buffer'])
+        other = SubscribingAnalyzer(['buffer'])
+        counting = CountingAnalyzer()
+        for analyzer in (latency, pattern, other, counting):
+            a.add_analyzer(analyzer)
+        a.handle_tracer_class(TRACER_CLASS)
+        a.handle_tracer_entry(TRACER_ENTRY)
+        a.handle_tracer_entry(_entry('event, name=(string)eos;'))
+
+        self.assertEqual(len(latency.structures), 1)
+        s = latency.structures[0]
+        self.assertEqual(s.name, 'latency')
+        self.assertEqual(s.values['src'], 'source_src')
+        # parsed once for all subscribers
+        self.assertIs(pattern.structures[0], s)
+        self.assertEqual(other.structures, [])
+        self.assertEqual(len(counting.entries), 2)
+
+    def test_dispatch_without_tracer_class(self):
+        a = AnalysisRunner(None)
+        analyzer = SubscribingAnalyzer(['*'])
+        a.add_analyzer(analyzer)
+        a.handle_tracer_entry(TRACER_ENTRY)
+        self.assertEqual(analyzer.structures[0].values['time'], '47091349')
+
+
+class TestParallelAnalysisRunner(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.log')
+        with os.fdopen(fd, 'w') as f:
+            f.write('%s  %d %s %s             %s %s:%d:%s: %s\n' % (
+                TRACER_CLASS[:8] + TRACER_CLASS[9:]))
+            for i in range(200):
+                f.write('0:00:00.%09d  1788 0x7f8a201056d0 TRACE             GST_TRACER :0:: %s\n' % (
+                    i, TRACER_ENTRY[-1].replace('47091349', str(i))))
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def test_parallel_run_matches_serial_run(self):
+        serial = CountingAnalyzer()
+        with Parser(self.filename) as log:
+            runner = AnalysisRunner(log)
+            runner.add_analyzer(serial)
+            runner.run()
+
+        parallel = ParallelAnalysisRunner(self.filename, CountingAnalyzer, 4).run()
+        self.assertEqual(serial.entries, parallel.entries)
+        self.assertEqual(len(parallel.entries), 200)
+        self.assertEqual(parallel.entries[-1], '0:00:00.000000199')
+
+    def test_tracer_classes_are_replayed(self):
+        runner = ParallelAnalysisRunner(self.filename, CountingAnalyzer, 4)
+        # each part sees the class record once
+        self.assertEqual(runner.run().classes, 1)
+
+    def test_analyzer_without_merge_is_refused(self):
+        runner = ParallelAnalysisRunner(self.filename, Analyzer, 4)
+        with self.assertRaisesRegex(TypeError, 'Analyzer does not implement merge'):
+            runner.run()
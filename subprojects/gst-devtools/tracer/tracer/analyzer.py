@@ -1,10 +1,20 @@
+from fnmatch import fnmatch
+
+
 class Analyzer(object):
     """
     Base class for a gst tracer analyzer.
 
     Will be used in conjunction with a AnalysisRunner.
+
+    tracer_classes -- names (or fnmatch patterns) of the tracer classes the
+    analyzer subscribes to. If set, the runner parses the entries of these
+    classes once for all analyzers and calls handle_tracer_structure() instead
+    of handle_tracer_entry().
     """
 
+    tracer_classes = None
+
     def __init__(self):
         pass
 
@@ -13,3 +23,36 @@ class Analyzer(object):
 
     def handle_tracer_entry(self, event):
         pass
+
+    def subscribes(self, name):
+        """Whether the analyzer wants the entries of the tracer class 'name'."""
+        return any(fnmatch(name, c) for c in self.tracer_classes)
+
+    def handle_tracer_structure(self, event, s):
+        """
+        Handle an entry of a subscribed tracer class.
+
+        's' is the parsed Structure of the entry message, it is shared between
+        the analyzers and must not be modified.
+        """
+        pass
+
+    def handle_trace_store(self, store):
+        """
+        Analyze a TraceStore using its columns.
+
+        Return True if the store has been handled, otherwise the StoreRunner
+        replays the log entries to handle_tracer_class/entry().
+        """
+        return False
+
+    def merge(self, other):
+        """
+        Merge the results of another analyzer instance into this one.
+
+        'other' has analyzed the part of the log following the part this
+        analyzer has seen. Analyzers run with a ParallelAnalysisRunner must
+        override it, the runner refuses the ones that do not.
+        """
+        raise NotImplementedError(
+            '%s does not implement merge()' % type(self).__name__)
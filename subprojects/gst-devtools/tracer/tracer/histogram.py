@@ -0,0 +1,118 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class LogHistogram(object):
+    """
+    Histogram with logarithmically sized buckets.
+
+    Bucket i holds the values in (gamma^(i-1), gamma^i], so quantiles are
+    estimated with a relative error of at most 'accuracy'. The number of
+    buckets only depends on the range of the values (about 2200 for the whole
+    guint64 range at 1%) and is capped by collapsing the lowest buckets.
+    Histograms with the same parameters can be merged.
+    """
+
+    def __init__(self, accuracy=0.01, max_buckets=2048):
+        self.accuracy = accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.inv_log_gamma = 1 / math.log(self.gamma)
+        self.pos = {}
+        self.neg = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, v):
+        if v > 0:
+            i = math.ceil(math.log(v) * self.inv_log_gamma)
+            self.pos[i] = self.pos.get(i, 0) + 1
+        elif v < 0:
+            i = math.ceil(math.log(-v) * self.inv_log_gamma)
+            self.neg[i] = self.neg.get(i, 0) + 1
+        else:
+            self.zero += 1
+        self.count += 1
+        if len(self.pos) + len(self.neg) > self.max_buckets:
+            self._collapse()
+
+    def add_array(self, values):
+        """Add all values of a numpy array."""
+        values = values.astype(np.float64)
+        for buckets, v in ((self.pos, values[values > 0]), (self.neg, -values[values < 0])):
+            if len(v):
+                ix, counts = np.unique(np.ceil(np.log(v) * self.inv_log_gamma),
+                                       return_counts=True)
+                for i, n in zip(ix.astype(np.int64).tolist(), counts.tolist()):
+                    buckets[i] = buckets.get(i, 0) + n
+        self.zero += int(np.count_nonzero(values == 0))
+        self.count += len(values)
+        if len(self.pos) + len(self.neg) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        # merge the buckets with the smallest magnitudes, preferring positive
+        # values as latencies and durations are positive
+        for buckets in (self.pos, self.neg):
+            excess = len(self.pos) + len(self.neg) - self.max_buckets
+            if excess <= 0:
+                return
+            ix = sorted(buckets)
+            n = min(excess, len(ix) - 1)
+            if n <= 0:
+                continue
+            target = ix[n]
+            for i in ix[:n]:
+                buckets[target] += buckets.pop(i)
+
+    def merge(self, other):
+        for buckets, other_buckets in ((self.pos, other.pos), (self.neg, other.neg)):
+            for i, n in other_buckets.items():
+                buckets[i] = buckets.get(i, 0) + n
+        self.zero += other.zero
+        self.count += other.count
+        if len(self.pos) + len(self.neg) > self.max_buckets:
+            self._collapse()
+
+    def _value(self, i):
+        # representative value with the lowest relative error in the bucket
+        return 2 * self.gamma ** i / (self.gamma + 1)
+
+    def quantile(self, q):
+        """Estimate the q-quantile (0 <= q <= 1), None for an empty histogram."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for i in sorted(self.neg, reverse=True):
+            seen += self.neg[i]
+            if seen > rank:
+                return -self._value(i)
+        seen += self.zero
+        if seen > rank:
+            return 0
+        for i in sorted(self.pos):
+            seen += self.pos[i]
+            if seen > rank:
+                return self._value(i)
+        return self._value(max(self.pos))
+
+    def log2_buckets(self):
+        """
+        Coarse histogram for output.
+
+        Returns a sorted list of (upper bound, count) with power of two upper
+        bounds; negative values are counted in the 0 bucket.
+        """
+        buckets = {}
+        if self.zero or self.neg:
+            buckets[0] = self.zero + sum(self.neg.values())
+        log2_gamma = math.log2(self.gamma)
+        for i, n in self.pos.items():
+            b = 1 << max(0, math.ceil(i * log2_gamma))
+            buckets[b] = buckets.get(b, 0) + n
+        return sorted(buckets.items())
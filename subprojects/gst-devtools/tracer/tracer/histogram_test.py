@@ -0,0 +1,70 @@
+import random
+import unittest
+
+from tracer.histogram import LogHistogram, np
+
+
+class TestLogHistogram(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(0)
+        self.values = [int(rnd.lognormvariate(13, 1.5)) for i in range(10000)]
+
+    def _exact(self, q):
+        values = sorted(self.values)
+        return values[int(q * (len(values) - 1))]
+
+    def test_empty(self):
+        self.assertIsNone(LogHistogram().quantile(0.5))
+
+    def test_quantiles_are_within_accuracy(self):
+        h = LogHistogram()
+        for v in self.values:
+            h.add(v)
+        self.assertEqual(h.count, len(self.values))
+        for q in (0.5, 0.9, 0.99, 0.999):
+            exact = self._exact(q)
+            self.assertLessEqual(abs(h.quantile(q) - exact), exact * 0.01)
+
+    def test_zero_and_negative_values(self):
+        h = LogHistogram()
+        for v in (-100, 0, 0, 100):
+            h.add(v)
+        self.assertAlmostEqual(h.quantile(0), -100, delta=1)
+        self.assertEqual(h.quantile(0.5), 0)
+        self.assertAlmostEqual(h.quantile(1), 100, delta=1)
+
+    def test_merge(self):
+        full = LogHistogram()
+        first = LogHistogram()
+        second = LogHistogram()
+        for i, v in enumerate(self.values):
+            full.add(v)
+            (first if i % 2 else second).add(v)
+        first.merge(second)
+        self.assertEqual(first.pos, full.pos)
+        self.assertEqual(first.count, full.count)
+
+    def test_bounded_buckets(self):
+        h = LogHistogram(max_buckets=64)
+        for i in range(64):
+            h.add(2 ** i)
+        self.assertLessEqual(len(h.pos), 64)
+        self.assertEqual(h.count, 64)
+        self.assertAlmostEqual(h.quantile(1), 2 ** 63, delta=2 ** 63 * 0.01)
+
+    def test_log2_buckets(self):
+        h = LogHistogram()
+        for v in (0, 1, 3, 3, 1000):
+            h.add(v)
+        self.assertEqual(h.log2_buckets(), [(0, 1), (1, 1), (4, 2), (1024, 1)])
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_add_array(self):
+        h = LogHistogram()
+        h.add_array(np.array(self.values, dtype=np.uint64))
+        expected = LogHistogram()
+        for v in self.values:
+            expected.add(v)
+        self.assertEqual(h.pos, expected.pos)
+        self.assertEqual(h.count, expected.count)
@@ -0,0 +1,231 @@
+try:
+    from tracer.analyzer import Analyzer
+    from tracer.histogram import LogHistogram, np
+    from tracer.store import aggregate_groups, group_values
+except BaseException:
+    from analyzer import Analyzer
+    from histogram import LogHistogram, np
+    from store import aggregate_groups, group_values
+
+
+class LatencyStats(object):
+    """
+    Distribution of latencies in ns.
+
+    num, sum, min, max are exact, quantiles are estimated from a LogHistogram.
+    """
+
+    def __init__(self):
+        self.num = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+        self.hist = LogHistogram()
+
+    def add(self, v):
+        self.num += 1
+        self.sum += v
+        if self.min is None or v < self.min:
+            self.min = v
+        if self.max is None or v > self.max:
+            self.max = v
+        self.hist.add(v)
+
+    def add_aggregate(self, num, sum_, mi, ma, values=None):
+        self.num += num
+        self.sum += sum_
+        self.min = mi if self.min is None else min(self.min, mi)
+        self.max = ma if self.max is None else max(self.max, ma)
+        if values is not None:
+            self.hist.add_array(values)
+
+    def merge(self, other):
+        if other.num:
+            self.add_aggregate(other.num, other.sum, other.min, other.max)
+            self.hist.merge(other.hist)
+
+    def mean(self):
+        return self.sum / self.num if self.num else None
+
+    def value(self, metric):
+        """The mean, min, max or a percentile given as e.g. 'p99'."""
+        if metric == 'mean':
+            return self.mean()
+        if metric in ('min', 'max'):
+            return getattr(self, metric)
+        return self.hist.quantile(float('0.' + metric[1:]))
+
+
+class LatencyGraph(Analyzer):
+    """
+    Per element and end-to-end latency breakdown.
+
+    Uses the records of the latency tracer (with 'flags=pipeline+element') for
+    the latencies and the 'new-element', 'new-pad' and 'buffer' records of the
+    stats tracer to find out how the elements are linked. With both, the time
+    between a source and a sink can be attributed to the elements on the way
+    and the critical path (the path with the highest latency) can be
+    reported.
+
+    Older latency tracers only log the src and sink pads (named
+    '<element>_<pad>'), the paths of their records are keyed by these pads
+    and have no critical path.
+
+    paths -- dictionary keyed by (src element, sink element) of the end-to-end
+    LatencyStats
+    hops -- dictionary keyed by (element, src pad) of the LatencyStats of the
+    time a buffer spends in the element before it is pushed on that pad
+    """
+
+    tracer_classes = ('latency', 'element-latency', 'new-element', 'new-pad', 'buffer')
+
+    def __init__(self):
+        super(LatencyGraph, self).__init__()
+        self.element_names = {}
+        self.pads = {}
+        # pad-ix -> peer-element-ix, from the buffer flow
+        self.pad_links = {}
+        self.hops = {}
+        self.paths = {}
+
+    def handle_tracer_structure(self, event, s):
+        values = s.values
+        if s.name == 'buffer':
+            ix = int(values['pad-ix'])
+            if ix not in self.pad_links:
+                self.pad_links[ix] = int(values['peer-element-ix'])
+        elif s.name == 'element-latency':
+            key = (values['element'], values['src'])
+            stats = self.hops.get(key)
+            if stats is None:
+                stats = self.hops[key] = LatencyStats()
+            stats.add(int(values['time']))
+        elif s.name == 'latency':
+            src, sink = _path_fields(values)
+            key = (values[src], values[sink])
+            stats = self.paths.get(key)
+            if stats is None:
+                stats = self.paths[key] = LatencyStats()
+            stats.add(int(values['time']))
+        elif s.name == 'new-element':
+            self.element_names[int(values['ix'])] = values['name']
+        else:  # 'new-pad'
+            self.pads[int(values['ix'])] = (int(values['parent-ix']), values['name'])
+
+    def _add_groups(self, table, store, name, key_fields):
+        c = store.classes.get(name)
+        if not c or not c['rows'] or any(k not in c['types'] for k in key_fields + ['time']):
+            return
+        columns = [store.column(name, k) for k in key_fields]
+        # the keys are interned strings, combine them into one group id
+        combined = columns[0].astype(np.uint64)
+        for column in columns[1:]:
+            combined = (combined << np.uint64(32)) | column.astype(np.uint64)
+        ids, groups = np.unique(combined, return_inverse=True)
+        keys = []
+        for i in ids.tolist():
+            ks = []
+            for k in reversed(key_fields):
+                ks.insert(0, store.strings[i & 0xffffffff])
+                i >>= 32
+            keys.append(tuple(ks))
+        time = store.column(name, 'time')
+        values = group_values(groups, time)
+        for g, num, sum_, mi, ma, fi, la in zip(*aggregate_groups(groups, time)):
+            stats = table.get(keys[g])
+            if stats is None:
+                stats = table[keys[g]] = LatencyStats()
+            stats.add_aggregate(num, sum_, mi, ma, values[g])
+
+    def handle_trace_store(self, store):
+        for name in ('new-element', 'new-pad'):
+            if name in store.classes:
+                for row in store.rows(name):
+                    self.handle_tracer_structure(None, _Row(name, row))
+        c = store.classes.get('buffer')
+        if c and c['rows']:
+            links = (store.column('buffer', 'pad-ix').astype(np.uint64) << np.uint64(32)) | \
+                store.column('buffer', 'peer-element-ix').astype(np.uint64)
+            for link in np.unique(links).tolist():
+                self.pad_links.setdefault(link >> 32, link & 0xffffffff)
+        self._add_groups(self.hops, store, 'element-latency', ['element', 'src'])
+        c = store.classes.get('latency')
+        if c:
+            self._add_groups(self.paths, store, 'latency', _path_fields(c['types']))
+        return True
+
+    def merge(self, other):
+        self.element_names.update(other.element_names)
+        self.pads.update(other.pads)
+        for ix, peer in other.pad_links.items():
+            self.pad_links.setdefault(ix, peer)
+        for table, other_table in ((self.hops, other.hops), (self.paths, other.paths)):
+            for key, stats in other_table.items():
+                if key in table:
+                    table[key].merge(stats)
+                else:
+                    table[key] = stats
+
+    def links(self):
+        """Returns a dictionary of element -> list of (src pad, peer element)."""
+        links = {}
+        for ix, peer in sorted(self.pad_links.items()):
+            pad = self.pads.get(ix)
+            if not pad or pad[0] not in self.element_names or peer not in self.element_names:
+                continue
+            links.setdefault(self.element_names[pad[0]], []).append(
+                (pad[1], self.element_names[peer]))
+        return links
+
+    def critical_path(self, src, sink, metric='mean'):
+        """
+        Find the path from the src to the sink element with the highest sum of
+        per element latencies (according to 'metric', see LatencyStats.value()).
+
+        Returns the list of hops as (element, src pad, LatencyStats) or None
+        if the elements are not linked. Hops without element latency records
+        (e.g. the source) are included with None stats.
+        """
+        links = self.links()
+        best = {}
+        visiting = set()
+
+        def longest(element):
+            # memoized longest path search, links form a DAG in sane pipelines
+            if element == sink:
+                return (0, [])
+            if element in best:
+                return best[element]
+            if element in visiting:
+                return None
+            visiting.add(element)
+            result = None
+            for pad, peer in links.get(element, ()):
+                rest = longest(peer)
+                if rest is None:
+                    continue
+                stats = self.hops.get((element, pad))
+                weight = (stats.value(metric) or 0) if stats else 0
+                if result is None or weight + rest[0] > result[0]:
+                    result = (weight + rest[0], [(element, pad, stats)] + rest[1])
+            visiting.discard(element)
+            best[element] = result
+            return result
+
+        result = longest(src)
+        return result[1] if result else None
+
+
+def _path_fields(names):
+    # the fields keying the end-to-end latency records
+    if 'src-element' in names and 'sink-element' in names:
+        return ['src-element', 'sink-element']
+    return ['src', 'sink']
+
+
+class _Row(object):
+    # a store row in the shape of a Structure
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = values
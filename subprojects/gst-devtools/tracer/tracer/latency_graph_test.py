@@ -0,0 +1,125 @@
+import shutil
+import tempfile
+import unittest
+
+from tracer.analysis_runner import AnalysisRunner
+from tracer.latency_graph import LatencyGraph, LatencyStats
+from tracer.store import StoreRunner, TraceStore, TraceStoreWriter, np
+from tracer.store_test import ENTRIES, TRACER_CLASS, _entry
+from tracer.structure import Structure
+
+# src -> tee -> {fast -> sink1, slow -> sink1}
+ELEMENTS = ['src', 'tee', 'fast', 'slow', 'sink1']
+LINKS = [('src', 'src', 'tee'), ('tee', 'src_0', 'fast'), ('tee', 'src_1', 'slow'),
+         ('fast', 'src', 'sink1'), ('slow', 'src', 'sink1')]
+
+
+def _setup(graph):
+    for ix, name in enumerate(ELEMENTS):
+        graph.handle_tracer_structure(None, Structure(
+            'new-element, ix=(uint)%d, parent-ix=(uint)100, name=(string)%s;' % (ix, name)))
+    for ix, (element, pad, peer) in enumerate(LINKS):
+        graph.handle_tracer_structure(None, Structure(
+            'new-pad, ix=(uint)%d, parent-ix=(uint)%d, name=(string)%s;' % (
+                ix, ELEMENTS.index(element), pad)))
+        graph.handle_tracer_structure(None, Structure(
+            'buffer, pad-ix=(uint)%d, peer-element-ix=(uint)%d;' % (ix, ELEMENTS.index(peer))))
+
+
+def _element_latency(graph, element, pad, time):
+    graph.handle_tracer_structure(None, Structure(
+        'element-latency, element=(string)%s, src=(string)%s, time=(guint64)%d;' % (
+            element, pad, time)))
+
+
+def _latency(graph, time):
+    graph.handle_tracer_structure(None, Structure(
+        'latency, src-element=(string)src, sink-element=(string)sink1, time=(guint64)%d;' % time))
+
+
+class TestLatencyStats(unittest.TestCase):
+
+    def test_values(self):
+        stats = LatencyStats()
+        for v in (10, 20, 30):
+            stats.add(v)
+        self.assertEqual(stats.value('mean'), 20)
+        self.assertEqual(stats.value('min'), 10)
+        self.assertEqual(stats.value('max'), 30)
+        self.assertAlmostEqual(stats.value('p50'), 20, delta=0.2)
+
+
+class TestLatencyGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = LatencyGraph()
+        _setup(self.graph)
+        for i in range(10):
+            _element_latency(self.graph, 'tee', 'src_0', 10)
+            _element_latency(self.graph, 'tee', 'src_1', 10)
+            _element_latency(self.graph, 'fast', 'src', 100)
+            _element_latency(self.graph, 'slow', 'src', 1000 + i)
+            _latency(self.graph, 1050)
+
+    def test_links(self):
+        links = self.graph.links()
+        self.assertEqual(links['tee'], [('src_0', 'fast'), ('src_1', 'slow')])
+        self.assertEqual(links['slow'], [('src', 'sink1')])
+
+    def test_critical_path(self):
+        path = self.graph.critical_path('src', 'sink1')
+        self.assertEqual([(element, pad) for element, pad, stats in path],
+                         [('src', 'src'), ('tee', 'src_1'), ('slow', 'src')])
+        self.assertIsNone(path[0][2])
+        self.assertEqual(path[2][2].num, 10)
+
+    def test_critical_path_by_metric(self):
+        for i in range(100):
+            _element_latency(self.graph, 'fast', 'src', 100 if i else 100000)
+        path = self.graph.critical_path('src', 'sink1', 'max')
+        self.assertEqual(path[1][:2], ('tee', 'src_0'))
+        path = self.graph.critical_path('src', 'sink1', 'p50')
+        self.assertEqual(path[1][:2], ('tee', 'src_1'))
+
+    def test_unlinked_elements(self):
+        self.assertIsNone(self.graph.critical_path('sink1', 'src'))
+
+    def test_merge(self):
+        other = LatencyGraph()
+        _element_latency(other, 'slow', 'src', 5000)
+        _latency(other, 6000)
+        self.graph.merge(other)
+        self.assertEqual(self.graph.hops[('slow', 'src')].num, 11)
+        self.assertEqual(self.graph.hops[('slow', 'src')].max, 5000)
+        self.assertEqual(self.graph.paths[('src', 'sink1')].num, 11)
+
+    def test_old_latency_format(self):
+        graph = LatencyGraph()
+        graph.handle_tracer_structure(None, Structure(ENTRIES[0]))
+        self.assertEqual(graph.paths[('source_src', 'pulsesink0_sink')].num, 1)
+
+
+@unittest.skipIf(np is None, 'requires numpy')
+class TestLatencyGraphStore(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        writer = TraceStoreWriter(self.path)
+        runner = AnalysisRunner(None)
+        runner.add_analyzer(writer)
+        runner.handle_tracer_class(list(TRACER_CLASS))
+        for msg in ENTRIES[:2]:
+            runner.handle_tracer_entry(_entry(msg))
+        writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_old_latency_format(self):
+        graph = LatencyGraph()
+        runner = StoreRunner(TraceStore(self.path))
+        runner.add_analyzer(graph)
+        runner.run()
+        self.assertEqual(sorted(graph.paths), [('source_src', 'fakesink0_sink'),
+                                               ('source_src', 'pulsesink0_sink')])
+        self.assertEqual(graph.paths[('source_src', 'fakesink0_sink')].max, 1000)
@@ -1,6 +1,16 @@
+import bz2
+import gzip
+import io
+import lzma
+import mmap
 import os
+import queue
 import re
+import select
+import stat
 import sys
+import threading
+import time
 
 
 def _log_line_regex():
@@ -30,11 +40,186 @@ def _log_line_regex():
             FILENAME, LINE, FUNCTION, ANSI, OBJECT, ANSI, MESSAGE]
 
 
+def split_log(filename, n):
+    """
+    Split a log file into n byte ranges.
+
+    The boundaries are moved forward to the next line start, so that each
+    range only contains whole lines. Returns a list of (start, end) tuples,
+    empty ranges are dropped.
+    """
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, n):
+            pos = max(size * i // n, bounds[-1])
+            if pos >= size:
+                break
+            f.seek(pos)
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(s, e) for s, e in zip(bounds, bounds[1:]) if s < e]
+
+
+def _decode_line(line):
+    if line.endswith(b'\r\n'):
+        line = line[:-2] + b'\n'
+    return line.decode('utf-8', 'replace')
+
+
+def _read_range(f, start, end):
+    # yield decoded lines starting in [start, end)
+    f.seek(start)
+    pos = start
+    for line in f:
+        if end is not None and pos >= end:
+            break
+        pos += len(line)
+        yield _decode_line(line)
+
+
+def _open_zstd(f):
+    try:
+        from compression import zstd
+        return zstd.ZstdFile(f)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError('reading zstd compressed logs requires python >= 3.14 or zstandard')
+    return zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+
+
+# magic bytes -> function that wraps a binary file into a decompressing one
+_DECOMPRESSORS = (
+    (b'\x1f\x8b', lambda f: gzip.GzipFile(fileobj=f)),
+    (b'\xfd7zXZ\x00', lzma.LZMAFile),
+    (b'BZh', bz2.BZ2File),
+    (b'\x28\xb5\x2f\xfd', _open_zstd),
+)
+
+
+def _decompressor(f):
+    # look at the magic bytes of a buffered binary file without consuming them
+    if not hasattr(f, 'peek'):
+        return None
+    head = f.peek(6)[:6]
+    for magic, decompressor in _DECOMPRESSORS:
+        if head.startswith(magic):
+            return decompressor
+    return None
+
+
+def is_compressed(filename):
+    """Check if a log file is compressed (with gzip, xz, bzip2 or zstd)."""
+    if filename == '-':
+        return False
+    with open(filename, 'rb') as f:
+        return _decompressor(f) is not None
+
+
+# size of the decompressed chunks and the number of chunks buffered ahead
+_CHUNK_SIZE = 1 << 20
+_QUEUE_CHUNKS = 8
+# how long to wait for the reader thread when stopping, it may be blocked in
+# a read (e.g. of a pipe) and is a daemon thread anyway
+_JOIN_TIMEOUT = 1.0
+
+
+def _threaded_lines(f, chunk_size=_CHUNK_SIZE, queue_chunks=_QUEUE_CHUNKS):
+    """
+    Yield the lines of a binary file, read in a background thread.
+
+    The reader thread stays at most 'queue_chunks' chunks ahead, so that
+    reading (e.g. decompressing) and parsing overlap in bounded memory. The
+    decompressors release the GIL while they work.
+    """
+    chunks = queue.Queue(queue_chunks)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            while put(f.read(chunk_size)):
+                pass
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=read, name='log-reader', daemon=True)
+    thread.start()
+    pending = b''
+    try:
+        while True:
+            chunk = chunks.get()
+            if isinstance(chunk, BaseException):
+                raise chunk
+            if not chunk:
+                break
+            lines = io.BytesIO(pending + chunk).readlines()
+            pending = lines.pop() if not lines[-1].endswith(b'\n') else b''
+            yield from lines
+        if pending:
+            yield pending
+    finally:
+        stop.set()
+        thread.join(_JOIN_TIMEOUT)
+
+
+def _follow_lines(f, timeout):
+    # yield the lines of a growing file or of a pipe, yield None if no new
+    # line arrived within timeout
+    fd = f.fileno()
+    is_pipe = not stat.S_ISREG(os.fstat(fd).st_mode)
+    pending = b''
+    while True:
+        if is_pipe:
+            ready = select.select([fd], [], [], timeout)[0]
+            if not ready:
+                yield None
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                # writer closed the pipe
+                if pending:
+                    yield pending
+                return
+        else:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                time.sleep(timeout)
+                yield None
+                continue
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + b'\n'
+
+
 class Parser(object):
     """
     Helper to parse a tracer log.
 
-    Implements context manager and iterator.
+    Implements context manager and iterator. If start and/or end are given, only
+    the lines starting within this byte range of the file are parsed (see
+    split_log()).
+
+    With follow=True the log is read like 'tail -f': the parser keeps waiting
+    for new lines of a growing file (or until a pipe gets closed) and returns
+    None whenever no new line arrived within 'poll_interval' seconds.
+
+    Compressed logs (gzip, xz, bzip2 and zstd) are detected and decompressed
+    while they are parsed. Byte ranges and follow mode are not supported for
+    them.
     """
 
     # record fields
@@ -49,22 +234,80 @@ class Parser(object):
     F_OBJECT = 8
     F_MESSAGE = 9
 
-    def __init__(self, filename):
+    def __init__(self, filename, start=0, end=None, follow=False, poll_interval=0.1):
         self.filename = filename
+        self.start = start
+        self.end = end
+        self.follow = follow
+        self.poll_interval = poll_interval
         self.log_regex = re.compile(''.join(_log_line_regex()))
         self.file = None
+        self._file = None
+        self._stream = None
+        self._lines = None
 
-    def __enter__(self):
+    def _open_compressed(self, f):
+        # returns the lines of the decompressed log, None if not compressed
+        decompressor = _decompressor(f)
+        if decompressor is None:
+            return None
+        if self.start or self.end is not None:
+            raise ValueError('byte ranges are not supported for compressed logs')
+        self._stream = decompressor(f)
+        self._lines = _threaded_lines(self._stream)
+        return self._lines
+
+    def _close(self):
+        if self._lines is not None:
+            # stops the reader thread
+            self._lines.close()
+            self._lines = None
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.file = None
+
+    def _follow(self):
         if self.filename != '-':
-            self.file = open(self.filename, 'rt')
-        else:
-            self.file = sys.stdin
+            self._file = open(self.filename, 'rb')
+            self._file.seek(self.start)
+            return _follow_lines(self._file, self.poll_interval)
+        return _follow_lines(sys.stdin, self.poll_interval)
+
+    def __enter__(self):
+        try:
+            self._open()
+        except BaseException:
+            self._close()
+            raise
         return self
 
+    def _open(self):
+        if self.follow:
+            self.file = (line.decode('utf-8', 'replace') if line is not None else None
+                         for line in self._follow())
+        elif self.filename != '-':
+            self._file = open(self.filename, 'rb')
+            lines = self._open_compressed(self._file)
+            if lines is not None:
+                self.file = (_decode_line(line) for line in lines)
+            elif self.start or self.end is not None:
+                self.file = _read_range(self._file, self.start, self.end)
+            else:
+                self._file.close()
+                self._file = self.file = open(self.filename, 'rt')
+        else:
+            lines = self._open_compressed(getattr(sys.stdin, 'buffer', None))
+            if lines is not None:
+                self.file = (_decode_line(line) for line in lines)
+            else:
+                self.file = sys.stdin
+
     def __exit__(self, *args):
-        if self.filename != '-':
-            self.file.close()
-            self.file = None
+        self._close()
 
     def __iter__(self):
         return self
@@ -74,9 +317,143 @@ class Parser(object):
         data = self.file
         while True:
             line = next(data)
+            if line is None:
+                return None
             match = log_regex.match(line)
             if match:
                 g = list(match.groups())
                 g[Parser.F_PID] = int(g[Parser.F_PID])
                 g[Parser.F_LINE] = int(g[Parser.F_LINE])
                 return g
+
+
+# the level is expected within the first bytes of a line
+_LEVEL_SCAN_LEN = 128
+
+
+def _trace_tail_regex():
+    # the part of an uncolored TRACE line following the level
+    CATEGORY = rb"\s+([A-Za-z0-9_-]+)\s+"
+    FILENAME = rb"([^:]*):"
+    LINE = rb"(\d+):"
+    FUNCTION = rb"([A-Za-z0-9_]*):\s*"
+    OBJECT = rb"(?:<([^>]+)>)?\s*"
+    MESSAGE = rb"(.+)"
+    return [CATEGORY, FILENAME, LINE, FUNCTION, OBJECT, MESSAGE]
+
+
+class MmapParser(Parser):
+    """
+    Fast tracer log parser.
+
+    Works on the bytes of a memory mapped file (or of stdin). Lines without the
+    TRACE level near the line start are skipped without running a regexp. For
+    the other lines only the part following the level is matched. Colored
+    lines fall back to the full log regexp.
+
+    Records are lists like the ones returned by Parser. Callers that do not
+    look at the time, pid, thread or object fields can leave them out of
+    'fields' to skip decoding them, they are None then. All fields are
+    filled in by default.
+    """
+
+    # the fields needed by the bundled analyzers, which only look at messages
+    MESSAGE_FIELDS = (Parser.F_CATEGORY, Parser.F_FILENAME, Parser.F_LINE,
+                      Parser.F_FUNCTION, Parser.F_MESSAGE)
+
+    def __init__(self, filename, start=0, end=None, fields=None,
+                 follow=False, poll_interval=0.1):
+        super(MmapParser, self).__init__(filename, start, end, follow, poll_interval)
+        self.log_regex = re.compile(''.join(_log_line_regex()).encode())
+        self.tail_regex = re.compile(b''.join(_trace_tail_regex()))
+        if fields is None:
+            fields = range(Parser.F_MESSAGE + 1)
+        self.with_head = any(f in fields for f in (Parser.F_TIME, Parser.F_PID, Parser.F_THREAD))
+        self.with_object = Parser.F_OBJECT in fields
+        self._map = None
+
+    def _open(self):
+        if self.follow:
+            self.file = self._follow()
+        elif self.filename != '-':
+            self._file = open(self.filename, 'rb')
+            lines = self._open_compressed(self._file)
+            if lines is not None:
+                self.file = lines
+            elif os.fstat(self._file.fileno()).st_size:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.file = self._map_lines(self._map, self.start, self.end)
+            else:
+                self.file = iter(())
+        else:
+            lines = self._open_compressed(sys.stdin.buffer)
+            if lines is not None:
+                self.file = lines
+            else:
+                self.file = iter(sys.stdin.buffer.readline, b'')
+
+    def _close(self):
+        self.file = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        super(MmapParser, self)._close()
+
+    @staticmethod
+    def _map_lines(data, start, end):
+        # yield the lines starting in [start, end)
+        data.seek(start)
+        if end is None:
+            yield from iter(data.readline, b'')
+            return
+        pos = start
+        readline = data.readline
+        while pos < end:
+            line = readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line
+
+    def _parse_colored(self, line):
+        if line.endswith(b'\r\n'):
+            line = line[:-2] + b'\n'
+        match = self.log_regex.match(line)
+        if not match:
+            return None
+        g = [v.decode('utf-8', 'replace') if v is not None else None
+             for v in match.groups()]
+        g[Parser.F_PID] = int(g[Parser.F_PID])
+        g[Parser.F_LINE] = int(g[Parser.F_LINE])
+        return g
+
+    def __next__(self):
+        tail_match = self.tail_regex.match
+        for line in self.file:
+            if line is None:
+                return None
+            p = line.find(b' TRACE ', 0, _LEVEL_SCAN_LEN)
+            if p != -1:
+                match = tail_match(line, p + 6)
+                if not match:
+                    continue
+                category, filename, lineno, function, obj, message = match.groups()
+                if message.endswith(b'\r'):
+                    # CRLF line ending, the message stops before the LF
+                    message = message[:-1]
+                g = [None, None, None, 'TRACE', category.decode(),
+                     filename.decode('utf-8', 'replace'), int(lineno),
+                     function.decode(), None, message.decode('utf-8', 'replace')]
+                if self.with_head:
+                    head = line[:p].split()
+                    g[Parser.F_TIME] = head[0].decode()
+                    g[Parser.F_PID] = int(head[1])
+                    g[Parser.F_THREAD] = head[2].decode()
+                if self.with_object and obj is not None:
+                    g[Parser.F_OBJECT] = obj.decode('utf-8', 'replace')
+                return g
+            elif line.find(b'\x1b', 0, _LEVEL_SCAN_LEN) != -1:
+                g = self._parse_colored(line)
+                if g:
+                    return g
+        raise StopIteration
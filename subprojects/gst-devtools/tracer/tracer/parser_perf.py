@@ -1,13 +1,74 @@
+import os
+import random
+import time
+
 from analysis_runner import AnalysisRunner
-from parser import Parser
+from analyzer import Analyzer
+from parser import MmapParser, Parser
+
+LOG_LINES = [
+    '0:00:%02d.%09d  7664      0x238ac70 TRACE             GST_TRACER :0:: thread-rusage, thread-id=(guint64)37268592, ts=(guint64)79416000, average-cpuload=(uint)1000, current-cpuload=(uint)%d, time=(guint64)79418045;\n',
+    '0:00:%02d.%09d  7664 0x7f8a201056d0 TRACE             GST_TRACER :0:: latency, src=(string)source_src, sink=(string)pulsesink0_sink, time=(guint64)%d;\n',
+    '0:00:%02d.%09d  7664      0x238ac70 DEBUG               GST_PADS gstpad.c:4406:gst_pad_chain_data_unchecked:<sink:sink> called chainfunction &gst_base_sink_chain with buffer %d\n',
+    '0:00:%02d.%09d  7664      0x238ac70 LOG                GST_EVENT gstevent.c:306:gst_event_new_custom: creating new event 0x7f8a18003060 segment %d\n',
+]
+
+
+class MessageAnalyzer(Analyzer):
+    """Looks at the same fields as the stats analyzer."""
+
+    def __init__(self):
+        super(MessageAnalyzer, self).__init__()
+        self.entries = 0
+
+    def handle_tracer_entry(self, event):
+        if not event[Parser.F_FUNCTION] and event[Parser.F_MESSAGE]:
+            self.entries += 1
+
+
+def generate(filename, size):
+    # write a log with a mix of tracer entries and other debug lines
+    rnd = random.Random(0)
+    with open(filename, 'w') as f:
+        written = 0
+        ts = 0
+        while written < size:
+            lines = []
+            for i in range(10000):
+                ts += rnd.randint(1000, 100000)
+                line = rnd.choice(LOG_LINES) % ((ts // 1000000000) % 60, ts % 1000000000, i)
+                lines.append(line)
+            data = ''.join(lines)
+            f.write(data)
+            written += len(data)
+
+
+def perf(parser_class, filename):
+    analyzer = MessageAnalyzer()
+    t = time.perf_counter()
+    with parser_class(filename) as log:
+        runner = AnalysisRunner(log)
+        runner.add_analyzer(analyzer)
+        runner.run()
+    t = time.perf_counter() - t
+    with open(filename, 'rb') as f:
+        n = sum(1 for line in f)
+    print("%12s: %lf s, (%lf lines/s, %d tracer entries)" % (
+        parser_class.__name__, t, (n / t), analyzer.entries))
 
 
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('file', nargs='?', default='debug.log')
+    parser.add_argument('-g', '--generate', default=0, type=int,
+                        help='write a synthetic log of this size in MB first')
     args = parser.parse_args()
 
-    with Parser(args.file) as log:
-        runner = AnalysisRunner(log)
-        runner.run()
+    if args.generate:
+        generate(args.file, args.generate * 1024 * 1024)
+    elif not os.path.exists(args.file):
+        parser.error("%s not found, generate it e.g. with '-g 1024'" % args.file)
+
+    perf(Parser, args.file)
+    perf(MmapParser, args.file)
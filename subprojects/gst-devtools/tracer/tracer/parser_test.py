@@ -1,7 +1,15 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
 import sys
+import tempfile
+import threading
 import unittest
+from unittest import mock
 
-from tracer.parser import Parser
+from tracer.parser import MmapParser, Parser, _threaded_lines, is_compressed, split_log
 
 TESTFILE = './logs/trace.latency.log'
 
@@ -10,6 +18,9 @@ TEXT_DATA = ['first line', 'second line']
 TRACER_LOG_DATA = [
     '0:00:00.079422574  7664      0x238ac70 TRACE             GST_TRACER :0:: thread-rusage, thread-id=(guint64)37268592, ts=(guint64)79416000, average-cpuload=(uint)1000, current-cpuload=(uint)1000, time=(guint64)79418045;'
 ]
+COLORED_TRACER_LOG_DATA = [
+    '0:00:00.079422574 \x1b[336m 7664\x1b[00m      0x238ac70 \x1b[37mTRACE  \x1b[00m \x1b[00;01;34m           GST_TRACER :0:: thread-rusage, thread-id=(guint64)37268592, ts=(guint64)79416000, average-cpuload=(uint)1000, current-cpuload=(uint)1000, time=(guint64)79418045;'
+]
 TRACER_CLASS_LOG_DATA = [
     '0:00:00.041536066  1788      0x14b2150 TRACE             GST_TRACER gsttracerrecord.c:110:gst_tracer_record_build_format: latency.class, src=(structure)"scope\,\ type\=\(type\)gchararray\,\ related-to\=\(GstTracerValueScope\)GST_TRACER_VALUE_SCOPE_PAD\;", sink=(structure)"scope\,\ type\=\(type\)gchararray\,\ related-to\=\(GstTracerValueScope\)GST_TRACER_VALUE_SCOPE_PAD\;", time=(structure)"value\,\ type\=\(type\)guint64\,\ description\=\(string\)\"time\\\ it\\\ took\\\ for\\\ the\\\ buffer\\\ to\\\ go\\\ from\\\ src\\\ to\\\ sink\\\ ns\"\,\ flags\=\(GstTracerValueFlags\)GST_TRACER_VALUE_FLAGS_AGGREGATED\,\ min\=\(guint64\)0\,\ max\=\(guint64\)18446744073709551615\;";'
 ]
@@ -45,3 +56,206 @@ class TestParser(unittest.TestCase):
         with Parser('-') as log:
             event = next(log)
             self.assertEqual(len(event), 10)
+
+
+class TestParserRanges(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.log')
+        with os.fdopen(fd, 'w') as f:
+            for i in range(100):
+                f.write(TEXT_DATA[i % 2] + '\n')
+                f.write(TRACER_LOG_DATA[0] + '\n')
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def test_split_log_covers_file(self):
+        ranges = split_log(self.filename, 7)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.filename))
+        for (_, e), (s, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(e, s)
+
+    def test_split_log_on_line_boundaries(self):
+        with open(self.filename, 'rb') as f:
+            data = f.read()
+        for s, _ in split_log(self.filename, 7)[1:]:
+            self.assertEqual(data[s - 1:s], b'\n')
+
+    def test_ranges_report_all_entries(self):
+        events = []
+        for s, e in split_log(self.filename, 7):
+            with Parser(self.filename, s, e) as log:
+                events.extend(log)
+        with Parser(self.filename) as log:
+            self.assertEqual(events, list(log))
+
+
+class TestMmapParser(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.log')
+        with os.fdopen(fd, 'w') as f:
+            for line in TEXT_DATA + TRACER_LOG_DATA + TRACER_CLASS_LOG_DATA + COLORED_TRACER_LOG_DATA:
+                f.write(line + '\n')
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def test_records_match_parser(self):
+        with Parser(self.filename) as log:
+            expected = list(log)
+        with MmapParser(self.filename) as log:
+            self.assertEqual(list(log), expected)
+
+    def test_crlf_line_endings(self):
+        with open(self.filename, 'w', newline='\r\n') as f:
+            for line in TRACER_LOG_DATA + COLORED_TRACER_LOG_DATA:
+                f.write(line + '\n')
+        with Parser(self.filename) as log:
+            expected = list(log)
+        with MmapParser(self.filename) as log:
+            events = list(log)
+        self.assertEqual(events, expected)
+        self.assertTrue(events[0][Parser.F_MESSAGE].endswith(';'))
+
+    def test_skips_unrequested_fields(self):
+        with MmapParser(self.filename, fields=MmapParser.MESSAGE_FIELDS) as log:
+            event = next(log)
+            self.assertEqual(len(event), 10)
+            self.assertIsNone(event[Parser.F_TIME])
+            self.assertEqual(event[Parser.F_LINE], 0)
+            self.assertEqual(event[Parser.F_FILENAME], '')
+            self.assertTrue(event[Parser.F_MESSAGE].startswith('thread-rusage, '))
+
+    def test_parses_colored_line(self):
+        with MmapParser(self.filename) as log:
+            events = list(log)
+        self.assertEqual(len(events), 3)
+        self.assertEqual(events[2][Parser.F_CATEGORY], 'GST_TRACER')
+
+    def test_empty_file(self):
+        with open(self.filename, 'w'):
+            pass
+        with MmapParser(self.filename) as log:
+            with self.assertRaises(StopIteration):
+                next(log)
+
+
+class TestCompressedLog(unittest.TestCase):
+
+    def setUp(self):
+        self.data = ''.join(line + '\n' for line in
+                            TEXT_DATA + TRACER_LOG_DATA * 10 + TRACER_CLASS_LOG_DATA).encode()
+        fd, self.filename = tempfile.mkstemp(suffix='.log')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.data)
+        with Parser(self.filename) as log:
+            self.expected = list(log)
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def _write(self, compress):
+        with open(self.filename, 'wb') as f:
+            f.write(compress(self.data))
+
+    def test_detect(self):
+        self.assertFalse(is_compressed(self.filename))
+        self._write(gzip.compress)
+        self.assertTrue(is_compressed(self.filename))
+
+    def test_parsers_decompress(self):
+        for compress in (gzip.compress, lzma.compress, bz2.compress):
+            self._write(compress)
+            for parser_class in (Parser, MmapParser):
+                with parser_class(self.filename) as log:
+                    events = list(log)
+                self.assertEqual(len(events), len(self.expected))
+                self.assertEqual([e[Parser.F_MESSAGE] for e in events],
+                                 [e[Parser.F_MESSAGE] for e in self.expected])
+
+    def test_ranges_are_rejected(self):
+        self._write(gzip.compress)
+        for parser_class in (Parser, MmapParser):
+            log = parser_class(self.filename, 0, 10)
+            with self.assertRaises(ValueError):
+                with log:
+                    pass
+            self.assertIsNone(log._file)
+
+    def test_threaded_lines_across_chunks(self):
+        data = b'a\nbb\nccc\n\ndddd'
+        lines = list(_threaded_lines(io.BytesIO(data), chunk_size=3, queue_chunks=1))
+        self.assertEqual(lines, [b'a\n', b'bb\n', b'ccc\n', b'\n', b'dddd'])
+
+    def test_threaded_lines_stop_early(self):
+        threads = threading.active_count()
+        lines = _threaded_lines(io.BytesIO(b'line\n' * 1000), chunk_size=5, queue_chunks=1)
+        self.assertEqual(next(lines), b'line\n')
+        lines.close()
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_threaded_lines_blocked_reader(self):
+        release = threading.Event()
+
+        class BlockingReader(object):
+
+            def __init__(self):
+                self.chunks = [b'line\n']
+
+            def read(self, size):
+                if self.chunks:
+                    return self.chunks.pop()
+                release.wait()
+                return b''
+
+        lines = _threaded_lines(BlockingReader())
+        self.assertEqual(next(lines), b'line\n')
+        with mock.patch('tracer.parser._JOIN_TIMEOUT', 0.1):
+            lines.close()
+        release.set()
+
+
+class TestParserFollow(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp(suffix='.log')
+        with os.fdopen(fd, 'w') as f:
+            f.write(TRACER_LOG_DATA[0] + '\n')
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def test_follow_growing_file(self):
+        for parser_class in (Parser, MmapParser):
+            with open(self.filename, 'w') as f:
+                f.write(TRACER_LOG_DATA[0] + '\n')
+            with parser_class(self.filename, follow=True, poll_interval=0.01) as log:
+                self.assertIsNotNone(next(log))
+                self.assertIsNone(next(log))
+                with open(self.filename, 'a') as f:
+                    # a partial line is not reported
+                    f.write(TRACER_LOG_DATA[0][:20])
+                    f.flush()
+                    self.assertIsNone(next(log))
+                    f.write(TRACER_LOG_DATA[0][20:] + '\n')
+                event = next(log)
+                self.assertEqual(event[Parser.F_MESSAGE], TRACER_LOG_DATA[0].split(':: ')[1])
+
+    def test_follow_pipe_until_closed(self):
+        r, w = os.pipe()
+        stdin = sys.stdin
+        try:
+            sys.stdin = os.fdopen(r, 'r')
+            with MmapParser('-', follow=True, poll_interval=0.01) as log:
+                self.assertIsNone(next(log))
+                os.write(w, (TRACER_LOG_DATA[0] + '\n').encode())
+                os.close(w)
+                self.assertIsNotNone(next(log))
+                with self.assertRaises(StopIteration):
+                    next(log)
+        finally:
+            sys.stdin.close()
+            sys.stdin = stdin
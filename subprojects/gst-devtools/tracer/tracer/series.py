@@ -0,0 +1,89 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Series(object):
+    """
+    Append only, column oriented storage for a time series.
+
+    Rows are appended to typed arrays, which take a fraction of the memory of
+    python lists and convert to numpy arrays with a single copy. Breaks mark
+    rows that start a new line segment (e.g. after a discontinuity).
+    """
+
+    def __init__(self, columns, typecode='d'):
+        self.columns = columns
+        self.data = [array(typecode) for c in columns]
+        self.breaks = array('L')
+
+    def __len__(self):
+        return len(self.data[0])
+
+    def append(self, *values):
+        for data, v in zip(self.data, values):
+            data.append(v)
+
+    def add_break(self):
+        if len(self) and (not self.breaks or self.breaks[-1] != len(self)):
+            self.breaks.append(len(self))
+
+    def arrays(self):
+        return [np.array(data) for data in self.data]
+
+    def format(self, fmt, width=0):
+        """
+        Format the rows as text for a plotting tool, one row per line and an
+        empty line for each break.
+
+        width -- if set, the series is decimated for a plot of this many
+        pixel columns (requires numpy)
+        """
+        if width:
+            columns = self.arrays()
+            keep = decimate(columns[0], columns[1:], width,
+                            np.array(self.breaks, dtype=np.int64))
+            breaks = np.searchsorted(keep, self.breaks).tolist()
+            columns = [c[keep].tolist() for c in columns]
+        else:
+            breaks = self.breaks
+            columns = self.data
+        lines = [fmt % row for row in zip(*columns)]
+        for ix in reversed(breaks):
+            lines.insert(ix, '')
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def decimate(x, ys, width, keep=None):
+    """
+    Min/max decimation of a series for plotting.
+
+    The x range is split into 'width' columns. For each column, the first and
+    last point and the points with the minimum and maximum value of each y
+    array are kept, so the plot keeps its shape and its outliers.
+
+    keep -- optional indices of points that have to be kept
+    Returns the sorted indices of the points to keep.
+    """
+    n = len(x)
+    if n <= 4 * width:
+        return np.arange(n)
+    x0 = x.min()
+    span = x.max() - x0
+    if span > 0:
+        cols = np.minimum(((x - x0) * (width / span)).astype(np.int64), width - 1)
+    else:
+        cols = np.zeros(n, dtype=np.int64)
+    kept = [] if keep is None else [keep]
+    for y in [x] + list(ys):
+        order = np.lexsort((y, cols))
+        c = cols[order]
+        starts = np.flatnonzero(np.concatenate(([True], c[1:] != c[:-1])))
+        ends = np.append(starts[1:], n) - 1
+        kept.append(order[starts])
+        kept.append(order[ends])
+    return np.unique(np.concatenate(kept))
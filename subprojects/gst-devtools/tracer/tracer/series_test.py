@@ -0,0 +1,60 @@
+import unittest
+
+from tracer.series import Series, decimate, np
+
+
+class TestSeries(unittest.TestCase):
+
+    def test_append(self):
+        series = Series(('x', 'y'))
+        series.append(1, 2)
+        series.append(3, 4)
+        self.assertEqual(len(series), 2)
+        self.assertEqual(list(series.data[1]), [2.0, 4.0])
+
+    def test_format(self):
+        series = Series(('x', 'y'))
+        series.add_break()
+        series.append(1, 2)
+        series.add_break()
+        series.add_break()
+        series.append(3, 4)
+        self.assertEqual(series.format('%.1f %.1f'), '1.0 2.0\n\n3.0 4.0\n')
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_format_decimated(self):
+        series = Series(('x', 'y'))
+        for i in range(1000):
+            series.append(i, i % 7)
+            if i == 500:
+                series.add_break()
+        lines = series.format('%d %d', 10).split('\n')
+        self.assertLess(len(lines), 100)
+        self.assertIn('', lines[:-1])
+        self.assertEqual(lines[0], '0 0')
+        self.assertEqual(lines[-2], '999 5')
+
+
+@unittest.skipIf(np is None, 'requires numpy')
+class TestDecimate(unittest.TestCase):
+
+    def test_short_series_is_kept(self):
+        x = np.arange(10.0)
+        self.assertEqual(decimate(x, [x], 10).tolist(), list(range(10)))
+
+    def test_keeps_extrema(self):
+        x = np.arange(10000.0)
+        y = np.zeros(10000)
+        y[1234] = 100
+        y[5678] = -100
+        keep = decimate(x, [y], 100)
+        self.assertLessEqual(len(keep), 400)
+        self.assertIn(1234, keep)
+        self.assertIn(5678, keep)
+        self.assertIn(0, keep)
+        self.assertIn(9999, keep)
+
+    def test_keeps_requested_points(self):
+        x = np.arange(10000.0)
+        keep = decimate(x, [], 10, np.array([4321]))
+        self.assertIn(4321, keep)
@@ -0,0 +1,329 @@
+import json
+import os
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from tracer.analysis_runner import AnalysisRunner
+    from tracer.analyzer import Analyzer
+    from tracer.parser import Parser
+    from tracer.structure import Structure, StructureDecoder
+except BaseException:
+    from analysis_runner import AnalysisRunner
+    from analyzer import Analyzer
+    from parser import Parser
+    from structure import Structure, StructureDecoder
+
+STORE_VERSION = 1
+
+# rows buffered per column before they are appended to the column file
+_FLUSH_ROWS = 65536
+
+# serialized type name -> array typecode, other types are stored as strings
+_TYPECODES = {
+    'int': 'q', 'gint': 'q', 'int8': 'q', 'int16': 'q', 'int32': 'q',
+    'int64': 'q', 'gint64': 'q',
+    'uint': 'Q', 'guint': 'Q', 'uint8': 'Q', 'uint16': 'Q', 'uint32': 'Q',
+    'uint64': 'Q', 'guint64': 'Q',
+    'boolean': 'B',
+    'double': 'd', 'float': 'd',
+}
+# interned string ids
+_STRING_TYPECODE = 'I'
+
+
+def is_trace_store(path):
+    return os.path.isfile(os.path.join(path, 'index.json'))
+
+
+class _Column(object):
+
+    def __init__(self, filename, typecode):
+        self.filename = filename
+        self.typecode = typecode
+        self.data = array(typecode)
+        self.file = open(filename, 'wb')
+
+    def flush(self):
+        self.data.tofile(self.file)
+        del self.data[:]
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class TraceStoreWriter(Analyzer):
+    """
+    Converts a tracer log into a columnar TraceStore.
+
+    Run it like any other analyzer. Each field of a tracer class becomes a
+    column file with one fixed size value per entry. Non numeric values are
+    interned and stored as string ids. An extra column records the class of
+    each entry in log order, so that the log can be replayed.
+    """
+
+    tracer_classes = ['*']
+
+    def __init__(self, path):
+        super(TraceStoreWriter, self).__init__()
+        self.path = path
+        self.classes = {}
+        self.class_events = []
+        self.strings = []
+        self.string_ids = {}
+        self.entries = 0
+        os.makedirs(path, exist_ok=True)
+        self.order = _Column(os.path.join(path, 'entries.bin'), 'H')
+
+    def _intern(self, s):
+        ix = self.string_ids.get(s)
+        if ix is None:
+            ix = self.string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return ix
+
+    def handle_tracer_class(self, event):
+        s = Structure(event[Parser.F_MESSAGE])
+        name = s.name[:-len('.class')]
+        self.class_events.append({'entries': self.entries, 'event': list(event)})
+        if name in self.classes:
+            return
+        decoder = StructureDecoder(s)
+        os.makedirs(os.path.join(self.path, name), exist_ok=True)
+        columns = []
+        for k, t in decoder.types.items():
+            typecode = _TYPECODES.get(t, _STRING_TYPECODE)
+            columns.append((k, t, _Column(os.path.join(self.path, name, k + '.bin'), typecode)))
+        self.classes[name] = {
+            'ix': len(self.classes),
+            'decoder': decoder,
+            'columns': columns,
+            'rows': 0,
+        }
+
+    def subscribes(self, name):
+        return name in self.classes
+
+    def handle_tracer_structure(self, event, s):
+        record = self.classes[s.name]
+        values = s.values
+        for k, t, column in record['columns']:
+            v = values.get(k)
+            if column.typecode == _STRING_TYPECODE:
+                column.data.append(self._intern('' if v is None else str(v)))
+            elif column.typecode == 'd':
+                column.data.append(float(v or 0))
+            else:
+                column.data.append(int(v or 0))
+        record['rows'] += 1
+        self.order.data.append(record['ix'])
+        self.entries += 1
+        if len(self.order.data) >= _FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        self.order.flush()
+        for record in self.classes.values():
+            for k, t, column in record['columns']:
+                column.flush()
+
+    def close(self, log_filename=None):
+        self.order.close()
+        index = {
+            'version': STORE_VERSION,
+            'byteorder': sys.byteorder,
+            'entries': self.entries,
+            'class-events': self.class_events,
+            'classes': {},
+        }
+        if log_filename and log_filename != '-':
+            st = os.stat(log_filename)
+            index['log'] = {
+                'filename': os.path.abspath(log_filename),
+                'size': st.st_size,
+                'mtime': st.st_mtime,
+            }
+        for name, record in self.classes.items():
+            fields = []
+            for k, t, column in record['columns']:
+                column.close()
+                fields.append([k, t, column.typecode])
+            index['classes'][name] = {
+                'ix': record['ix'],
+                'rows': record['rows'],
+                'fields': fields,
+            }
+        with open(os.path.join(self.path, 'strings.json'), 'w') as f:
+            json.dump(self.strings, f)
+        with open(os.path.join(self.path, 'index.json'), 'w') as f:
+            json.dump(index, f)
+
+
+class TraceStore(object):
+    """
+    Read access to a store written by TraceStoreWriter.
+
+    The columns are memory mapped as numpy arrays on first access.
+
+    classes -- dictionary of class name to row count, field names, types
+    strings -- list of interned strings
+    """
+
+    def __init__(self, path):
+        if np is None:
+            raise ImportError('reading a trace store requires numpy')
+        self.path = path
+        with open(os.path.join(path, 'index.json')) as f:
+            index = json.load(f)
+        if index['version'] != STORE_VERSION or index['byteorder'] != sys.byteorder:
+            raise ValueError('unsupported trace store: %s' % path)
+        with open(os.path.join(path, 'strings.json')) as f:
+            self.strings = json.load(f)
+        self.entries = index['entries']
+        self.class_events = index['class-events']
+        self.classes = {}
+        for name, c in index['classes'].items():
+            self.classes[name] = {
+                'ix': c['ix'],
+                'rows': c['rows'],
+                'fields': [k for k, t, typecode in c['fields']],
+                'types': {k: t for k, t, typecode in c['fields']},
+                'typecodes': {k: typecode for k, t, typecode in c['fields']},
+            }
+        self._columns = {}
+
+    def _map(self, filename, typecode, rows):
+        if not rows:
+            return np.zeros(0, dtype=typecode)
+        return np.memmap(filename, dtype=typecode, mode='r', shape=(rows,))
+
+    def order(self):
+        """The class index of each entry in log order."""
+        return self._map(os.path.join(self.path, 'entries.bin'), 'H', self.entries)
+
+    def is_string(self, name, field):
+        return self.classes[name]['typecodes'][field] == _STRING_TYPECODE
+
+    def column(self, name, field):
+        key = (name, field)
+        data = self._columns.get(key)
+        if data is None:
+            c = self.classes[name]
+            data = self._map(os.path.join(self.path, name, field + '.bin'),
+                             c['typecodes'][field], c['rows'])
+            self._columns[key] = data
+        return data
+
+    def rows(self, name):
+        """Iterate the entries of a class as dictionaries of field values."""
+        c = self.classes[name]
+        columns = []
+        for k in c['fields']:
+            data = self.column(name, k)
+            if self.is_string(name, k):
+                columns.append((k, data, self.strings))
+            else:
+                columns.append((k, data.tolist(), None))
+        for i in range(c['rows']):
+            yield {k: (strings[data[i]] if strings is not None else data[i])
+                   for k, data, strings in columns}
+
+
+def _format_value(t, v):
+    if isinstance(v, bool) or t == 'boolean':
+        return '1' if v else '0'
+    if isinstance(v, str) and (not v or any(c in v for c in ' ,;=()"\\')):
+        return '"%s"' % v.replace('"', '\\"')
+    return str(v)
+
+
+class StoreRunner(AnalysisRunner):
+    """
+    Runs several Analyzers over a TraceStore.
+
+    Analyzers that implement handle_trace_store() work on the columns directly,
+    for the others the tracer classes and entries are replayed in log order.
+    """
+
+    def __init__(self, store):
+        super(StoreRunner, self).__init__(store)
+
+    def run(self):
+        store = self.log
+        replay = [a for a in self.analyzers if not a.handle_trace_store(store)]
+        if not replay:
+            return
+
+        runner = AnalysisRunner(store)
+        for analyzer in replay:
+            runner.add_analyzer(analyzer)
+        try:
+            self._replay(store, runner)
+        except StopIteration:
+            pass
+
+    def _replay(self, store, runner):
+        names = {c['ix']: name for name, c in store.classes.items()}
+        rows = {ix: store.rows(name) for ix, name in names.items()}
+        templates = {}
+        for ix, name in names.items():
+            c = store.classes[name]
+            templates[ix] = (name, [(k, c['types'][k]) for k in c['fields']])
+
+        class_events = list(store.class_events)
+        for n, ix in enumerate(store.order().tolist()):
+            while class_events and class_events[0]['entries'] <= n:
+                runner.handle_tracer_class(class_events.pop(0)['event'])
+            values = next(rows[ix])
+            name, fields = templates[ix]
+            msg = name + ''.join(
+                ', %s=(%s)%s' % (k, t, _format_value(t, values[k])) for k, t in fields) + ';'
+            runner.handle_tracer_entry(
+                [None, None, None, 'TRACE', 'GST_TRACER', '', 0, '', None, msg])
+        for c in class_events:
+            runner.handle_tracer_class(c['event'])
+
+
+def aggregate_groups(groups, values):
+    """
+    Per group statistics of an integer column.
+
+    groups -- numpy array with the group index of each value
+    values -- int64 or uint64 numpy array
+    Returns the lists (ids, num, sums, mins, maxs, first, last) for the groups
+    that occur. first and last are the indices of the first and last value of
+    each group, sums are exact python ints.
+    """
+    order = np.argsort(groups, kind='stable')
+    g = groups[order]
+    v = values[order]
+    starts = np.concatenate(([0], np.flatnonzero(g[1:] != g[:-1]) + 1))
+    ends = np.append(starts[1:], len(g))
+    mins = np.minimum.reduceat(v, starts)
+    maxs = np.maximum.reduceat(v, starts)
+    # sum the 32 bit halves separately, so that nothing can overflow
+    u = v.astype(np.uint64)
+    lo = np.add.reduceat(u & np.uint64(0xffffffff), starts).tolist()
+    hi = np.add.reduceat(u >> np.uint64(32), starts).tolist()
+    sums = [(h << 32) + l for h, l in zip(hi, lo)]
+    if v.dtype.kind == 'i':
+        # undo the two's complement wrap around of negative values
+        neg = np.add.reduceat((v < 0).astype(np.int64), starts).tolist()
+        sums = [s - (n << 64) for s, n in zip(sums, neg)]
+    return (g[starts].tolist(), (ends - starts).tolist(), sums, mins.tolist(),
+            maxs.tolist(), order[starts].tolist(), order[ends - 1].tolist())
+
+
+def group_values(groups, values):
+    """Split a column by group, returns a dictionary of group index to values."""
+    order = np.argsort(groups, kind='stable')
+    g = groups[order]
+    starts = np.flatnonzero(g[1:] != g[:-1]) + 1
+    ids = g[np.concatenate(([0], starts))].tolist() if len(g) else []
+    return dict(zip(ids, np.split(values[order], starts)))
@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from tracer.analysis_runner import AnalysisRunner
+from tracer.analysis_runner_test import TRACER_CLASS, TRACER_ENTRY
+from tracer.analyzer import Analyzer
+from tracer.parser import Parser
+from tracer.store import StoreRunner, TraceStore, TraceStoreWriter, is_trace_store, np
+
+ENTRIES = [
+    r'latency, src=(string)source_src, sink=(string)pulsesink0_sink, time=(guint64)47091349;',
+    r'latency, src=(string)source_src, sink=(string)fakesink0_sink, time=(guint64)1000;',
+    r'latency, src=(string)other_src, sink=(string)pulsesink0_sink, time=(guint64)18446744073709551615;',
+]
+
+
+def _entry(msg):
+    event = list(TRACER_ENTRY)
+    event[Parser.F_MESSAGE] = msg
+    return event
+
+
+class MessageAnalyzer(Analyzer):
+
+    def __init__(self):
+        super(MessageAnalyzer, self).__init__()
+        self.classes = []
+        self.entries = []
+
+    def handle_tracer_class(self, event):
+        self.classes.append(event[Parser.F_MESSAGE])
+
+    def handle_tracer_entry(self, event):
+        self.entries.append(event[Parser.F_MESSAGE])
+
+
+class TestTraceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        writer = TraceStoreWriter(self.path)
+        runner = AnalysisRunner(None)
+        runner.add_analyzer(writer)
+        runner.handle_tracer_class(list(TRACER_CLASS))
+        for msg in ENTRIES:
+            runner.handle_tracer_entry(_entry(msg))
+        writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_writes_index(self):
+        self.assertTrue(is_trace_store(self.path))
+        with open(os.path.join(self.path, 'index.json')) as f:
+            index = json.load(f)
+        self.assertEqual(index['entries'], 3)
+        self.assertEqual(index['classes']['latency']['rows'], 3)
+
+    def test_interns_strings(self):
+        with open(os.path.join(self.path, 'strings.json')) as f:
+            strings = json.load(f)
+        self.assertEqual(len(strings), 4)
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_reads_columns(self):
+        store = TraceStore(self.path)
+        self.assertEqual(store.column('latency', 'time').tolist(),
+                         [47091349, 1000, 18446744073709551615])
+        self.assertTrue(store.is_string('latency', 'src'))
+        self.assertEqual([store.strings[i] for i in store.column('latency', 'sink')],
+                         ['pulsesink0_sink', 'fakesink0_sink', 'pulsesink0_sink'])
+
+    @unittest.skipIf(np is None, 'requires numpy')
+    def test_replays_log(self):
+        analyzer = MessageAnalyzer()
+        runner = StoreRunner(TraceStore(self.path))
+        runner.add_analyzer(analyzer)
+        runner.run()
+        self.assertEqual(analyzer.classes, [TRACER_CLASS[Parser.F_MESSAGE]])
+        self.assertEqual(analyzer.entries, ENTRIES)
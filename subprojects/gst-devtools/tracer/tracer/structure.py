@@ -9,6 +9,27 @@ INT_TYPES = "".join(
     ("int", "uint", "int8", "uint8", "int16", "uint16", "int32", "uint32", "int64", "uint64")
 )
 
+# a quoted or a plain field value
+VALUE = r'("(?:[^"\\]|\\.)*"|[^,;]*)'
+SKIP_VALUE = '(?:' + VALUE[1:]
+
+
+def _convert(t, v, quoted):
+    if quoted:
+        # unescape \., but not \\. (using a backref)
+        # need a reverse for re.escape()
+        v = v.replace('\\\\', '\\')
+        v = UNESCAPE.sub(r'\1', v)
+    if t == 'structure':
+        v = Structure(v)
+    elif t == 'string' and v[:1] == '"':
+        v = v[1:-1]
+    elif t == 'boolean':
+        v = _parse_bool(v)
+    elif t in INT_TYPES:
+        v = int(v)
+    return v
+
 
 class Structure(object):
     """
@@ -27,6 +48,16 @@ class Structure(object):
     def __repr__(self):
         return self.text
 
+    @classmethod
+    def from_values(cls, text, name, types, values):
+        """Create a Structure from already parsed data."""
+        s = cls.__new__(cls)
+        s.text = text
+        s.name = name
+        s.types = types
+        s.values = values
+        return s
+
     @staticmethod
     def _find_eos(s):
         # find next '"' without preceeding '\'
@@ -75,25 +106,112 @@ class Structure(object):
                 v = s[:(p - 1)]
                 if s[p] == ';':
                     scan = False
-                # unescape \., but not \\. (using a backref)
-                # need a reverse for re.escape()
-                v = v.replace('\\\\', '\\')
-                v = UNESCAPE.sub(r'\1', v)
+                quoted = True
             else:
                 p = s.find(',')
                 if p == -1:
                     p = s.index(';')
                     scan = False
                 v = s[:p]
+                quoted = False
 
-            if t == 'structure':
-                v = Structure(v)
-            elif t == 'string' and v[0] == '"':
-                v = v[1:-1]
-            elif t == 'boolean':
-                v = (v == '1')
-            elif t in INT_TYPES:
-                v = int(v)
             types[k] = t
-            values[k] = v
+            values[k] = _convert(t, v, quoted)
         return (name, types, values)
+
+
+class StructureDecoder(object):
+    """
+    Decoder for the entries of one tracer class.
+
+    Compiled once from the '<name>.class' structure. The tracer logs the fields
+    of an entry in the order of the class (with a 'have-<field>' field before
+    each optional field). This is turned into a single regexp that matches the
+    whole entry in one left-to-right scan and only captures the requested
+    fields.
+
+    name -- the entry name (without '.class')
+    types -- a dictionary of the types of the decoded fields
+    """
+
+    def __init__(self, klass, fields=None):
+        self.name = klass.name[:-len('.class')]
+        self.types = {}
+        pattern = [re.escape(self.name)]
+        groups = []
+        for k, v in klass.values.items():
+            flags = v.values.get('flags', '')
+            wanted = fields is None or k in fields
+            if 'OPTIONAL' in flags or 'optional' in flags:
+                if wanted:
+                    groups.append(('have-' + k, 'boolean'))
+                pattern.append(r', %s=\([^)]*\)%s' % (
+                    re.escape('have-' + k), VALUE if wanted else SKIP_VALUE))
+            if wanted:
+                groups.append((k, _type_name(v.values['type'])))
+            pattern.append(r', %s=\([^)]*\)%s' % (
+                re.escape(k), VALUE if wanted else SKIP_VALUE))
+        pattern.append(';')
+        self.regex = re.compile(''.join(pattern))
+        self.groups = []
+        for k, t in groups:
+            self.types[k] = t
+            self.groups.append((k, t, _converter(t)))
+
+    def decode(self, text):
+        """
+        Decode the requested fields of an entry.
+
+        Returns a dictionary keyed by the field name or None, if the text does
+        not match the class.
+        """
+        match = self.regex.match(text)
+        if not match:
+            return None
+        values = {}
+        for (k, t, conv), v in zip(self.groups, match.groups()):
+            if v[:1] == '"':
+                values[k] = _convert(t, v[1:-1], True)
+            elif conv:
+                values[k] = conv(v)
+            else:
+                values[k] = v
+        return values
+
+    def decode_structure(self, text):
+        """Like decode(), but returns a Structure."""
+        values = self.decode(text)
+        if values is None:
+            return None
+        return Structure.from_values(text, self.name, self.types, values)
+
+
+def _parse_bool(v):
+    return v == '1'
+
+
+def _converter(t):
+    # like _convert() for unquoted values, None if the value stays a string
+    if t == 'structure':
+        return Structure
+    elif t == 'boolean':
+        return _parse_bool
+    elif t in INT_TYPES:
+        return int
+    return None
+
+
+def _type_name(t):
+    # map the GType name from the class to the serialized type name
+    return _TYPE_NAMES.get(t, t)
+
+
+_TYPE_NAMES = {
+    'gchararray': 'string',
+    'gboolean': 'boolean',
+    'gint': 'int',
+    'guint': 'uint',
+    'gdouble': 'double',
+    'gfloat': 'float',
+    'GstStructure': 'structure',
+}
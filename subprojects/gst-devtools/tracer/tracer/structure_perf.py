@@ -1,13 +1,20 @@
 import timeit
 
-from structure import Structure
+from structure import Structure, StructureDecoder
 from gi.repository import Gst
 Gst.init(None)
 
 PLAIN_STRUCTURE = r'thread-rusage, thread-id=(guint64)37268592, ts=(guint64)79416000, average-cpuload=(uint)1000, current-cpuload=(uint)1000, time=(guint64)79418045;'
 NESTED_STRUCTURE = r'latency.class, src=(structure)"scope\,\ type\=\(type\)gchararray\,\ related-to\=\(GstTracerValueScope\)GST_TRACER_VALUE_SCOPE_PAD\;", sink=(structure)"scope\,\ type\=\(type\)gchararray\,\ related-to\=\(GstTracerValueScope\)GST_TRACER_VALUE_SCOPE_PAD\;", time=(structure)"value\,\ type\=\(type\)guint64\,\ description\=\(string\)\"time\\\ it\\\ took\\\ for\\\ the\\\ buffer\\\ to\\\ go\\\ from\\\ src\\\ to\\\ sink\\\ ns\"\,\ flags\=\(GstTracerValueFlags\)GST_TRACER_VALUE_FLAGS_AGGREGATED\,\ min\=\(guint64\)0\,\ max\=\(guint64\)18446744073709551615\;";'
+PLAIN_CLASS = r'thread-rusage.class, thread-id=(structure)"scope\,\ type\=\(type\)guint64\,\ related-to\=\(GstTracerValueScope\)GST_TRACER_VALUE_SCOPE_THREAD\;", ts=(structure)"value\,\ type\=\(type\)guint64\,\ flags\=\(GstTracerValueFlags\)GST_TRACER_VALUE_FLAGS_AGGREGATED\;", average-cpuload=(structure)"value\,\ type\=\(type\)guint\,\ flags\=\(GstTracerValueFlags\)GST_TRACER_VALUE_FLAGS_AGGREGATED\,\ min\=\(uint\)0\,\ max\=\(uint\)1000\;", current-cpuload=(structure)"value\,\ type\=\(type\)guint\,\ flags\=\(GstTracerValueFlags\)GST_TRACER_VALUE_FLAGS_AGGREGATED\,\ min\=\(uint\)0\,\ max\=\(uint\)1000\;", time=(structure)"value\,\ type\=\(type\)guint64\,\ flags\=\(GstTracerValueFlags\)GST_TRACER_VALUE_FLAGS_AGGREGATED\;";'
+# an entry with many fields, where we only want a few of them
+LONG_CLASS = 'long.class, ' + ', '.join(
+    r'f%d=(structure)"value\,\ type\=\(type\)guint64\;"' % i for i in range(100)) + ';'
+LONG_STRUCTURE = 'long, ' + ', '.join('f%d=(guint64)%d' % (i, i * 1000) for i in range(100)) + ';'
 
 NAT_STRUCTURE = Structure(PLAIN_STRUCTURE)
+PLAIN_DECODER = StructureDecoder(Structure(PLAIN_CLASS))
+LONG_DECODER = StructureDecoder(Structure(LONG_CLASS), ('f0', 'f50', 'f99'))
 GI_STRUCTURE = Gst.Structure.from_string(PLAIN_STRUCTURE)[0]
 
 
@@ -21,6 +28,10 @@ def nat_parse_nested():
     s = Structure(NESTED_STRUCTURE)
 
 
+def nat_parse_long():
+    s = Structure(LONG_STRUCTURE)
+
+
 def nat_get_name():
     return NAT_STRUCTURE.name
 
@@ -29,6 +40,16 @@ def nat_get_value():
     return NAT_STRUCTURE.values['thread-id']
 
 
+# compiled decoder
+
+def dec_parse_plain():
+    v = PLAIN_DECODER.decode(PLAIN_STRUCTURE)
+
+
+def dec_parse_long():
+    v = LONG_DECODER.decode(LONG_STRUCTURE)
+
+
 # gstreamer impl via gi
 
 def gi_parse_plain():
@@ -39,6 +60,10 @@ def gi_parse_nested():
     s = Gst.Structure.from_string(NESTED_STRUCTURE)[0]
 
 
+def gi_parse_long():
+    s = Gst.Structure.from_string(LONG_STRUCTURE)[0]
+
+
 def gi_get_name():
     return GI_STRUCTURE.get_name()
 
@@ -51,7 +76,7 @@ def gi_get_value():
 
 def perf(method, n, flavor):
     t = timeit.timeit(method + '()', 'from __main__ import ' + method, number=n)
-    print("%6s: %lf s, (%lf calls/s)" % (flavor, t, (n / t)))
+    print("%8s: %lf s, (%lf calls/s)" % (flavor, t, (n / t)))
 
 
 if __name__ == '__main__':
@@ -64,12 +89,18 @@ if __name__ == '__main__':
 
     print("parse_plain:")
     t = perf('nat_parse_plain', n, 'native')
+    t = perf('dec_parse_plain', n, 'compiled')
     t = perf('gi_parse_plain', n, 'gi')
 
     print("parse_nested:")
     t = perf('nat_parse_nested', n, 'native')
     t = perf('gi_parse_nested', n, 'gi')
 
+    print("parse_long:")
+    t = perf('nat_parse_long', n, 'native')
+    t = perf('dec_parse_long', n, 'compiled')
+    t = perf('gi_parse_long', n, 'gi')
+
     print("get_name:")
     t = perf('nat_get_name', n, 'native')
     t = perf('gi_get_name', n, 'gi')
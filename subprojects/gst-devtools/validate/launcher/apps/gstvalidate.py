@@ -17,6 +17,7 @@
 # Free Software Foundation, Inc., 51 Franklin St, Fifth Floor,
 # Boston, MA 02110-1301, USA.
 import argparse
+import concurrent.futures
 from fractions import Fraction
 import os
 import copy
@@ -1143,86 +1144,103 @@ not been tested and explicitly activated if you set use --wanted-tests ALL""")
         except configparser.NoOptionError as e:
             self.debug("Exception: %s for %s", e, media_info)
 
-    def _discover_file(self, uri, fpath):
+    def _discover_file(self, uri, fpath, medias, pool):
+        """
+        Appends the (media_info, uri) of the medias found for fpath to
+        medias, media_info being a future from pool when it needs to be
+        generated.
+        """
         for ext in (GstValidateMediaDescriptor.MEDIA_INFO_EXT,
                 GstValidateMediaDescriptor.PUSH_MEDIA_INFO_EXT,
                 GstValidateMediaDescriptor.SKIPPED_MEDIA_INFO_EXT):
-            try:
-                is_push = ext == GstValidateMediaDescriptor.PUSH_MEDIA_INFO_EXT
-                is_skipped = ext == GstValidateMediaDescriptor.SKIPPED_MEDIA_INFO_EXT
-                media_info = "%s.%s" % (fpath, ext)
-                if is_push or is_skipped:
-                    if not os.path.exists(media_info):
-                        continue
-                if is_push:
-                    uri = "push" + uri
-                args = GstValidateBaseTestManager.MEDIA_CHECK_COMMAND.split(" ")
-                args.append(uri)
-                if os.path.isfile(media_info) and not self.options.update_media_info and not is_skipped:
-                    self._add_media(media_info, uri)
-                    continue
-                elif fpath.endswith(GstValidateMediaDescriptor.STREAM_INFO_EXT) and not is_skipped:
-                    self._add_media(fpath)
-                    continue
-                elif not self.options.generate_info and not self.options.update_media_info and not self.options.validate_uris:
-                    continue
-                elif self.options.update_media_info and not os.path.isfile(media_info):
-                    self.info(
-                        "%s not present. Use --generate-media-info", media_info)
+            is_push = ext == GstValidateMediaDescriptor.PUSH_MEDIA_INFO_EXT
+            is_skipped = ext == GstValidateMediaDescriptor.SKIPPED_MEDIA_INFO_EXT
+            media_info = "%s.%s" % (fpath, ext)
+            if is_push or is_skipped:
+                if not os.path.exists(media_info):
                     continue
-                elif os.path.islink(media_info):
-                    self.info(
-                        "%s is a symlink, not updating and hopefully the actual file gets updated!", media_info)
-                    continue
-
-                include_frames = 0
-                if self.options.update_media_info:
-                    include_frames = 2
-                elif self.options.generate_info_full:
-                    include_frames = 1
+            if is_push:
+                uri = "push" + uri
+            if os.path.isfile(media_info) and not self.options.update_media_info and not is_skipped:
+                medias.append((media_info, uri))
+                continue
+            elif fpath.endswith(GstValidateMediaDescriptor.STREAM_INFO_EXT) and not is_skipped:
+                medias.append((fpath, None))
+                continue
+            elif not self.options.generate_info and not self.options.update_media_info and not self.options.validate_uris:
+                continue
+            elif self.options.update_media_info and not os.path.isfile(media_info):
+                self.info(
+                    "%s not present. Use --generate-media-info", media_info)
+                continue
+            elif os.path.islink(media_info):
+                self.info(
+                    "%s is a symlink, not updating and hopefully the actual file gets updated!", media_info)
+                continue
 
-                media_descriptor = GstValidateMediaDescriptor.new_from_uri(
-                    uri, True, include_frames, is_push, is_skipped)
-                if media_descriptor:
-                    self._add_media(media_descriptor, uri)
-                else:
+            include_frames = 0
+            if self.options.update_media_info:
+                include_frames = 2
+            elif self.options.generate_info_full:
+                include_frames = 1
+
+            medias.append((pool.submit(GstValidateMediaDescriptor.new_from_uri,
+                                       uri, False, include_frames, is_push,
+                                       is_skipped),
+                           uri))
+
+    def _add_medias(self, medias):
+        for media_info, uri in medias:
+            if isinstance(media_info, concurrent.futures.Future):
+                printc("Generating media info for %s" % url2path(uri),
+                       Colors.OKBLUE)
+                media_info = media_info.result()
+                if not media_info:
+                    printc("Result: Failed", Colors.FAIL)
                     self.warning("Could not get any descriptor for %s" % uri)
+                    continue
+                printc("Result: Passed", Colors.OKGREEN)
 
-            except subprocess.CalledProcessError as e:
-                if self.options.generate_info:
-                    printc("Result: Failed", Colors.FAIL)
-                else:
-                    self.error("Exception: %s", e)
-                return False
-        return True
+            self._add_media(media_info, uri)
 
     def _list_uris(self):
         if self._uris:
             return self._uris
 
-        if self.options.validate_uris:
-            for uri in self.options.validate_uris:
-                self._discover_file(uri, uri)
-            return self._uris
-
-        if not self.args:
-            if isinstance(self.options.paths, str):
-                self.options.paths = [os.path.join(self.options.paths)]
-
-            for path in self.options.paths:
-                if os.path.isfile(path):
-                    path = os.path.abspath(path)
-                    self._discover_file(path2url(path), path)
-                else:
-                    for root, dirs, files in os.walk(path):
-                        for f in files:
-                            fpath = os.path.abspath(os.path.join(root, f))
-                            if os.path.isdir(fpath) or \
-                                    fpath.endswith(GstValidateMediaDescriptor.MEDIA_INFO_EXT) or\
-                                    fpath.endswith(ScenarioManager.FILE_EXTENSION):
-                                continue
-                            else:
-                                self._discover_file(path2url(fpath), fpath)
+        # Media infos are generated in parallel, and the medias added in the
+        # order they were found so the tests do not depend on which
+        # generation finishes first.
+        medias = []
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.options.num_jobs)
+        try:
+            if self.options.validate_uris:
+                for uri in self.options.validate_uris:
+                    self._discover_file(uri, uri, medias, pool)
+            elif not self.args:
+                if isinstance(self.options.paths, str):
+                    self.options.paths = [os.path.join(self.options.paths)]
+
+                for path in self.options.paths:
+                    if os.path.isfile(path):
+                        path = os.path.abspath(path)
+                        self._discover_file(path2url(path), path, medias, pool)
+                    else:
+                        for root, dirs, files in os.walk(path):
+                            for f in files:
+                                fpath = os.path.abspath(os.path.join(root, f))
+                                if os.path.isdir(fpath) or \
+                                        fpath.endswith(GstValidateMediaDescriptor.MEDIA_INFO_EXT) or\
+                                        fpath.endswith(ScenarioManager.FILE_EXTENSION):
+                                    continue
+                                else:
+                                    self._discover_file(path2url(fpath), fpath, medias, pool)
+
+            self._add_medias(medias)
+        finally:
+            for media_info, uri in medias:
+                if isinstance(media_info, concurrent.futures.Future):
+                    media_info.cancel()
+            pool.shutdown()
 
         self.debug("Uris found: %s", self._uris)
 
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin St, Fifth Floor,
+# Boston, MA 02110-1301, USA.
+
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from launcher.apps.gstvalidate import GstValidateMediaDescriptor, \
+    GstValidateTestManager
+
+
+class TestListUris(unittest.TestCase):
+
+    def test_medias_added_in_discovery_order(self):
+        uris = ["file:///media%d" % i for i in range(4)]
+        finished = []
+        lock = threading.Lock()
+
+        def new_from_uri(uri, *args):
+            # The first medias take the longest to be generated
+            time.sleep(0.05 * (len(uris) - uris.index(uri)))
+            with lock:
+                finished.append(uri)
+            return None if uri == uris[2] else "descriptor for " + uri
+
+        manager = GstValidateTestManager()
+        manager.args = []
+        manager.options = SimpleNamespace(validate_uris=uris, num_jobs=len(uris),
+                                          update_media_info=False,
+                                          generate_info=False,
+                                          generate_info_full=False)
+        added = []
+        with mock.patch.object(GstValidateMediaDescriptor, "new_from_uri",
+                               side_effect=new_from_uri), \
+                mock.patch.object(manager, "_add_media",
+                                  side_effect=lambda *args: added.append(args)), \
+                mock.patch("launcher.apps.gstvalidate.printc"):
+            manager._list_uris()
+
+        self.assertEqual(finished, list(reversed(uris)))
+        # The media whose info could not be generated is skipped
+        self.assertEqual(added, [("descriptor for " + uri, uri)
+                                 for uri in uris if uri != uris[2]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -26,6 +26,7 @@ import os
 import sys
 import re
 import copy
+import heapq
 import shlex
 import socketserver
 import struct
@@ -39,9 +40,11 @@ import queue
 import configparser
 import xml
 import random
+import selectors
 import shutil
+import socket
 import uuid
-from itertools import cycle
+from itertools import count, cycle
 from fractions import Fraction
 from pathlib import Path
 
@@ -68,6 +71,8 @@ from .utils import mkdir, Result, Colors, printc, DEFAULT_TIMEOUT, GST_SECOND, \
 GDB_TIMEOUT_FACTOR = VALGRIND_TIMEOUT_FACTOR = 20
 RR_TIMEOUT_FACTOR = 2
 TIMEOUT_FACTOR = float(os.environ.get("TIMEOUT_FACTOR", 1))
+# How many times per timeout period the progress of a running test is checked
+TIMEOUT_SAMPLES = 4
 # The error reported by valgrind when detecting errors
 VALGRIND_ERROR_CODE = 20
 
@@ -248,6 +253,8 @@ class Test(Loggable):
         self.message = ""
         self.error_str = ""
         self.time_taken = 0.0
+        self.cpu_time = None
+        self.max_rss = None
         self._starting_time = None
         self.result = Result.NOT_RUN
         self.logfile = None
@@ -569,6 +576,25 @@ class Test(Loggable):
 
         return False
 
+    def get_next_check_ts(self):
+        """
+        Returns the time at which process_update should be called again
+        to detect a timeout.
+
+        The value returned by get_current_value is sampled a few times per
+        timeout period so a stalled test is reported shortly after
+        self.timeout seconds without progress.
+        """
+        now = time.time()
+        next_ts = min(self.last_change_ts + self.timeout,
+                      now + self.timeout / TIMEOUT_SAMPLES)
+        if self.hard_timeout:
+            hard_timeout_ts = self.start_ts + self.hard_timeout
+            if hard_timeout_ts > now:
+                next_ts = min(next_ts, hard_timeout_ts)
+
+        return next_ts
+
     def get_subproc_env(self):
         return os.environ.copy()
 
@@ -590,6 +616,30 @@ class Test(Loggable):
     def run_external_checks(self):
         pass
 
+    def wait_process(self):
+        """
+        Waits for the process to exit, keeping the CPU time and peak RSS
+        it used when available
+        """
+        if hasattr(os, 'wait4'):
+            try:
+                pid, status, rusage = os.wait4(self.process.pid, 0)
+            except ChildProcessError:
+                # Already reaped by Popen.poll()
+                pass
+            else:
+                if os.WIFSIGNALED(status):
+                    self.process.returncode = -os.WTERMSIG(status)
+                else:
+                    self.process.returncode = os.WEXITSTATUS(status)
+                self.cpu_time = rusage.ru_utime + rusage.ru_stime
+                # In kB, macOS reports bytes
+                self.max_rss = rusage.ru_maxrss
+                if sys.platform == 'darwin':
+                    self.max_rss //= 1024
+
+        self.process.wait()
+
     def thread_wrapper(self):
         def enable_sigint():
             # Restore the SIGINT handler for the child process (gdb) to ensure
@@ -607,11 +657,12 @@ class Test(Loggable):
                                         env=self.proc_env,
                                         cwd=self.workdir,
                                         preexec_fn=preexec_fn)
-        self.process.wait()
+        self.wait_process()
         if self.result is not Result.TIMEOUT:
             if self.process.returncode == 0:
                 self.run_external_checks()
-            self.queue.put(None)
+            # Wake up the launcher right away so the job slot gets reused
+            self.queue.put(self)
 
     def get_valgrind_suppression_file(self, subdir, name):
         p = get_data_file(subdir, name)
@@ -830,82 +881,185 @@ class Test(Loggable):
         return self.result
 
 
+class GstValidateTestConnection(Loggable):
+
+    """
+    The connection of a test to the launcher server, which receives
+    messages made of their length as a 4 bytes big-endian integer followed
+    by a JSON object, and hands them to the test.
+    """
+
+    def __init__(self, launcher):
+        Loggable.__init__(self, "GstValidateListener")
+        self.launcher = launcher
+        self.test = None
+        self._buffer = bytearray(4096)
+        self._start = 0
+        self._end = 0
+
+    def receive(self, sock):
+        """
+        Reads what is available from sock and handles the messages that
+        were fully received.
+
+        Returns False when the connection should be closed.
+        """
+        if self._end == len(self._buffer):
+            if self._start:
+                pending = self._end - self._start
+                self._buffer[:pending] = self._buffer[self._start:self._end]
+                self._start = 0
+                self._end = pending
+            else:
+                self._buffer.extend(bytes(len(self._buffer)))
+
+        received = sock.recv_into(memoryview(self._buffer)[self._end:])
+        if not received:
+            return False
+        self._end += received
+
+        while self._end - self._start >= 4:
+            msglen = struct.unpack_from('>I', self._buffer, self._start)[0]
+            msgend = self._start + 4 + msglen
+            if msgend > self._end:
+                break
+
+            msg = str(memoryview(self._buffer)[self._start + 4:msgend],
+                      'utf-8', 'ignore')
+            self._start = msgend
+            if not self.handle_message(msg):
+                return False
+
+        if self._start == self._end:
+            self._start = self._end = 0
+
+        return True
+
+    def handle_message(self, msg):
+        """Returns False when the connection should be closed"""
+        test = self.test
+        if msg == '':
+            return False
+
+        try:
+            obj = json.loads(msg)
+        except json.decoder.JSONDecodeError as e:
+            self.error("%s Could not decode message: %s - %s" % (test.classname if test else "unknown", msg, e))
+            return True
+
+        if test is None:
+            # First message must contain the uuid
+            uuid = obj.get("uuid", None)
+            if uuid is None:
+                return False
+            # Find test from launcher
+            test = self.test = self.launcher.get_test_by_uuid(uuid)
+            if test is None:
+                self.launcher.error(
+                    "Could not find test for UUID %s" % uuid)
+                return False
+
+        obj_type = obj.get("type", '')
+        if obj_type == 'position':
+            test.set_position(obj['position'], obj['duration'],
+                              obj['speed'])
+        elif obj_type == 'buffering':
+            test.set_position(obj['position'], 100)
+        elif obj_type == 'action':
+            test.add_action_execution(obj)
+            # Make sure that action is taken into account when checking if process
+            # is updating
+            test.position += 1
+        elif obj_type == 'action-done':
+            # Make sure that action end is taken into account when checking if process
+            # is updating
+            test.position += 1
+            if test.actions_infos:
+                test.actions_infos[-1]['execution-duration'] = obj['execution-duration']
+        elif obj_type == 'report':
+            test.add_report(obj)
+        elif obj_type == 'skip-test':
+            test.set_result(Result.SKIPPED)
+
+        return True
+
+
 class GstValidateTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
     pass
 
 
-class GstValidateListener(socketserver.BaseRequestHandler, Loggable):
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        Loggable.__init__(self, "GstValidateListener")
+class GstValidateListener(socketserver.BaseRequestHandler):
 
     def handle(self):
         """Implements BaseRequestHandler handle method"""
-        test = None
-        self.logCategory = "GstValidateListener"
-        while True:
-            raw_len = self.request.recv(4)
-            if raw_len == b'':
-                return
-            msglen = struct.unpack('>I', raw_len)[0]
-            e = None
-            raw_msg = bytes()
-            while msglen != len(raw_msg):
-                raw_msg += self.request.recv(msglen - len(raw_msg))
-            if e is not None:
-                continue
-            try:
-                msg = raw_msg.decode('utf-8', 'ignore')
-            except UnicodeDecodeError as e:
-                self.error("%s Could not decode message: %s - %s" % (test.classname if test else "unknown", msg, e))
-                continue
+        connection = GstValidateTestConnection(self.server.launcher)
+        while connection.receive(self.request):
+            pass
+
+
+class GstValidateSelectorServer(Loggable):
+
+    """
+    Server handling the connections of all the tests from the thread
+    running serve_forever, usable in place of a GstValidateTCPServer
+    """
+
+    def __init__(self, server_address):
+        Loggable.__init__(self, "GstValidateSelectorServer")
+        self.launcher = None
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.bind(server_address)
+        self.socket.listen()
+        self.socket.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.socket, selectors.EVENT_READ)
+        self._shutdown_request = False
+        self._is_shut_down = threading.Event()
+
+    def serve_forever(self, poll_interval=0.5):
+        self._is_shut_down.clear()
+        try:
+            while not self._shutdown_request:
+                for key, events in self._selector.select(poll_interval):
+                    if key.fileobj is self.socket:
+                        self._accept()
+                    else:
+                        self._receive(key.fileobj, key.data)
+        finally:
+            self._shutdown_request = False
+            self._is_shut_down.set()
+
+    def _accept(self):
+        try:
+            sock, address = self.socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+
+        sock.setblocking(False)
+        self._selector.register(sock, selectors.EVENT_READ,
+                                GstValidateTestConnection(self.launcher))
 
-            if msg == '':
+    def _receive(self, sock, connection):
+        try:
+            if connection.receive(sock):
                 return
+        except (BlockingIOError, InterruptedError):
+            return
+        except Exception as e:
+            self.error("Error handling %s messages: %s" % (
+                connection.test.classname if connection.test else "unknown", e))
 
-            try:
-                obj = json.loads(msg)
-            except json.decoder.JSONDecodeError as e:
-                self.error("%s Could not decode message: %s - %s" % (test.classname if test else "unknown", msg, e))
-                continue
+        self._selector.unregister(sock)
+        sock.close()
 
-            if test is None:
-                # First message must contain the uuid
-                uuid = obj.get("uuid", None)
-                if uuid is None:
-                    return
-                # Find test from launcher
-                for t in self.server.launcher.tests:
-                    if uuid == t.get_uuid():
-                        test = t
-                        break
-                if test is None:
-                    self.server.launcher.error(
-                        "Could not find test for UUID %s" % uuid)
-                    return
+    def shutdown(self):
+        self._shutdown_request = True
+        self._is_shut_down.wait()
 
-            obj_type = obj.get("type", '')
-            if obj_type == 'position':
-                test.set_position(obj['position'], obj['duration'],
-                                  obj['speed'])
-            elif obj_type == 'buffering':
-                test.set_position(obj['position'], 100)
-            elif obj_type == 'action':
-                test.add_action_execution(obj)
-                # Make sure that action is taken into account when checking if process
-                # is updating
-                test.position += 1
-            elif obj_type == 'action-done':
-                # Make sure that action end is taken into account when checking if process
-                # is updating
-                test.position += 1
-                if test.actions_infos:
-                    test.actions_infos[-1]['execution-duration'] = obj['execution-duration']
-            elif obj_type == 'report':
-                test.add_report(obj)
-            elif obj_type == 'skip-test':
-                test.set_result(Result.SKIPPED)
+    def server_close(self):
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._selector.close()
 
 
 class GstValidateTest(Test):
@@ -1839,6 +1993,92 @@ class GstValidateTestsGenerator(TestsGenerator):
         return super(GstValidateTestsGenerator, self).generate_tests()
 
 
+class TestsHistory(Loggable):
+
+    """
+    Database of the wall time, CPU time and peak RSS of the tests in the
+    previous runs, used to schedule the longest tests first.
+    """
+
+    # Weight of the last run in the stored values
+    SMOOTHING = 0.5
+
+    def __init__(self, path):
+        Loggable.__init__(self)
+
+        self.path = path
+        self.tests = self._load()
+        self._updated = {}
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.warning("Could not load tests history %s: %s" % (self.path, e))
+            return {}
+
+    def save(self):
+        if not self._updated:
+            return
+
+        # Keep what other launchers stored since we loaded the file
+        tests = self._load()
+        tests.update(self._updated)
+        tmppath = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            with open(tmppath, 'w') as f:
+                json.dump(tests, f)
+            os.replace(tmppath, self.path)
+        except OSError as e:
+            self.warning("Could not save tests history %s: %s" % (self.path, e))
+            return
+
+        self._updated = {}
+
+    def add(self, test):
+        infos = {'wall-time': test.time_taken,
+                 'cpu-time': test.cpu_time,
+                 'max-rss': test.max_rss}
+        previous = self.tests.get(test.classname, {})
+        for key, value in infos.items():
+            previous_value = previous.get(key)
+            if value is None:
+                infos[key] = previous_value
+            elif previous_value is not None:
+                infos[key] = previous_value + (value - previous_value) * self.SMOOTHING
+        infos['runs'] = previous.get('runs', 0) + 1
+
+        self.tests[test.classname] = infos
+        self._updated[test.classname] = infos
+
+    def get_durations(self, tests):
+        """
+        Returns the expected wall time of each test, the tests never run
+        before are expected to take the median time of the others. Returns
+        None if none of the tests was ever run.
+        """
+        durations = [self.tests.get(test.classname, {}).get('wall-time')
+                     for test in tests]
+        known = sorted(d for d in durations if d is not None)
+        if not known:
+            return None
+
+        median = known[len(known) // 2]
+        return [median if d is None else d for d in durations]
+
+    def sort_longest_first(self, tests):
+        durations = self.get_durations(tests)
+        if durations is None:
+            return list(tests)
+
+        return [test for _, test in sorted(zip(durations, tests),
+                                           key=lambda x: x[0],
+                                           reverse=True)]
+
+
 class _TestsLauncher(Loggable):
 
     def __init__(self):
@@ -1855,11 +2095,19 @@ class _TestsLauncher(Loggable):
 
         self.queue = queue.Queue()
         self.jobs = []
+        # Heap of (check time, sequence number, test) for the timeout checks
+        # of the running jobs, and the currently scheduled check time of
+        # each of them; superseded heap entries are skipped.
+        self._checks = []
+        self._check_ts = {}
+        self._check_seqnum = count()
+        self._tests_by_uuid = {}
         self.total_num_tests = 0
         self.current_progress = -1
         self.server = None
         self.httpsrv = None
         self.vfb_server = None
+        self.history = None
 
     def _list_app_dirs(self):
         app_dirs = []
@@ -2011,6 +2259,9 @@ class _TestsLauncher(Loggable):
             self.reporter = reporters.Reporter(options)
 
         self.options = options
+        self.history = TestsHistory(
+            options.durations_file or os.path.join(options.privatedir,
+                                                   "tests-history.json"))
         wanted_testers = None
         for tester in self.testers:
             if tester.name in args:
@@ -2136,9 +2387,30 @@ class _TestsLauncher(Loggable):
 
     def _split_tests(self, num_groups):
         groups = [[] for x in range(num_groups)]
-        group = cycle(groups)
-        for test in self.tests:
-            next(group).append(test)
+
+        # All the parts must be split the same way, only rely on a history
+        # explicitly shared between them.
+        durations = None
+        if self.options.durations_file:
+            durations = self.history.get_durations(self.tests)
+
+        if durations is None:
+            group = cycle(groups)
+            for test in self.tests:
+                next(group).append(test)
+            return groups
+
+        # Give each test, longest first, to the part which is expected to
+        # finish first.
+        ends = [(0, i) for i in range(num_groups)]
+        for duration, test in sorted(zip(durations, self.tests),
+                                     key=lambda x: x[0], reverse=True):
+            end, i = heapq.heappop(ends)
+            groups[i].append(test)
+            heapq.heappush(ends, (end + duration, i))
+
+        for group in groups:
+            group.sort(key=lambda test: test.classname)
         return groups
 
     def list_tests(self):
@@ -2153,6 +2425,7 @@ class _TestsLauncher(Loggable):
 
             self.tests.extend(tests)
         self.tests.sort(key=lambda test: test.classname)
+        LauncherCache().save()
 
         if self.options.num_parts < 1:
             raise RuntimeError("Tests must be split in positive number of parts.")
@@ -2170,10 +2443,16 @@ class _TestsLauncher(Loggable):
                 return True
         return False
 
+    def get_test_by_uuid(self, uuid):
+        return self._tests_by_uuid.get(uuid)
+
     def server_wrapper(self, ready):
-        self.server = GstValidateTCPServer(
-            ('localhost', 0), GstValidateListener)
-        self.server.socket.settimeout(None)
+        if self.options.selector_server:
+            self.server = GstValidateSelectorServer(('localhost', 0))
+        else:
+            self.server = GstValidateTCPServer(
+                ('localhost', 0), GstValidateListener)
+            self.server.socket.settimeout(None)
         self.server.launcher = self
         self.serverport = self.server.socket.getsockname()[1]
         self.info("%s server port: %s" % (self, self.serverport))
@@ -2197,18 +2476,40 @@ class _TestsLauncher(Loggable):
             self.server.server_close()
             self.server = None
 
+    def _schedule_check(self, test):
+        check_ts = test.get_next_check_ts()
+        self._check_ts[test] = check_ts
+        heapq.heappush(self._checks,
+                       (check_ts, next(self._check_seqnum), test))
+
+    def _next_check_timeout(self):
+        while self._checks:
+            check_ts, _, test = self._checks[0]
+            if self._check_ts.get(test) == check_ts:
+                # Tests running under gdb never time out
+                return min(max(check_ts - time.time(), 0), threading.TIMEOUT_MAX)
+            heapq.heappop(self._checks)
+
+        return None
+
     def test_wait(self):
         while True:
-            # Check process every second for timeout
+            # Sleep until a job exits or the next timeout check is due
             try:
-                self.queue.get(timeout=1)
+                test = self.queue.get(timeout=self._next_check_timeout())
             except queue.Empty:
-                pass
+                test = heapq.heappop(self._checks)[2]
 
-            for test in self.jobs:
-                if test.process_update():
-                    self.jobs.remove(test)
-                    return test
+            if test not in self._check_ts:
+                # Already done
+                continue
+
+            if test.process_update():
+                self.jobs.remove(test)
+                del self._check_ts[test]
+                return test
+
+            self._schedule_check(test)
 
     def tests_wait(self):
         try:
@@ -2227,9 +2528,11 @@ class _TestsLauncher(Loggable):
         except IndexError:
             return False
 
+        self._tests_by_uuid[test.get_uuid()] = test
         test.test_start(self.queue)
 
         self.jobs.append(test)
+        self._schedule_check(test)
 
         return True
 
@@ -2289,6 +2592,10 @@ class _TestsLauncher(Loggable):
         if self.options.shuffle:
             random.shuffle(tests)
             random.shuffle(alone_tests)
+        else:
+            # Start the longest tests first so they do not end up running
+            # alone at the end
+            tests = self.history.sort_longest_first(tests)
 
         current_test_num = 1
         to_retry = []
@@ -2304,6 +2611,8 @@ class _TestsLauncher(Loggable):
                 jobs_running -= 1
                 current_test_num += 1
                 res = test.test_end(retry_on_failures=retry_on_failures)
+                if not (self.options.gdb or self.options.valgrind or self.options.rr):
+                    self.history.add(test)
                 to_report = True
                 if res not in [Result.PASSED, Result.SKIPPED, Result.KNOWN_ERROR]:
                     if self.options.forever or self.options.fatal_error:
@@ -2405,6 +2714,7 @@ class _TestsLauncher(Loggable):
             if self.vfb_server:
                 self.vfb_server.stop()
             self.clean_tests(True)
+            self.history.save()
 
     def final_report(self):
         return self.reporter.final_report()
@@ -2485,6 +2795,107 @@ class Scenario(object):
         return "<Scenario %s>" % self.name
 
 
+class LauncherCache(Loggable):
+
+    """
+    On-disk cache of the data the launcher extracts from files, each entry
+    being dropped when the stamp of what it comes from changed.
+
+    VERSION has to be bumped whenever the format of the cached data changes,
+    caches of another version are dropped.
+    """
+
+    VERSION = 1
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(LauncherCache, cls).__new__(
+                cls, *args, **kwargs)
+            cls._instance.path = None
+            cls._instance.sections = {}
+            cls._instance.modified = False
+            Loggable.__init__(cls._instance)
+
+        return cls._instance
+
+    @staticmethod
+    def file_stamp(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @staticmethod
+    def dir_stamp(path):
+        """Stamp of a directory and of its entries"""
+        try:
+            entries = sorted(os.scandir(path), key=lambda entry: entry.name)
+            return [os.stat(path).st_mtime_ns] + [
+                [entry.name, entry.stat().st_mtime_ns, entry.stat().st_size]
+                for entry in entries]
+        except OSError:
+            return None
+
+    def load(self, path):
+        self.path = path
+        self.sections = {}
+        self.modified = False
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.warning("Could not load cache %s: %s" % (path, e))
+            return
+
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            self.info("Dropping cache %s of another version" % path)
+            return
+        self.sections = data["sections"]
+
+    def save(self):
+        if not self.path or not self.modified:
+            return
+
+        # Forget about the files which were removed
+        for entries in self.sections.values():
+            for key in [key for key in entries
+                        if os.path.isabs(key) and not os.path.exists(key)]:
+                del entries[key]
+
+        tmppath = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            with open(tmppath, 'w') as f:
+                json.dump({"version": self.VERSION, "sections": self.sections}, f)
+            os.replace(tmppath, self.path)
+        except OSError as e:
+            self.warning("Could not save cache %s: %s" % (self.path, e))
+            return
+
+        self.modified = False
+
+    def get(self, section, key, stamp):
+        if stamp is None:
+            return None
+
+        entry = self.sections.get(section, {}).get(key)
+        if entry is None or entry[0] != stamp:
+            return None
+
+        return entry[1]
+
+    def set(self, section, key, stamp, value):
+        if stamp is None:
+            return
+
+        self.sections.setdefault(section, {})[key] = [stamp, value]
+        self.modified = True
+
+
 class ScenarioManager(Loggable):
     _instance = None
     system_scenarios = []
@@ -2498,15 +2909,36 @@ class ScenarioManager(Loggable):
                 cls, *args, **kwargs)
             cls._instance.config = None
             cls._instance.discovered = False
+            cls._instance.scenario_files = {}
             Loggable.__init__(cls._instance)
 
         return cls._instance
 
+    def _get_scenario_files(self, dirname):
+        """Returns the names of the scenario files in dirname"""
+        files = self.scenario_files.get(dirname)
+        if files is not None:
+            return files
+
+        cache = LauncherCache()
+        try:
+            stamp = [os.stat(dirname).st_mtime_ns]
+        except OSError:
+            stamp = None
+        files = cache.get("scenario-files", dirname, stamp)
+        if files is None:
+            files = sorted(f for f in os.listdir(dirname)
+                           if f.endswith("." + self.FILE_EXTENSION))
+            cache.set("scenario-files", dirname, stamp, files)
+
+        self.scenario_files[dirname] = files
+        return files
+
     def find_special_scenarios(self, mfile):
         scenarios = []
         mfile_bname = os.path.basename(mfile)
 
-        for f in os.listdir(os.path.dirname(mfile)):
+        for f in self._get_scenario_files(os.path.dirname(mfile)):
             if re.findall(r'%s\..*\.%s$' % (re.escape(mfile_bname), self.FILE_EXTENSION), f):
                 scenarios.append(os.path.join(os.path.dirname(mfile), f))
 
@@ -2515,31 +2947,80 @@ class ScenarioManager(Loggable):
 
         return scenarios
 
-    def discover_scenarios(self, scenario_paths=[], mfile=None):
+    def _get_system_scenarios_dirs(self):
+        """The directories in which the validate binary looks for scenarios"""
+        subdir = os.path.join("gstreamer-1.0", "validate", "scenarios")
+        user_data_dir = os.environ.get("XDG_DATA_HOME") or \
+            os.path.join(os.path.expanduser("~"), ".local", "share")
+        dirs = [os.path.join(user_data_dir, subdir),
+                os.path.join(utils.config.DATADIR, subdir)]
+        dirs.extend(d for d in os.environ.get("GST_VALIDATE_SCENARIOS_PATH", "").split(":") if d)
+        dirs.append(os.path.abspath(os.path.join("data", "scenarios")))
+
+        return dirs
+
+    def _get_scenario_defs(self, scenario_paths):
         """
-        Discover scenarios specified in scenario_paths or the default ones
-        if nothing specified there
+        Returns the (section, properties) of the definitions of the
+        scenarios in scenario_paths or of the default ones, from the
+        launcher cache when none of their files changed
         """
-        scenarios = []
+        cache = LauncherCache()
+        command = which(GstValidateBaseTestManager.COMMAND)
+        command_stamp = cache.file_stamp(command) if command else None
+        if scenario_paths:
+            keys = scenario_paths
+            stamps = [[command_stamp, cache.file_stamp(path)]
+                      for path in scenario_paths]
+        else:
+            keys = ["system"]
+            stamps = [[command_stamp] + [cache.dir_stamp(d) for d in
+                                         self._get_system_scenarios_dirs()]]
+        if command_stamp is not None:
+            cached = [cache.get("scenarios", key, stamp)
+                      for key, stamp in zip(keys, stamps)]
+            if None not in cached:
+                return [scenario_def for scenario_defs in cached
+                        for scenario_def in scenario_defs]
+
         scenario_defs = os.path.join(self.config.main_dir, "scenarios.def")
         log_path = os.path.join(self.config.logsdir, "scenarios_discovery.log")
-        logs = open(log_path, 'w')
 
+        failed = False
         try:
             command = [GstValidateBaseTestManager.COMMAND,
                        "--scenarios-defs-output-file", scenario_defs]
             command.extend(scenario_paths)
-            subprocess.check_call(command, stdout=logs, stderr=logs)
+            with open(log_path, 'w') as logs:
+                subprocess.check_call(command, stdout=logs, stderr=logs)
         except subprocess.CalledProcessError as e:
             self.error(e)
             self.error('See %s' % log_path)
-            pass
+            failed = True
 
         config = configparser.RawConfigParser()
-        f = open(scenario_defs)
-        config.read_file(f)
+        with open(scenario_defs) as f:
+            config.read_file(f)
+
+        defs = [(section, config.items(section)) for section in config.sections()]
+        if not failed and command_stamp is not None:
+            if scenario_paths:
+                for key, stamp in zip(keys, stamps):
+                    cache.set("scenarios", key, stamp,
+                              [scenario_def for scenario_def in defs
+                               if scenario_def[0] == key])
+            else:
+                cache.set("scenarios", keys[0], stamps[0], defs)
+
+        return defs
 
-        for section in config.sections():
+    def discover_scenarios(self, scenario_paths=[], mfile=None):
+        """
+        Discover scenarios specified in scenario_paths or the default ones
+        if nothing specified there
+        """
+        scenarios = []
+        for section, props in self._get_scenario_defs(scenario_paths):
             name = None
             if scenario_paths:
                 for scenario_path in scenario_paths:
@@ -2560,7 +3041,6 @@ class ScenarioManager(Loggable):
 
             assert name
 
-            props = config.items(section)
             scenario = Scenario(name, props, path)
             if scenario_paths:
                 self.special_scenarios[path] = scenario
@@ -2822,13 +3302,19 @@ class GstValidateMediaDescriptor(MediaDescriptor):
             self.__all_descriptors[xml_path] = self
 
             self._xml_path = xml_path
-            try:
-                media_xml = ET.parse(xml_path).getroot()
-            except xml.etree.ElementTree.ParseError:
-                printc("Could not parse %s" % xml_path,
-                    Colors.FAIL)
-                raise
-            self._extract_data(media_xml)
+            cache = LauncherCache()
+            stamp = cache.file_stamp(xml_path)
+            data = cache.get("media-descriptors", xml_path, stamp)
+            if data is None:
+                try:
+                    media_xml = ET.parse(xml_path).getroot()
+                except xml.etree.ElementTree.ParseError:
+                    printc("Could not parse %s" % xml_path,
+                        Colors.FAIL)
+                    raise
+                data = self._read_data(media_xml)
+                cache.set("media-descriptors", xml_path, stamp, data)
+            self._extract_data(data)
 
         self.set_protocol(urllib.parse.urlparse(self.get_uri()).scheme)
 
@@ -2842,40 +3328,44 @@ class GstValidateMediaDescriptor(MediaDescriptor):
         for attr in main_descriptor.__dict__.keys():
             setattr(self, attr, getattr(main_descriptor, attr))
 
-    def _extract_data(self, media_xml):
-        # Extract the information we need from the xml
-        self._caps = media_xml.findall("streams")[0].attrib["caps"]
-        self._track_caps = []
-        try:
-            streams = media_xml.findall("streams")[0].findall("stream")
-        except IndexError:
-            pass
-        else:
-            for stream in streams:
-                self._track_caps.append(
-                    (stream.attrib["type"], stream.attrib["caps"]))
-
-        self._skip_parsers = bool(int(media_xml.attrib.get('skip-parsers', 0)))
-        self._has_frames = bool(int(media_xml.attrib["frame-detection"]))
-        self._duration = int(media_xml.attrib["duration"])
-        self._uri = media_xml.attrib["uri"]
+    def _read_data(self, media_xml):
+        # Extract the information we need from the xml, in a form that
+        # can be stored in the launcher cache (bump LauncherCache.VERSION
+        # when changing it)
+        streams = media_xml.findall("streams")[0]
+
+        return {
+            'caps': streams.attrib["caps"],
+            'track-caps': [(stream.attrib["type"], stream.attrib["caps"])
+                           for stream in streams.findall("stream")],
+            'skip-parsers': bool(int(media_xml.attrib.get('skip-parsers', 0))),
+            'frame-detection': bool(int(media_xml.attrib["frame-detection"])),
+            'duration': int(media_xml.attrib["duration"]),
+            'uri': media_xml.attrib["uri"],
+            'protocol': media_xml.get("protocol"),
+            'seekable': media_xml.attrib["seekable"].lower() == "true",
+            'live': media_xml.get("live", "false").lower() == "true",
+        }
+
+    def _extract_data(self, data):
+        self._caps = data['caps']
+        self._track_caps = [tuple(track_caps) for track_caps in data['track-caps']]
+        self._skip_parsers = data['skip-parsers']
+        self._has_frames = data['frame-detection']
+        self._duration = data['duration']
+        self._uri = data['uri']
         parsed_uri = urllib.parse.urlparse(self.get_uri())
-        self._protocol = media_xml.get("protocol", parsed_uri.scheme)
+        self._protocol = data['protocol'] or parsed_uri.scheme
         if parsed_uri.scheme == "file":
             if not os.path.exists(parsed_uri.path) and os.path.exists(self.get_media_filepath()):
                 self._uri = "file://" + self.get_media_filepath()
         elif parsed_uri.scheme == Protocols.IMAGESEQUENCE:
             self._media_file_path = os.path.join(os.path.dirname(self.__cleanup_media_info_ext()), os.path.basename(parsed_uri.path))
             self._uri = parsed_uri._replace(path=os.path.join(os.path.dirname(self.__cleanup_media_info_ext()), os.path.basename(self._media_file_path))).geturl()
-        self._is_seekable = media_xml.attrib["seekable"].lower() == "true"
-        self._is_live = media_xml.get("live", "false").lower() == "true"
-        self._is_image = False
-        for stream in media_xml.findall("streams")[0].findall("stream"):
-            if stream.attrib["type"] == "image":
-                self._is_image = True
-        self._track_types = []
-        for stream in media_xml.findall("streams")[0].findall("stream"):
-            self._track_types.append(stream.attrib["type"])
+        self._is_seekable = data['seekable']
+        self._is_live = data['live']
+        self._track_types = [track_type for track_type, caps in self._track_caps]
+        self._is_image = "image" in self._track_types
 
     def __cleanup_media_info_ext(self):
         for ext in [self.MEDIA_INFO_EXT, self.PUSH_MEDIA_INFO_EXT, self.STREAM_INFO_EXT,
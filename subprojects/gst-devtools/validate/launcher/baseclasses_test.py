@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin St, Fifth Floor,
+# Boston, MA 02110-1301, USA.
+
+import json
+import os
+import select
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from launcher.baseclasses import GstValidateBaseTestManager, \
+    GstValidateSelectorServer, GstValidateTestConnection, LauncherCache, \
+    ScenarioManager, Test, TestsHistory, _TestsLauncher
+from launcher.main import LauncherConfig
+from launcher.utils import Result
+
+
+class PythonCommandTest(Test):
+
+    def __init__(self, classname, options, code, **kwargs):
+        super().__init__(sys.executable, classname, options, None, **kwargs)
+        self.code = code
+
+    def build_arguments(self):
+        super().build_arguments()
+        self.add_arguments("-c", self.code)
+
+
+class LauncherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.options = LauncherConfig.create_parser().parse_args(
+            [], namespace=LauncherConfig())
+        self.options.logsdir = self.tmpdir
+        self.options.redirect_logs = False
+        self.options.gdb_non_stop = False
+        with mock.patch.dict(os.environ,
+                             {"GST_VALIDATE_APPS_DIR": self.tmpdir}):
+            self.launcher = _TestsLauncher()
+        self.launcher.options = self.options
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+class TestTestWait(LauncherTestCase):
+
+    def run_test(self, test):
+        self.assertTrue(self.launcher.start_new_job([test]))
+        self.assertIs(self.launcher.test_wait(), test)
+        return test.test_end()
+
+    def test_exit(self):
+        test = PythonCommandTest("exit", self.options, "pass")
+        self.assertEqual(self.run_test(test), Result.NOT_RUN)
+        self.assertEqual(test.process.returncode, 0)
+        if hasattr(os, 'wait4'):
+            self.assertIsNotNone(test.cpu_time)
+            self.assertGreater(test.max_rss, 0)
+
+    def test_exit_status(self):
+        test = PythonCommandTest("exit_status", self.options,
+                                 "import sys; sys.exit(3)")
+        self.run_test(test)
+        self.assertEqual(test.process.returncode, 3)
+
+    def test_timeout(self):
+        test = PythonCommandTest("timeout", self.options,
+                                 "import time; time.sleep(30)", timeout=0.1)
+        self.assertEqual(self.run_test(test), Result.TIMEOUT)
+
+    def test_no_timeout(self):
+        # What Test.use_gdb() does when not using --gdb-non-stop
+        test = PythonCommandTest("no_timeout", self.options, "pass")
+        test.timeout = test.hard_timeout = sys.maxsize
+        self.assertEqual(self.run_test(test), Result.NOT_RUN)
+
+
+def ran_test(classname, time_taken, cpu_time=None, max_rss=None):
+    return SimpleNamespace(classname=classname, time_taken=time_taken,
+                           cpu_time=cpu_time, max_rss=max_rss)
+
+
+class TestTestsHistory(LauncherTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmpdir, "tests-history.json")
+
+    def test_add(self):
+        history = TestsHistory(self.path)
+        history.add(ran_test("a", 10.0, 4.0, 1000))
+        history.add(ran_test("a", 20.0))
+        self.assertEqual(history.tests["a"], {'wall-time': 15.0,
+                                              'cpu-time': 4.0,
+                                              'max-rss': 1000,
+                                              'runs': 2})
+
+        history.save()
+        self.assertEqual(TestsHistory(self.path).tests, history.tests)
+
+    def test_get_durations(self):
+        history = TestsHistory(self.path)
+        tests = [ran_test(name, 0) for name in "abcd"]
+        self.assertIsNone(history.get_durations(tests))
+
+        history.add(ran_test("a", 1.0))
+        history.add(ran_test("b", 5.0))
+        history.add(ran_test("c", 3.0))
+        # Tests never run are expected to take the median time
+        self.assertEqual(history.get_durations(tests), [1.0, 5.0, 3.0, 3.0])
+        self.assertEqual([test.classname for test in
+                          history.sort_longest_first(tests)],
+                         ["b", "c", "d", "a"])
+
+    def test_split_tests(self):
+        history = TestsHistory(self.path)
+        durations = {"a": 8, "b": 7, "c": 6, "d": 5, "e": 4, "f": 3, "g": 2}
+        for name, duration in durations.items():
+            history.add(ran_test(name, duration))
+        self.launcher.history = history
+        self.launcher.tests = [ran_test(name, 0) for name in sorted(durations)]
+
+        # Without an explicit durations file, tests are split round robin
+        self.options.durations_file = None
+        self.assertEqual([[test.classname for test in group]
+                          for group in self.launcher._split_tests(3)],
+                         [["a", "d", "g"], ["b", "e"], ["c", "f"]])
+
+        self.options.durations_file = self.path
+        groups = self.launcher._split_tests(3)
+        self.assertEqual([[test.classname for test in group]
+                          for group in groups],
+                         [["a", "f", "g"], ["b", "e"], ["c", "d"]])
+        self.assertEqual([sum(durations[test.classname] for test in group)
+                          for group in groups], [13, 11, 11])
+
+
+def frame(obj):
+    data = json.dumps(obj).encode()
+    return struct.pack('>I', len(data)) + data
+
+
+def report(i, size=0):
+    return {"type": "report", "i": i, "padding": "x" * size}
+
+
+class TestGstValidateTestConnection(unittest.TestCase):
+
+    def setUp(self):
+        self.test = mock.Mock(classname="test")
+        self.launcher = mock.Mock()
+        self.launcher.get_test_by_uuid.side_effect = {"uuid": self.test}.get
+        self.connection = GstValidateTestConnection(self.launcher)
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def send(self, data, chunk_size):
+        for i in range(0, len(data), chunk_size):
+            self.sender.sendall(data[i:i + chunk_size])
+            # receive() reads at most what fits in the buffer
+            while select.select([self.receiver], [], [], 0)[0]:
+                self.assertTrue(self.connection.receive(self.receiver))
+
+    def reports(self):
+        return [call[0][0]["i"] for call in self.test.add_report.call_args_list]
+
+    def test_split_frames(self):
+        data = frame({"uuid": "uuid"}) + b"".join(frame(report(i))
+                                                  for i in range(20))
+        self.send(data, 7)
+        self.assertEqual(self.reports(), list(range(20)))
+        self.assertEqual(self.connection._start, 0)
+        self.assertEqual(self.connection._end, 0)
+
+    def test_compaction(self):
+        data = frame({"uuid": "uuid"}) + b"".join(frame(report(i, 300))
+                                                  for i in range(50))
+        self.send(data, 1001)
+        self.assertEqual(self.reports(), list(range(50)))
+        # Partial messages are moved to the start instead of growing it
+        self.assertEqual(len(self.connection._buffer), 4096)
+
+    def test_growth(self):
+        data = frame({"uuid": "uuid"}) + frame(report(0, 10000)) + frame(report(1))
+        self.send(data, 3000)
+        self.assertEqual(self.reports(), [0, 1])
+        self.assertGreater(len(self.connection._buffer), 10000)
+
+    def test_eof_in_frame(self):
+        self.send(frame({"uuid": "uuid"}) + frame(report(0))[:-1], 4096)
+        self.sender.close()
+        self.assertFalse(self.connection.receive(self.receiver))
+        self.assertEqual(self.reports(), [])
+
+    def test_missing_uuid(self):
+        self.sender.sendall(frame(report(0)))
+        self.assertFalse(self.connection.receive(self.receiver))
+        self.assertIsNone(self.connection.test)
+
+    def test_unknown_uuid(self):
+        self.sender.sendall(frame({"uuid": "other"}))
+        self.assertFalse(self.connection.receive(self.receiver))
+        self.assertIsNone(self.connection.test)
+        self.assertTrue(self.launcher.error.called)
+
+
+class TestGstValidateSelectorServer(unittest.TestCase):
+
+    def test_round_trip(self):
+        test = mock.Mock(classname="test")
+        server = GstValidateSelectorServer(("localhost", 0))
+        server.launcher = mock.Mock()
+        server.launcher.get_test_by_uuid.side_effect = {"uuid": test}.get
+        thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+        thread.start()
+        try:
+            with socket.create_connection(server.socket.getsockname()) as sock:
+                sock.sendall(frame({"uuid": "uuid"}) + frame(report(0)))
+                sock.sendall(frame(report(1, 5000)))
+            deadline = time.time() + 10
+            while test.add_report.call_count < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            # Only the listening socket is left once the client is gone
+            while len(server._selector.get_map()) > 1 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            server.shutdown()
+            thread.join()
+            server.server_close()
+
+        self.assertEqual([call[0][0]["i"] for call in test.add_report.call_args_list],
+                         [0, 1])
+        self.assertEqual(len(server._selector.get_map() or {}), 0)
+
+
+class LauncherCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "launcher-cache.json")
+        self.cache = LauncherCache()
+        self.cache.load(self.path)
+
+    def tearDown(self):
+        self.cache.path = None
+        self.cache.sections = {}
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w") as f:
+            f.write(data)
+        return path
+
+
+class TestLauncherCache(LauncherCacheTestCase):
+
+    def test_get_set(self):
+        self.cache.set("section", "key", [1, 2], "value")
+        self.assertEqual(self.cache.get("section", "key", [1, 2]), "value")
+        self.assertIsNone(self.cache.get("section", "key", [1, 3]))
+        self.assertIsNone(self.cache.get("other", "key", [1, 2]))
+
+        self.cache.set("section", "unstamped", None, "value")
+        self.assertIsNone(self.cache.get("section", "unstamped", None))
+
+    def test_save_load(self):
+        path = self.write("file", "data")
+        self.cache.set("section", path, [1], {"a": [1, 2]})
+        self.cache.set("section", os.path.join(self.tmpdir, "removed"), [1], 0)
+        self.cache.save()
+        self.assertFalse(self.cache.modified)
+
+        self.cache.load(self.path)
+        self.assertEqual(self.cache.get("section", path, [1]), {"a": [1, 2]})
+        # Entries of the files that do not exist anymore are dropped
+        self.assertEqual(list(self.cache.sections["section"]), [path])
+
+    def test_other_version(self):
+        for data in ({"version": LauncherCache.VERSION + 1,
+                      "sections": {"section": {"key": [[1], 0]}}},
+                     {"section": {"key": [[1], 0]}}):
+            with open(self.path, "w") as f:
+                json.dump(data, f)
+            self.cache.load(self.path)
+            self.assertIsNone(self.cache.get("section", "key", [1]))
+
+    def test_corrupt(self):
+        self.write("launcher-cache.json", "{")
+        self.cache.load(self.path)
+        self.assertEqual(self.cache.sections, {})
+
+    def test_file_stamp(self):
+        path = self.write("file", "data")
+        stamp = LauncherCache.file_stamp(path)
+        self.assertEqual(LauncherCache.file_stamp(path), stamp)
+        self.write("file", "other data")
+        self.assertNotEqual(LauncherCache.file_stamp(path), stamp)
+        self.assertIsNone(LauncherCache.file_stamp(path + ".missing"))
+
+    def test_dir_stamp(self):
+        stamp = LauncherCache.dir_stamp(self.tmpdir)
+        self.assertEqual(LauncherCache.dir_stamp(self.tmpdir), stamp)
+        self.write("file", "data")
+        self.assertNotEqual(LauncherCache.dir_stamp(self.tmpdir), stamp)
+        self.assertIsNone(LauncherCache.dir_stamp(os.path.join(self.tmpdir, "missing")))
+
+
+# Writes a definition for each scenario it gets, or for a default one, and
+# counts its runs
+FAKE_VALIDATE = """#!%s
+import os, sys
+with open(os.path.join(os.path.dirname(sys.argv[0]), "runs"), "a") as f:
+    f.write("run\\n")
+with open(sys.argv[2], "w") as f:
+    for path in sys.argv[3:] or ["default.scenario"]:
+        f.write("[%%s]\\ndescription=%%s\\n" %% (path, open(path).read().strip()
+                                              if os.path.exists(path) else ""))
+"""
+
+
+class TestScenarioDefs(LauncherCacheTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.command = self.write("gst-validate", FAKE_VALIDATE % sys.executable)
+        os.chmod(self.command, 0o755)
+        self.manager = ScenarioManager()
+        self.config = self.manager.config
+        self.manager.config = SimpleNamespace(main_dir=self.tmpdir,
+                                              logsdir=self.tmpdir)
+        self.scenarios_dir = os.path.join(self.tmpdir, "scenarios")
+        os.mkdir(self.scenarios_dir)
+        patches = [mock.patch.object(GstValidateBaseTestManager, "COMMAND",
+                                     self.command),
+                   mock.patch.object(ScenarioManager, "_get_system_scenarios_dirs",
+                                     return_value=[self.scenarios_dir])]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.manager.config = self.config
+        super().tearDown()
+
+    def runs(self):
+        try:
+            with open(os.path.join(self.tmpdir, "runs")) as f:
+                return len(f.readlines())
+        except FileNotFoundError:
+            return 0
+
+    def test_scenario_paths(self):
+        path = self.write("a.scenario", "first")
+        defs = self.manager._get_scenario_defs([path])
+        self.assertEqual(defs, [(path, [("description", "first")])])
+        self.assertEqual(self.manager._get_scenario_defs([path]), defs)
+        self.assertEqual(self.runs(), 1)
+
+        self.write("a.scenario", "changed")
+        self.assertEqual(self.manager._get_scenario_defs([path]),
+                         [(path, [("description", "changed")])])
+        self.assertEqual(self.runs(), 2)
+
+    def test_system_scenarios(self):
+        defs = self.manager._get_scenario_defs([])
+        self.assertEqual(self.manager._get_scenario_defs([]), defs)
+        self.assertEqual(self.runs(), 1)
+
+        with open(os.path.join(self.scenarios_dir, "new.scenario"), "w"):
+            pass
+        self.manager._get_scenario_defs([])
+        self.assertEqual(self.runs(), 2)
+
+    def test_saved_cache(self):
+        path = self.write("a.scenario", "first")
+        defs = self.manager._get_scenario_defs([path])
+        self.cache.save()
+        self.cache.load(self.path)
+        self.assertEqual([(section, [tuple(item) for item in items])
+                          for section, items in self.manager._get_scenario_defs([path])],
+                         defs)
+        self.assertEqual(self.runs(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -31,7 +31,7 @@ import pathlib
 
 
 from .loggable import Loggable
-from .baseclasses import _TestsLauncher, ScenarioManager
+from .baseclasses import _TestsLauncher, ScenarioManager, LauncherCache
 from .utils import printc, path2url, DEFAULT_MAIN_DIR, launch_command, Colors, Protocols, which
 
 
@@ -217,6 +217,7 @@ class LauncherConfig(Loggable):
         self.output_dir = None
         self.logsdir = None
         self.privatedir = None
+        self.durations_file = None
         self.redirect_logs = False
         self.num_jobs = max(multiprocessing.cpu_count(), 1)
         self.dest = None
@@ -242,6 +243,7 @@ class LauncherConfig(Loggable):
         self.check_bugs_status = False
         self.retry_on_failures = False
         self.html = False
+        self.selector_server = False
 
     def cleanup(self):
         """
@@ -524,6 +526,9 @@ class LauncherConfig(Loggable):
                             help="Disable retrying on failure, event for known to be flaky tests.")
         parser.add_argument('--html', dest="html", action="store_true",
                             help="Write logs as html")
+        parser.add_argument('--selector-server', dest="selector_server", action="store_true",
+                            help="Handle the messages of all the tests in a single thread"
+                            " instead of one thread per test")
         parser.add_argument("--keep-logs", dest="keep_logs",
                             action="store_true",
                             help="Keep the logs in the output directory on success, by default logs are removed unless the test passes")
@@ -566,6 +571,12 @@ class LauncherConfig(Loggable):
         dir_group.add_argument("--part-index", dest="part_index",
                                help="The index of the part to be run (starts at 1).",
                                type=int, default=1)
+        dir_group.add_argument("--durations-file", dest="durations_file",
+                               help="File where the durations of the tests are stored"
+                               " to start the longest ones first. When set, --parts"
+                               " also uses it to split the tests in parts of the same"
+                               " duration, so all parts must be given the same file."
+                               " Default is OUTPUT_DIR/launcher-private/tests-history.json")
 
         http_server_group = parser.add_argument_group(
             "Handle the HTTP server to be created")
@@ -631,6 +642,7 @@ def setup_launcher_from_args(args, main_options=None):
             return False, None, None
     # Ensure that the scenario manager singleton is ready to be used
     ScenarioManager().config = options
+    LauncherCache().load(os.path.join(options.privatedir, "launcher-cache.json"))
     if not tests_launcher.set_settings(options, []):
         return False, None, None
 